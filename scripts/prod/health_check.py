@@ -35,13 +35,14 @@ class HealthChecker:
         try:
             # Windows
             result = subprocess.run(
-                ["tasklist", "/FI", "IMAGENAME eq python.exe"],
-                capture_output=True,
-                text=True,
+                ["tasklist", "/FI", "IMAGENAME eq python.exe", "/NH", "/FO", "CSV"],
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
                 timeout=5,
             )
-            # Check if script name in command line (approximate)
-            return process_name in result.stdout
+            # Check if script name in command line (approximate); compare raw
+            # bytes to skip locale decoding of the whole process table.
+            return process_name.encode() in result.stdout
         except (subprocess.TimeoutExpired, FileNotFoundError):
             return False
 
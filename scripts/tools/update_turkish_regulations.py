@@ -4,22 +4,39 @@
 from __future__ import annotations
 
 import argparse
-import hashlib
-import json
+import asyncio
+import functools
+import io
 import re
 import unicodedata
-from dataclasses import dataclass
+from concurrent.futures import Executor, ProcessPoolExecutor
+from dataclasses import dataclass, field, fields
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
 from urllib.parse import urljoin
 
 import httpx
+import orjson
+import xxhash
 from bs4 import BeautifulSoup
+from lxml import etree
 
 DEFAULT_INPUT = Path("./docs/check-turkish-law.md")
 DEFAULT_OUTPUT = Path("./docs/turkish_regulations.json")
 BASE = "https://www.mevzuat.gov.tr"
+USER_AGENT = "ai4ohs-hybrid/1.3"
+MAX_CONNECTIONS = 32
+DEFAULT_CONCURRENCY = 16
+STREAM_CHUNK_SIZE = 64 * 1024
+
+_TABLE_SEP_RE = re.compile(r"\|\s*-{3,}.*\|")
+_CHARSET_RE = re.compile(r"charset\s*=\s*([A-Za-z0-9_\-]+)", re.I)
+_TR_CHARS_RE = re.compile(r"[çğıöşüÇĞİÖŞÜ]")
+_NBSP_RE = re.compile(r"\xa0")
+_WS_RE = re.compile(r"[ \t]+")
+_NL_RE = re.compile(r"\n{2,}")
+_SORTKEY_RE = re.compile(r"^MADDE\s+(\d+)[A-Z]?/(\d+)(?:-([a-zçğıöşü]))?$", re.I)
 
 
 @dataclass
@@ -38,6 +55,49 @@ class MevzuatRow:
         return f"{BASE}/mevzuat?MevzuatNo={self.mevzuat_no}&MevzuatTur={self.mevzuat_tur}&MevzuatTertip={self.mevzuat_tertip}"
 
 
+@dataclass(slots=True)
+class ItemDebug:
+    tried_urls: List[Dict] = field(default_factory=list)
+    used_from: Optional[str] = None
+
+
+@dataclass(slots=True)
+class RegulationItem:
+    """One registry entry; orjson serialises it directly in ``store_state``."""
+
+    mevzuat_no: str = ""
+    mevzuat_tur: str = ""
+    mevzuat_tertip: str = ""
+    mevzuat_adi: str = ""
+    url: str = ""
+    last_checked: Optional[str] = None
+    status: str = "unknown"
+    last_changed: Optional[str] = None
+    content_hash: Optional[str] = None
+    final_url: Optional[str] = None
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    meta: Dict = field(default_factory=dict)
+    maddeler: List[Dict] = field(default_factory=list)
+    maddeler_flat: List[Dict] = field(default_factory=list)
+    debug: ItemDebug = field(default_factory=ItemDebug)
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "RegulationItem":
+        known = {f.name for f in fields(cls)}
+        kwargs = {k: v for k, v in data.items() if k in known and v is not None}
+        debug = kwargs.pop("debug", None) or {}
+        kwargs["debug"] = ItemDebug(
+            tried_urls=list(debug.get("tried_urls") or []), used_from=debug.get("used_from")
+        )
+        item = cls(**kwargs)
+        # Older runs stored SHA-256 / xxh3_64 digests of the decoded page; those are not
+        # comparable to the streamed raw-body digest.
+        if len(item.content_hash or "") != CONTENT_HASH_LEN:
+            item.content_hash = None
+        return item
+
+
 def _utc_now() -> str:
     return datetime.now(timezone.utc).isoformat()
 
@@ -50,7 +110,7 @@ def read_table(md_path: Path) -> List["MevzuatRow"]:
         line = line.strip()
         if not line or not line.startswith("|"):
             continue
-        if re.fullmatch(r"\|\s*-{3,}.*\|", line):
+        if _TABLE_SEP_RE.fullmatch(line):
             in_table = True
             continue
         if not in_table:
@@ -65,40 +125,85 @@ def read_table(md_path: Path) -> List["MevzuatRow"]:
     return rows
 
 
+# Non-cryptographic digest of the raw response body, used only to detect content changes
+# between runs. http_get computes it while streaming, so the body is never hashed twice.
+content_hasher = xxhash.xxh3_128
+CONTENT_HASH_LEN = 32
+
+
+def empty_search_index() -> Dict:
+    return {"keys": [], "refs": [], "texts": [], "spans": {}}
+
+
+def build_search_index(items: Dict) -> Dict:
+    """Columnar search index: parallel ``keys``/``refs``/``texts`` lists, plus ``spans``
+    mapping each regulation key to its ``[start, end)`` row range."""
+    index = empty_search_index()
+    keys, refs, texts, spans = index["keys"], index["refs"], index["texts"], index["spans"]
+    for key, item in items.items():
+        flat = item.maddeler_flat
+        if not flat:
+            continue
+        start = len(refs)
+        for entry in flat:
+            refs.append(entry["ref"])
+            texts.append(entry["text"])
+        keys.extend([key] * len(flat))
+        spans[key] = [start, len(refs)]
+    return index
+
+
 def load_state(path: Path) -> Dict:
     if not path.exists():
-        return {"last_run": None, "registry_size": 0, "items": {}, "search_index": {}}
+        return {
+            "last_run": None,
+            "registry_size": 0,
+            "items": {},
+            "search_index": empty_search_index(),
+        }
     try:
-        data = json.loads(path.read_text(encoding="utf-8"))
+        data = orjson.loads(path.read_bytes())
         if "items" not in data or not isinstance(data["items"], dict):
             data["items"] = {}
-        if "search_index" not in data or not isinstance(data["search_index"], dict):
-            data["search_index"] = {}
+        data["items"] = {
+            key: RegulationItem.from_dict(item)
+            for key, item in data["items"].items()
+            if isinstance(item, dict)
+        }
+        # The index is derived from items and rebuilt before every write; this also
+        # drops the legacy ``{"<key>::<ref>": {...}}`` layout.
+        data["search_index"] = build_search_index(data["items"])
         return data
-    except json.JSONDecodeError:
+    except orjson.JSONDecodeError:
         backup = path.with_suffix(".corrupt")
         path.rename(backup)
         return {
             "last_run": None,
             "registry_size": 0,
             "items": {},
-            "search_index": {},
+            "search_index": empty_search_index(),
             "warning": f"Corrupt JSON moved to {backup.name}",
         }
 
 
-def store_state(path: Path, data: Dict) -> None:
+def store_state(path: Path, data: Dict, pretty: bool = False) -> None:
     path.parent.mkdir(parents=True, exist_ok=True)
     tmp = path.with_suffix(".tmp")
-    tmp.write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8")
+    tmp.write_bytes(orjson.dumps(data, option=orjson.OPT_INDENT_2 if pretty else 0))
     tmp.replace(path)
 
 
 _TURKISH_ENCODINGS = ["utf-8", "cp1254", "iso-8859-9"]
 
 
-def _count_repl(s: str) -> int:
-    return s.count("\ufffd") or s.count("�")
+# Lowest possible decode score: no replacement chars, Turkish letters present, not UTF-8.
+_BEST_SCORE = (0, 0, 0)
+
+
+def _decode_score(enc: str, txt: str):
+    repl = txt.count("\ufffd")
+    has_tr = _TR_CHARS_RE.search(txt) is not None
+    return (repl, 0 if has_tr else 1, 0 if enc != "utf-8" else 1)
 
 
 def smart_decode(content: bytes, content_type: str, header_charset: Optional[str]) -> str:
@@ -109,61 +214,68 @@ def smart_decode(content: bytes, content_type: str, header_charset: Optional[str
             return unicodedata.normalize("NFC", txt)
         except Exception as e:
             tried.append(("header", header_charset, str(e)))
-    candidates = []
-    for enc in _TURKISH_ENCODINGS:
-        try:
-            txt = content.decode(enc, errors="strict")
-            txt = unicodedata.normalize("NFC", txt)
-            candidates.append((enc, txt, _count_repl(txt)))
-        except Exception:
-            pass
-    if not candidates:
+    best = None
+    for errors in ("strict", "replace"):
         for enc in _TURKISH_ENCODINGS:
             try:
-                txt = content.decode(enc, errors="replace")
-                txt = unicodedata.normalize("NFC", txt)
-                candidates.append((enc, txt, _count_repl(txt)))
+                txt = content.decode(enc, errors=errors)
             except Exception:
-                pass
-    if not candidates:
-        txt = content.decode("utf-8", errors="replace")
-        return unicodedata.normalize("NFC", txt)
-
-    def score(cand):
-        enc, txt, repl = cand
-        has_tr = bool(re.search(r"[çğıöşüÇĞİÖŞÜ]", txt))
-        return (repl, 0 if has_tr else 1, 0 if enc != "utf-8" else 1)
-
-    enc, txt, _ = sorted(candidates, key=score)[0]
-    return txt
+                continue
+            score = _decode_score(enc, txt)
+            if best is None or score < best[0]:
+                best = (score, txt)
+            if score == _BEST_SCORE:
+                break
+        if best is not None:
+            break
+    txt = best[1] if best is not None else content.decode("utf-8", errors="replace")
+    return unicodedata.normalize("NFC", txt)
+
+
+def build_client(timeout: float) -> httpx.AsyncClient:
+    limits = httpx.Limits(
+        max_connections=MAX_CONNECTIONS, max_keepalive_connections=MAX_CONNECTIONS
+    )
+    return httpx.AsyncClient(
+        timeout=timeout,
+        follow_redirects=True,
+        limits=limits,
+        headers={"User-Agent": USER_AGENT},
+    )
 
 
-def http_get(url: str, timeout: float) -> Dict:
+async def http_get(
+    client: httpx.AsyncClient, url: str, timeout: float, headers: Optional[Dict[str, str]] = None
+) -> Dict:
     try:
-        resp = httpx.get(
-            url, timeout=timeout, follow_redirects=True, headers={"User-Agent": "ai4ohs-hybrid/1.3"}
-        )
-        ct = resp.headers.get("Content-Type", "")
-        charset = None
-        m = re.search(r"charset\s*=\s*([A-Za-z0-9_\-]+)", ct or "", flags=re.I)
-        if m:
-            charset = m.group(1).lower()
-        html = ""
-        if (
-            "text/html" in ct
-            or "application/xhtml" in ct
-            or ct == ""
-            or resp.url.path.lower().endswith((".htm", ".html"))
-        ):
-            html = smart_decode(resp.content, ct, charset)
+        async with client.stream("GET", url, timeout=timeout, headers=headers) as resp:
+            ct = resp.headers.get("Content-Type", "")
+            charset = None
+            m = _CHARSET_RE.search(ct or "")
+            if m:
+                charset = m.group(1).lower()
+            is_html = (
+                "text/html" in ct
+                or "application/xhtml" in ct
+                or ct == ""
+                or resp.url.path.lower().endswith((".htm", ".html"))
+            )
+            # Hash while streaming; only keep the body around when it will be decoded.
+            hasher = content_hasher()
+            buf = bytearray() if is_html else None
+            async for chunk in resp.aiter_bytes(STREAM_CHUNK_SIZE):
+                hasher.update(chunk)
+                if buf is not None:
+                    buf += chunk
         return {
             "status": "ok",
             "final_url": str(resp.url),
             "content_type": ct,
-            "html": html,
-            "bytes": resp.content,
-            "hash": hashlib.sha256(resp.content).hexdigest(),
+            "html": smart_decode(buf, ct, charset) if buf is not None else "",
+            "hash": hasher.hexdigest(),
             "code": resp.status_code,
+            "etag": resp.headers.get("ETag"),
+            "last_modified": resp.headers.get("Last-Modified"),
         }
     except httpx.HTTPError as e:
         return {
@@ -172,9 +284,10 @@ def http_get(url: str, timeout: float) -> Dict:
             "final_url": url,
             "content_type": "",
             "html": "",
-            "bytes": b"",
-            "hash": "",
+            "hash": None,
             "code": 0,
+            "etag": None,
+            "last_modified": None,
         }
 
 
@@ -190,37 +303,53 @@ CAND_SUBSTR = (
 )
 
 
-def discover_content_urls(main_html: str, main_url: str, row: MevzuatRow) -> List[str]:
-    soup = BeautifulSoup(main_html or "", "html.parser")
-    cands = []
-    for ifr in soup.find_all("iframe"):
-        src = ifr.get("src", "")
-        if any(s in src for s in CAND_SUBSTR):
-            cands.append(urljoin(main_url, src))
-    for a in soup.find_all("a"):
-        href = a.get("href", "")
-        txt = a.get_text(" ", strip=True).lower()
-        if (
-            any(s.lower() in href for s in CAND_SUBSTR)
-            or "metin" in txt
-            or "içerik" in txt
-            or "icerik" in txt
+_CAND_RE = re.compile("|".join(map(re.escape, CAND_SUBSTR)), re.I)
+_LINK_TXT_RE = re.compile(r"metin|i[çc]erik", re.I)
+
+
+def _scan_links(main_html: str) -> Tuple[List[str], List[str]]:
+    """Collect candidate ``<iframe src>`` and ``<a href>`` values in one streaming pass."""
+    frames: List[str] = []
+    links: List[str] = []
+    if not main_html:
+        return frames, links
+    source = io.BytesIO(main_html.encode("utf-8"))
+    try:
+        for _, el in etree.iterparse(
+            source, events=("end",), tag=("iframe", "a"), html=True, encoding="utf-8"
         ):
-            cands.append(urljoin(main_url, href))
-    base = [
-        f"{BASE}/MevzuatMetin/{row.mevzuat_tur}.{row.mevzuat_tertip}.{row.mevzuat_no}",
-        f"{BASE}/MevzuatMetin/{row.mevzuat_tur}.{row.mevzuat_tertip}.{row.mevzuat_no}.html",
-        f"{BASE}/MevzuatMetin/{row.mevzuat_tur}.{row.mevzuat_tertip}.{row.mevzuat_no}.htm",
-        f"{BASE}/Metin/{row.mevzuat_tur}.{row.mevzuat_tertip}.{row.mevzuat_no}.html",
-        f"{BASE}/Metin/{row.mevzuat_tur}.{row.mevzuat_tertip}.{row.mevzuat_no}.htm",
-    ]
-    seen = set()
-    uniq = []
-    for u in list(cands) + base:
-        if u and u not in seen:
-            uniq.append(u)
-            seen.add(u)
-    return uniq
+            if el.tag == "iframe":
+                src = el.get("src") or ""
+                if _CAND_RE.search(src):
+                    frames.append(src)
+            else:
+                href = el.get("href") or ""
+                # Only walk the anchor's text when the cheap href test fails.
+                if _CAND_RE.search(href) or any(_LINK_TXT_RE.search(t) for t in el.itertext()):
+                    links.append(href)
+            el.clear()
+    except etree.LxmlError:
+        pass
+    return frames, links
+
+
+@functools.lru_cache(maxsize=256)
+def _template_urls(tur: str, tertip: str, no: str) -> Tuple[str, ...]:
+    return (
+        f"{BASE}/MevzuatMetin/{tur}.{tertip}.{no}",
+        f"{BASE}/MevzuatMetin/{tur}.{tertip}.{no}.html",
+        f"{BASE}/MevzuatMetin/{tur}.{tertip}.{no}.htm",
+        f"{BASE}/Metin/{tur}.{tertip}.{no}.html",
+        f"{BASE}/Metin/{tur}.{tertip}.{no}.htm",
+    )
+
+
+def discover_content_urls(main_html: str, main_url: str, row: MevzuatRow) -> List[str]:
+    frames, links = _scan_links(main_html)
+    # iframes first: they usually embed the article text directly
+    cands = [urljoin(main_url, u) for u in frames + links]
+    base = _template_urls(row.mevzuat_tur, row.mevzuat_tertip, row.mevzuat_no)
+    return [u for u in dict.fromkeys(cands + list(base)) if u]
 
 
 def html_to_text(soup: BeautifulSoup) -> str:
@@ -247,157 +376,285 @@ def html_to_text(soup: BeautifulSoup) -> str:
     node = candidates[0] if candidates else (soup.body or soup)
     text = node.get_text("\n", strip=True)
     text = unicodedata.normalize("NFC", text)
-    text = re.sub(r"\xa0", " ", text)
-    text = re.sub(r"[ \t]+", " ", text)
-    text = re.sub(r"\n{2,}", "\n", text)
+    text = _NBSP_RE.sub(" ", text)
+    text = _WS_RE.sub(" ", text)
+    text = _NL_RE.sub("\n", text)
     return text
 
 
-MADDE_HDR = re.compile(r"(?:(?<=\n)|^)\s*(MADDE)\s+(\d+[A-Z]?)\s*[–\-—:]?\s*", flags=re.IGNORECASE)
-PARAGRAPH_HDR = re.compile(r"(?:(?<=\n)|^)\s*\((\d+)\)\s*")
-BENT_HDR = re.compile(r"(?:(?<=\n)|^)\s*([a-zçğıöşü])\)\s*", flags=re.IGNORECASE)
+# Article ("MADDE 5"), paragraph ("(1)") and sub-clause ("a)") headers in one
+# alternation so the text is scanned once. A lower-level header may follow the
+# one before it on the same line, e.g. "MADDE 1 – (1) a) ...".
+SECTION_HDR = re.compile(
+    r"(?:(?<=\n)|^)\s*"
+    r"(?:(?P<mh>MADDE\s+(?P<madde>\d+[A-Z]?)\s*[–\-—:]?\s*)|(?=\(\d+\)|[a-zçğıöşü]\)))"
+    r"(?P<ph>\((?P<para>\d+)\)\s*)?"
+    r"(?P<bh>(?P<bent>[a-zçğıöşü])\)\s*)?",
+    flags=re.IGNORECASE,
+)
+_SECTION_PARTS = (("mh", "madde"), ("ph", "para"), ("bh", "bent"))
 
 
-def split_by(regex, text: str):
-    items = []
-    last_end = 0
-    last_key = None
-    for m in regex.finditer(text):
+def scan_sections(text: str) -> List[tuple]:
+    """Return ``(kind, key, header_start, body_start)`` for every header in document order."""
+    parts = []
+    for m in SECTION_HDR.finditer(text):
         start = m.start()
-        if last_key is not None:
-            items.append((last_key, text[last_end:start].strip()))
-        key = m.group(m.lastindex or 1)
-        last_key = key
-        last_end = m.end()
-    if last_key is not None:
-        items.append((last_key, text[last_end:].strip()))
-    return items
+        for hdr, kind in _SECTION_PARTS:
+            if m.group(hdr) is None:
+                continue
+            parts.append((kind, m.group(kind), start, m.end(hdr)))
+            start = m.end(hdr)
+    return parts
 
 
 def parse_full_text(html: str) -> Dict:
-    soup = BeautifulSoup(html or "", "html.parser")
+    soup = BeautifulSoup(html or "", "lxml")
     text = html_to_text(soup)
     articles_out = []
     flat_index = {}
-    madde_blocks = split_by(MADDE_HDR, text)
-    for madde_no, madde_chunk in madde_blocks:
-        article = {"madde_no": str(madde_no), "baslik": None, "paragraflar": []}
-        first_line = madde_chunk.split("\n", 1)[0].strip()
+    # Linear state machine over the header stream. An article without "(n)"
+    # headers gets an implicit paragraph "1"; it is dropped as soon as an
+    # explicit paragraph shows up.
+    article = None
+    body_start = 0
+    paras: List[Dict] = []
+    implicit = None
+    parag = None
+    owner = None  # dict whose "metin" receives the currently open text segment
+    seg_start = 0
+
+    def finish_paragraph(p: Dict) -> None:
+        ref = f"MADDE {article['madde_no']}/{p['no']}"
+        if p["bentler"]:
+            p["metin"] = p["metin"] or None
+            for bent in p["bentler"]:
+                flat_index[f"{ref}-{bent['no']}"] = bent["metin"]
+        else:
+            flat_index[ref] = p["metin"]
+
+    def finish_article(end: int) -> None:
+        nl = text.find("\n", body_start, end)
+        first_line = text[body_start : nl if nl != -1 else end].strip()
         if " (1)" not in first_line:
             maybe = first_line.split(".")[0]
             if 2 < len(maybe) < 160:
                 article["baslik"] = maybe
-        para_blocks = split_by(PARAGRAPH_HDR, madde_chunk) or [("1", madde_chunk)]
-        for p_no, p_chunk in para_blocks:
-            parag = {"no": str(p_no), "metin": None, "bentler": []}
-            m = BENT_HDR.search(p_chunk)
-            if m:
-                if m.start() > 0:
-                    parag["metin"] = p_chunk[: m.start()].strip() or None
-                for b_no, b_txt in split_by(BENT_HDR, p_chunk):
-                    bkey = b_no.lower()
-                    btext = b_txt.strip()
-                    parag["bentler"].append({"no": bkey, "metin": btext})
-                    flat_index[f"MADDE {article['madde_no']}/{parag['no']}-{bkey}"] = btext
-            else:
-                parag["metin"] = p_chunk.strip()
-                flat_index[f"MADDE {article['madde_no']}/{parag['no']}"] = parag["metin"]
-            article["paragraflar"].append(parag)
+        finish_paragraph(parag if paras else implicit)
+        article["paragraflar"] = paras or [implicit]
         articles_out.append(article)
+
+    for kind, key, hdr_start, hdr_end in scan_sections(text):
+        if owner is not None:
+            owner["metin"] = text[seg_start:hdr_start].strip()
+        if kind == "madde":
+            if article is not None:
+                finish_article(hdr_start)
+            article = {"madde_no": str(key), "baslik": None, "paragraflar": []}
+            body_start = hdr_end
+            paras = []
+            implicit = parag = owner = {"no": "1", "metin": None, "bentler": []}
+        elif article is None:
+            owner = None
+            continue
+        elif kind == "para":
+            if paras:
+                finish_paragraph(parag)
+            parag = owner = {"no": key, "metin": None, "bentler": []}
+            paras.append(parag)
+        else:
+            owner = {"no": key.lower(), "metin": ""}
+            parag["bentler"].append(owner)
+        seg_start = hdr_end
+    if owner is not None:
+        owner["metin"] = text[seg_start:].strip()
+    if article is not None:
+        finish_article(len(text))
     return {"articles": articles_out, "flat": flat_index}
 
 
-def update_item(state: Dict, row: MevzuatRow, timeout: float, full: bool) -> None:
+def _sort_key(ref: str):
+    m = _SORTKEY_RE.match(ref)
+    if not m:
+        return (10**9, 10**9, "zzz")
+    art = int(m.group(1))
+    par = int(m.group(2))
+    bent = m.group(3) or ""
+    return (art, par, bent)
+
+
+def _tried_entry(url: str, r: Dict) -> Dict:
+    return {
+        "url": url,
+        "status": r.get("status"),
+        "code": r.get("code"),
+        "ct": r.get("content_type"),
+    }
+
+
+def _conditional_headers(item: RegulationItem) -> Dict[str, str]:
+    headers = {}
+    if item.etag:
+        headers["If-None-Match"] = item.etag
+    if item.last_modified:
+        headers["If-Modified-Since"] = item.last_modified
+    return headers
+
+
+def _is_article_page(r: Dict) -> bool:
+    if r["status"] != "ok":
+        return False
+    ct = r.get("content_type", "")
+    h = r.get("html") or ""
+    if "text/html" in ct or "application/xhtml" in ct or ct == "":
+        return ("MADDE" in h) or ("Madde" in h)
+    return False
+
+
+async def probe_candidates(
+    client: httpx.AsyncClient, candidates: List[str], timeout: float, tried: List[Dict]
+) -> Optional[Dict]:
+    """Fetch all candidate URLs concurrently and return the first (in priority order) with article text."""
+    tasks = [asyncio.ensure_future(http_get(client, cand, timeout)) for cand in candidates]
+    found = None
+    try:
+        for cand, task in zip(candidates, tasks):
+            r = await task
+            tried.append(_tried_entry(cand, r))
+            if _is_article_page(r):
+                found = r
+                break
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+    return found
+
+
+def parse_regulation(html: str) -> Tuple[List[Dict], List[Dict]]:
+    """CPU-bound half of ``update_item``: articles plus the sorted flat ref list."""
+    parsed = parse_full_text(html)
+    flat_list = [{"ref": ref, "text": text} for ref, text in parsed["flat"].items()]
+    flat_list.sort(key=lambda x: _sort_key(x["ref"]))
+    return parsed["articles"], flat_list
+
+
+async def resolve_content(
+    client: httpx.AsyncClient,
+    main: Dict,
+    url: str,
+    row: MevzuatRow,
+    timeout: float,
+    tried: List[Dict],
+) -> Tuple[str, str, str, Dict]:
+    """Pick the page holding the article text: (url, html, used_from, response)."""
+    main_url = main.get("final_url") or url
+    main_html = main.get("html") or ""
+    if "MADDE" in main_html or "Madde" in main_html:
+        return main_url, main_html, "landing", main
+    # Only landing pages without article text need the link scan.
+    candidates = discover_content_urls(main_html, main_url, row)
+    probe = await probe_candidates(client, candidates, timeout, tried)
+    if probe is not None and probe.get("html"):
+        return probe.get("final_url"), probe["html"], "probe", probe
+    return main_url, main_html, "fallback", main
+
+
+async def update_item(
+    client: httpx.AsyncClient,
+    state: Dict,
+    row: MevzuatRow,
+    timeout: float,
+    full: bool,
+    pool: Optional[Executor] = None,
+) -> None:
     key = row.key
     url = row.url
     now = _utc_now()
     items = state.setdefault("items", {})
-    search_index = state.setdefault("search_index", {})
-    item = items.setdefault(key, {})
-    item.update(
-        {
-            "mevzuat_no": row.mevzuat_no,
-            "mevzuat_tur": row.mevzuat_tur,
-            "mevzuat_tertip": row.mevzuat_tertip,
-            "mevzuat_adi": row.mevzuat_adi,
-            "url": url,
-            "last_checked": now,
-            "status": item.get("status", "unknown"),
-        }
-    )
-    item.setdefault("last_changed", now)
-    item.setdefault("content_hash", None)
-    item.setdefault("final_url", None)
-    item.setdefault("meta", {})
-    item.setdefault("maddeler", [])
-    item.setdefault("maddeler_flat", [])
-    item.setdefault("debug", {}).setdefault("tried_urls", [])
-    main = http_get(url, timeout)
-    item["debug"]["tried_urls"].append(
-        {
-            "url": url,
-            "status": main.get("status"),
-            "code": main.get("code"),
-            "ct": main.get("content_type"),
-        }
-    )
-    candidates = discover_content_urls(
-        main.get("html", "") or "", main.get("final_url") or url, row
-    ) or discover_content_urls("", url, row)
-    used_html = ""
-    used_url = main.get("final_url") or url
-    used_from = "landing"
-    if "MADDE" in (main.get("html") or "") or "Madde" in (main.get("html") or ""):
-        used_html = main.get("html") or ""
+    item = items.get(key)
+    if item is None:
+        item = items[key] = RegulationItem(last_changed=now)
+    item.mevzuat_no = row.mevzuat_no
+    item.mevzuat_tur = row.mevzuat_tur
+    item.mevzuat_tertip = row.mevzuat_tertip
+    item.mevzuat_adi = row.mevzuat_adi
+    item.url = url
+    item.last_checked = now
+    tried = item.debug.tried_urls
+    validators = _conditional_headers(item)
+    check = None
+    if validators and item.final_url and (item.maddeler or not full):
+        check = await http_get(client, item.final_url, timeout, headers=validators)
+        tried.append(_tried_entry(item.final_url, check))
+        if check.get("code") == 304:
+            item.status = "ok"
+            item.debug.used_from = "not_modified"
+            return
+        if check.get("status") != "ok" or check.get("code") != 200:
+            check = None
+    # A 200 revalidation (server ignored the validators) already carries the page;
+    # reuse it instead of downloading the same document again.
+    if check is not None and item.final_url != url and _is_article_page(check):
+        used_url = check.get("final_url") or item.final_url
+        used_html, used_from, used_resp = check.get("html") or "", "probe", check
     else:
-        for cand in candidates:
-            r = http_get(cand, timeout)
-            item["debug"]["tried_urls"].append(
-                {
-                    "url": cand,
-                    "status": r.get("status"),
-                    "code": r.get("code"),
-                    "ct": r.get("content_type"),
-                }
-            )
-            if r["status"] != "ok":
-                continue
-            ct = r.get("content_type", "")
-            h = r.get("html") or ""
-            if "text/html" in ct or "application/xhtml" in ct or ct == "":
-                if ("MADDE" in h) or ("Madde" in h):
-                    used_url, used_html, used_from = r.get("final_url"), h, "probe"
-                    break
-    if not used_html:
-        used_html = main.get("html") or ""
-        used_url = main.get("final_url") or url
-        used_from = "fallback"
-    content_bytes = (used_html or "").encode("utf-8", errors="ignore")
-    new_hash = hashlib.sha256(content_bytes).hexdigest()
-    if item.get("content_hash") != new_hash:
-        item["last_changed"] = now
-        item["content_hash"] = new_hash
-    item["final_url"] = used_url
-    item["status"] = "ok"
-    item["debug"]["used_from"] = used_from
+        if check is not None and item.final_url == url:
+            main = check
+        else:
+            main = await http_get(client, url, timeout)
+            tried.append(_tried_entry(url, main))
+        used_url, used_html, used_from, used_resp = await resolve_content(
+            client, main, url, row, timeout, tried
+        )
+    new_hash = used_resp.get("hash")
+    old_hash = item.content_hash
+    unchanged = old_hash == new_hash
+    if not unchanged:
+        # An unknown previous hash (new or migrated item) is not a content change.
+        if old_hash is not None:
+            item.last_changed = now
+        item.content_hash = new_hash
+    item.final_url = used_url
+    item.etag = used_resp.get("etag")
+    item.last_modified = used_resp.get("last_modified")
+    item.status = "ok"
+    item.debug.used_from = used_from
+    if unchanged and item.maddeler:
+        return
     if full and used_html:
-        parsed = parse_full_text(used_html)
-        item["maddeler"] = parsed["articles"]
-        flat_list = [{"ref": ref, "text": text} for ref, text in parsed["flat"].items()]
+        if pool is not None:
+            loop = asyncio.get_running_loop()
+            articles, flat_list = await loop.run_in_executor(pool, parse_regulation, used_html)
+        else:
+            articles, flat_list = parse_regulation(used_html)
+        item.maddeler = articles
+        item.maddeler_flat = flat_list
+
+
+async def update_all(
+    state: Dict,
+    rows: List[MevzuatRow],
+    timeout: float,
+    full: bool,
+    concurrency: int,
+    workers: Optional[int] = None,
+) -> None:
+    sem = asyncio.Semaphore(max(1, concurrency))
+    # Full-text parsing is CPU-bound; fan it out to worker processes so the
+    # event loop keeps fetching while pages are parsed.
+    pool = ProcessPoolExecutor(max_workers=workers) if full and workers != 0 else None
+
+    async def _run(client: httpx.AsyncClient, row: MevzuatRow) -> None:
+        async with sem:
+            await update_item(client, state, row, timeout=timeout, full=full, pool=pool)
 
-        def _sort_key(_ref: str):
-            m = re.match(r"^MADDE\s+(\d+)[A-Z]?/(\d+)(?:-([a-zçğıöşü]))?$", _ref, flags=re.I)
-            if not m:
-                return (10**9, 10**9, "zzz")
-            art = int(m.group(1))
-            par = int(m.group(2))
-            bent = m.group(3) or ""
-            return (art, par, bent)
-
-        flat_list.sort(key=lambda x: _sort_key(x["ref"]))
-        item["maddeler_flat"] = flat_list
-        for ref, text in parsed["flat"].items():
-            search_index[f"{key}::{ref}"] = {"key": key, "ref": ref, "text": text}
+    try:
+        async with build_client(timeout) as client:
+            await asyncio.gather(*(_run(client, row) for row in rows))
+    finally:
+        if pool is not None:
+            pool.shutdown()
 
 
 def main() -> None:
@@ -409,17 +666,31 @@ def main() -> None:
     p.add_argument("--only", nargs="*")
     p.add_argument("--timeout", type=float, default=30.0)
     p.add_argument("--full", action="store_true")
+    p.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY)
+    p.add_argument(
+        "--workers", type=int, default=None, help="Parse processes for --full (0 = in-process)"
+    )
+    p.add_argument("--pretty", action="store_true", help="Indent the JSON output (debugging)")
     a = p.parse_args()
     rows = [r for r in read_table(a.input) if r.mevzuat_no and r.mevzuat_no.lower() != "tbd"]
     if a.only:
         wanted = set(a.only)
         rows = [r for r in rows if r.mevzuat_no in wanted]
     state = load_state(a.output)
-    for row in rows:
-        update_item(state, row, timeout=a.timeout, full=a.full)
+    asyncio.run(
+        update_all(
+            state,
+            rows,
+            timeout=a.timeout,
+            full=a.full,
+            concurrency=a.concurrency,
+            workers=a.workers,
+        )
+    )
     state["last_run"] = _utc_now()
     state["registry_size"] = len(rows)
-    store_state(a.output, state)
+    state["search_index"] = build_search_index(state.get("items", {}))
+    store_state(a.output, state, pretty=a.pretty)
 
 
 if __name__ == "__main__":
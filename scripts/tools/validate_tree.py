@@ -1,6 +1,10 @@
+import os
 import re
 from pathlib import Path
 
+# Allow only A-Za-z0-9_- with an optional single extension
+_VALID_NAME = re.compile(r"^[A-Za-z0-9_-]+(\.[A-Za-z0-9_-]+)?$").fullmatch
+
 
 def validate_tree(root_path: str) -> None:
     """Validate directory tree for FFMP compliance."""
@@ -10,17 +14,20 @@ def validate_tree(root_path: str) -> None:
         return
 
     invalid_files = []
-    for file_path in root.rglob("*"):
-        if file_path.is_file():
-            filename = file_path.name
-            # Check for invalid characters (allow only A-Za-z0-9_-)
-            if not re.match(r"^[A-Za-z0-9_-]+(\.[A-Za-z0-9_-]+)?$", filename):
-                invalid_files.append(str(file_path))
+    stack = [str(root)]
+    while stack:
+        try:
+            with os.scandir(stack.pop()) as it:
+                for entry in it:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                    elif entry.is_file() and not _VALID_NAME(entry.name):
+                        invalid_files.append(entry.path)
+        except OSError:
+            continue
 
     if invalid_files:
-        print("Invalid filenames found:")
-        for f in invalid_files:
-            print(f"  - {f}")
+        print("Invalid filenames found:\n" + "\n".join(f"  - {f}" for f in invalid_files))
     else:
         print("Tree is FFMP compliant.")
 
@@ -32,4 +39,3 @@ if __name__ == "__main__":
         print("Usage: python validate_tree.py <root_path>")
         sys.exit(1)
     validate_tree(sys.argv[1])
-    validate_tree(sys.argv[1])
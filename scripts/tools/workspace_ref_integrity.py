@@ -1,7 +1,10 @@
 import json
 import os
+import re
 from pathlib import Path
 
+import numpy as np
+
 ROOT = Path(__file__).resolve().parents[2]  # ai4ohs-hybrid
 INTERACTION_MAP = ROOT / "logs" / "workspace-interaction-map.json"
 REPORT_OUT = ROOT / "logs" / "workspace-ref-report.json"
@@ -28,6 +31,15 @@ SEPARATE_DOMAIN_PREFIXES = (
 )
 
 
+def _prefix_matcher(prefixes):
+    """Tek bir anchored alternation ile prefix kontrolü (tuple startswith yerine)."""
+    return re.compile("|".join(re.escape(p) for p in prefixes)).match
+
+
+_is_core = _prefix_matcher(CORE_PREFIXES)
+_is_separate_domain = _prefix_matcher(SEPARATE_DOMAIN_PREFIXES)
+
+
 def load_interaction_map():
     if not INTERACTION_MAP.exists():
         raise FileNotFoundError(f"Map not found: {INTERACTION_MAP}")
@@ -68,34 +80,29 @@ def classify_files(structure_map: dict):
     if not nodes and not edges:
         raise ValueError("Interaction map contains no nodes/edges after normalization.")
 
-    in_deg = {n: 0 for n in nodes}
-    out_deg = {n: 0 for n in nodes}
-
-    for e in edges:
-        src = e["from"]
-        tgt = e["to"]
-        if src in out_deg:
-            out_deg[src] += 1
-        if tgt in in_deg:
-            in_deg[tgt] += 1
+    # Düğümlere integer id ver; dereceleri dict yerine numpy dizilerinde say
+    ids = {p: i for i, p in enumerate(nodes)}
+    src_ids = [i for i in (ids.get(e["from"]) for e in edges) if i is not None]
+    tgt_ids = [i for i in (ids.get(e["to"]) for e in edges) if i is not None]
+    out_deg = np.bincount(np.asarray(src_ids, dtype=np.intp), minlength=len(ids))
+    in_deg = np.bincount(np.asarray(tgt_ids, dtype=np.intp), minlength=len(ids))
+    scores = (in_deg + out_deg).tolist()
 
     core_files = []
     candidate_integrate = []
     candidate_prune = []
 
-    for path in nodes:
+    for path, score in zip(nodes, scores):
         # Sadece .py dosyalara odaklan
         if not path.endswith(".py"):
             continue
 
-        score = in_deg[path] + out_deg[path]
-
-        if path.startswith(SEPARATE_DOMAIN_PREFIXES):
+        if _is_separate_domain(path):
             # farklı domain
             candidate_prune.append({"path": path, "reason": "separate_domain", "score": score})
             continue
 
-        if path.startswith(CORE_PREFIXES):
+        if _is_core(path):
             if score > 0:
                 core_files.append({"path": path, "score": score})
             else:
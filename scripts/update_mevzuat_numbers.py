@@ -2,12 +2,15 @@
 # Optimized for error handling, atomic writes, and performance.
 
 import argparse
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import Dict, List, Optional, Tuple
 
 from selenium import webdriver
 from selenium.webdriver.chrome.options import Options
+from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.support.ui import WebDriverWait
@@ -29,8 +32,8 @@ def build_driver(headless=True, timeout=60):
     opts.add_argument("--no-sandbox")
     opts.add_argument("--disable-dev-shm-usage")
     opts.add_argument(f"--user-agent={UA}")
-    service = Service(ChromeDriverManager().install())
-    driver = webdriver.Chrome(service=service, options=opts)
+    # Selenium Manager resolves a matching chromedriver when no path is given.
+    driver = webdriver.Chrome(service=Service(), options=opts)
     driver.set_page_load_timeout(timeout)
     driver.implicitly_wait(0)
     return driver
@@ -84,6 +87,43 @@ def parse_first_page(driver, query_title: str) -> Tuple[Optional[str], Optional[
         return None, None, "error"
 
 
+def search_titles(
+    titles: List[str], headless: bool, delay: float, workers: int = 4
+) -> Dict[str, Tuple[Optional[str], Optional[str], str]]:
+    """Search titles in parallel; each worker thread owns its own Chrome driver."""
+    local = threading.local()
+    drivers = []
+    lock = threading.Lock()
+
+    def _driver():
+        driver = getattr(local, "driver", None)
+        if driver is None:
+            driver = build_driver(headless=headless)
+            with lock:
+                drivers.append(driver)
+            open_search(driver)
+            local.driver = driver
+        return driver
+
+    def _search(title: str) -> Tuple[Optional[str], Optional[str], str]:
+        try:
+            driver = _driver()
+        except Exception as e:
+            print(f"Driver startup failed for {title}: {e}")
+            return None, None, "error"
+        perform_search(driver, title, "", delay)
+        result = parse_first_page(driver, title)
+        time.sleep(delay)
+        return result
+
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+            return dict(zip(titles, pool.map(_search, titles)))
+    finally:
+        for driver in drivers:
+            driver.quit()
+
+
 def update_table_line(
     line: str, title_to_no: Dict[str, Tuple[str, Optional[str]]], convert_tur_to_code: bool = True
 ) -> str:
@@ -108,6 +148,7 @@ def main():
     ap.add_argument("--md", required=True, help="Markdown file")
     ap.add_argument("--headless", action="store_true")
     ap.add_argument("--delay", type=float, default=1.0)
+    ap.add_argument("--workers", type=int, default=4, help="Parallel browser sessions")
     args = ap.parse_args()
 
     md_path = Path(args.md)
@@ -117,23 +158,13 @@ def main():
     lines = md_path.read_text(encoding="utf-8").splitlines()
     title_to_no = {}
 
-    # Setup driver
-    options = Options()
-    if args.headless:
-        options.add_argument("--headless")
-    driver = webdriver.Chrome(options=options)
-
-    try:
-        # Process titles (simplified)
-        for title in ["Example Title"]:  # Replace with actual extraction
-            perform_search(driver, title, "", args.delay)
-            mev_no, tertip, status = parse_first_page(driver, title)
-            if mev_no:
-                title_to_no[title.lower()] = (mev_no, tertip)
-                print(f"OK: {title} -> {mev_no}")
-            time.sleep(args.delay)
-    finally:
-        driver.quit()
+    # Process titles (simplified)
+    titles = ["Example Title"]  # Replace with actual extraction
+    results = search_titles(titles, headless=args.headless, delay=args.delay, workers=args.workers)
+    for title, (mev_no, tertip, status) in results.items():
+        if mev_no:
+            title_to_no[title.lower()] = (mev_no, tertip)
+            print(f"OK: {title} -> {mev_no}")
 
     # Update table (simplified)
     try:
@@ -1,9 +1,127 @@
-import time
+import copy
+import logging
+import logging.handlers
+import os
+import sys
+import threading
+import weakref
 from pathlib import Path
-from typing import Any, Dict, Optional
+from typing import Any, Dict, Optional, Tuple
 
 import yaml
 
+try:  # libyaml-backed parser when PyYAML was built against it
+    from yaml import CSafeLoader as _YamlLoader
+except ImportError:  # pragma: no cover
+    from yaml import SafeLoader as _YamlLoader
+
+try:  # content digest for settings.yaml change detection
+    from xxhash import xxh3_64_intdigest as _digest
+except ImportError:  # pragma: no cover
+    from zlib import crc32 as _digest
+
+try:  # event-driven settings.yaml reload (inotify / ReadDirectoryChangesW)
+    from watchfiles import watch as _watch
+except ImportError:  # pragma: no cover
+    _watch = None
+
+# Shared "ace" logger for ACEConfig/ACEExecutor. Records are buffered and written to
+# stdout in batches: on ERROR, when 256 records pile up, or via flush_logs().
+logger = logging.getLogger("ace")
+if not logger.handlers:
+    _stream = logging.StreamHandler(sys.stdout)
+    _stream.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(
+        logging.handlers.MemoryHandler(capacity=256, flushLevel=logging.ERROR, target=_stream)
+    )
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+
+def flush_logs() -> None:
+    """Write out buffered ACE log records."""
+    for handler in logger.handlers:
+        handler.flush()
+
+
+_VALID_PROFILES = frozenset({"FAST_SAFE", "BALANCED", "DEEP"})
+
+# resolved path -> (st_mtime_ns, st_size, content digest, parsed settings.yaml);
+# shared across instances, only the latest version of each file is kept
+_YAML_CACHE: Dict[str, Tuple[int, int, int, Dict[str, Any]]] = {}
+
+
+class _SettingsWatcher:
+    """
+    One background watchfiles thread per settings.yaml, shared by every ACEConfig
+    loading that file. Subscribers are held weakly; the thread exits on the first
+    event after the last subscriber is gone (or when unsubscribed to zero).
+    """
+
+    _registry: Dict[str, "_SettingsWatcher"] = {}
+    _registry_lock = threading.Lock()
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self.key = os.path.normcase(str(path))
+        self.active = True
+        self._subscribers: "weakref.WeakSet[ACEConfig]" = weakref.WeakSet()
+        self._stop = threading.Event()
+        threading.Thread(target=self._loop, name="ace-config-watch", daemon=True).start()
+
+    @classmethod
+    def subscribe(cls, config: "ACEConfig") -> "_SettingsWatcher":
+        path = config.settings_file.resolve()
+        key = os.path.normcase(str(path))
+        with cls._registry_lock:
+            watcher = cls._registry.get(key)
+            if watcher is None or not watcher.active:
+                watcher = cls._registry[key] = cls(path)
+            watcher._subscribers.add(config)
+        return watcher
+
+    def unsubscribe(self, config: "ACEConfig") -> None:
+        with self._registry_lock:
+            self._subscribers.discard(config)
+            if not self._subscribers:
+                self._retire()
+
+    def _retire(self) -> None:
+        # _registry_lock tutulurken çağrılır
+        self._stop.set()
+        if self._registry.get(self.key) is self:
+            del self._registry[self.key]
+
+    def _loop(self) -> None:
+        def _is_settings(_change, path: str) -> bool:
+            return os.path.normcase(path) == self.key
+
+        try:
+            for _changes in _watch(
+                self.path.parent,
+                watch_filter=_is_settings,
+                stop_event=self._stop,
+                recursive=False,
+                raise_interrupt=False,
+            ):
+                with self._registry_lock:
+                    subscribers = list(self._subscribers)
+                    if not subscribers:
+                        self._retire()
+                        break
+                for config in subscribers:
+                    config._dirty = True
+        except Exception as exc:  # noqa: BLE001
+            logger.warning(
+                f"[ACEConfig][WARN] settings.yaml watcher stopped, polling instead: {exc}"
+            )
+        finally:
+            # Watcher durduysa auto_sync her çağrıda stat ile kontrol etsin
+            self.active = False
+            with self._registry_lock:
+                if self._registry.get(self.key) is self:
+                    del self._registry[self.key]
+
 
 class ACEConfig:
     """
@@ -24,42 +142,102 @@ class ACEConfig:
             raise FileNotFoundError(f"settings.yaml bulunamadı: {self.settings_file}")
 
         self.raw: Dict[str, Any] = {}
-        self.last_loaded_timestamp = 0
+        # profile name -> (ace overrides, fers overrides), rebuilt on every load()
+        self._profile_table: Dict[str, Tuple[Dict[str, Any], Dict[str, Any]]] = {}
+        self.last_loaded_mtime_ns: int = 0
+        # Digest of the loaded settings.yaml bytes; merge/validation are skipped while
+        # the (digest, profile) they last ran for is unchanged
+        self._raw_digest: Optional[int] = None
+        self._applied: Optional[Tuple[int, str]] = None
+        self._validated_digest: Optional[int] = None
+
+        # File watcher state; without watchfiles auto_sync falls back to stat polling
+        self._dirty = False
+        self._watcher: Optional[_SettingsWatcher] = None
 
         # Load settings.yaml (first read)
         self.load()
+        self._start_watcher()
 
         # Apply profile logic (global_profile or profile_override)
         self.apply_profile(profile_override)
 
         # Optional: validate schema
         self.validate_schema()
+        flush_logs()
 
     # ------------------------------------------------------------------
     # YAML Loader + Auto-Sync
     # ------------------------------------------------------------------
-    def load(self):
-        """Load settings.yaml into ACEConfig.raw"""
-        with open(self.settings_file, "r", encoding="utf-8") as f:
-            self.raw = yaml.safe_load(f) or {}
+    def load(self) -> bool:
+        """
+        Load settings.yaml into ACEConfig.raw (cached while the file is unchanged).
+        Returns False when the file content is byte-identical to what is already loaded.
+        """
+        st = self.settings_file.stat()
+        path = str(self.settings_file.resolve())
+        cached = _YAML_CACHE.get(path)
+        if cached is None or cached[:2] != (st.st_mtime_ns, st.st_size):
+            data = self.settings_file.read_bytes()
+            cached = (
+                st.st_mtime_ns,
+                st.st_size,
+                _digest(data),
+                yaml.load(data, Loader=_YamlLoader) or {},
+            )
+            # Aynı dosyanın eski sürümü yerine yazılır; cache dosya başına tek kayıt tutar
+            _YAML_CACHE[path] = cached
+
+        self.last_loaded_mtime_ns = st.st_mtime_ns
+        digest, parsed = cached[2:]
+        if digest == self._raw_digest:
+            # Sadece mtime değişmiş (touch, checkout); raw ve merge sonucu geçerli
+            return False
 
-        self.last_loaded_timestamp = time.time()
-        print(f"[ACEConfig] settings.yaml loaded at {self.last_loaded_timestamp}")
+        # apply_profile() mutates raw in place; keep the cached dict pristine
+        self.raw = copy.deepcopy(parsed)
+        self._raw_digest = digest
+        self._profile_table = {
+            name: (block.get("ace") or {}, block.get("fers") or {})
+            for name, block in (self.raw.get("profiles") or {}).items()
+            if isinstance(block, dict)
+        }
+
+        logger.info(f"[ACEConfig] settings.yaml loaded at {self.last_loaded_mtime_ns}")
+        return True
 
     def auto_sync(self):
         """
         Automatically reload settings.yaml when modified.
         ACEExecutor will call this periodically.
         """
+        if self._watcher is not None and self._watcher.active:
+            # Watcher aktif: değişiklik bildirilmediyse stat çağrısı bile yapma
+            if not self._dirty:
+                return
+            self._dirty = False
         try:
-            mtime = self.settings_file.stat().st_mtime
-            if mtime > self.last_loaded_timestamp:
-                print("[ACEConfig] settings.yaml changed → reloading…")
-                self.load()
-                self.apply_profile()
+            mtime_ns = self.settings_file.stat().st_mtime_ns
+            if mtime_ns != self.last_loaded_mtime_ns:
+                if self.load():
+                    logger.info("[ACEConfig] settings.yaml changed → reloaded")
+                    self.apply_profile()
+                    self.validate_schema()
         except FileNotFoundError:
             pass
 
+    def _start_watcher(self):
+        if _watch is None:
+            return
+        # Aynı settings.yaml için tüm ACEConfig örnekleri tek watcher thread'ini paylaşır
+        self._watcher = _SettingsWatcher.subscribe(self)
+
+    def stop_watching(self):
+        """Unsubscribe from the shared settings.yaml watcher (stops it if last)."""
+        watcher, self._watcher = self._watcher, None
+        if watcher is not None:
+            watcher.unsubscribe(self)
+
     # ------------------------------------------------------------------
     # Profile Resolution
     # ------------------------------------------------------------------
@@ -75,7 +253,7 @@ class ACEConfig:
 
         # Highest priority: CLI override
         if profile_override:
-            print(f"[ACEConfig] CLI override profile: {profile_override}")
+            logger.info(f"[ACEConfig] CLI override profile: {profile_override}")
             self.raw["fers_profile"] = profile_override.upper()
 
         # Determine chosen profile
@@ -83,23 +261,18 @@ class ACEConfig:
 
         selected = selected.upper()
 
-        # Get profile block
-        profiles = self.raw.get("profiles", {})
-        profile_block = profiles.get(selected, {})
-
-        # Ensure ACE & FERS nodes exist
-        self.raw.setdefault("ace", {})
-        self.raw.setdefault("fers", {})
+        # Aynı içerik + aynı profil zaten birleştirildiyse tekrar etme
+        if self._applied == (self._raw_digest, selected):
+            return
+        self._applied = (self._raw_digest, selected)
 
-        # Merge ACE parameters
-        if "ace" in profile_block:
-            self.raw["ace"].update(profile_block["ace"])
+        ace_patch, fers_patch = self._profile_table.get(selected, ({}, {}))
 
-        # Merge FERS parameters
-        if "fers" in profile_block:
-            self.raw["fers"].update(profile_block["fers"])
+        # Ensure ACE & FERS nodes exist, then merge profile parameters
+        self.raw.setdefault("ace", {}).update(ace_patch)
+        self.raw.setdefault("fers", {}).update(fers_patch)
 
-        print(f"[ACEConfig] Using merged profile: {selected}")
+        logger.info(f"[ACEConfig] Using merged profile: {selected}")
 
     # ------------------------------------------------------------------
     # Retrieve ACE or FERS blocks
@@ -118,15 +291,21 @@ class ACEConfig:
         Basic validation to catch malformed config.
         Not strict; only protects against common errors.
         """
+        if self._validated_digest == self._raw_digest:
+            return
+        self._validated_digest = self._raw_digest
+
         if "profiles" not in self.raw:
-            print("[ACEConfig][WARN] profiles block missing in settings.yaml")
+            logger.warning("[ACEConfig][WARN] profiles block missing in settings.yaml")
 
         if "fers" not in self.raw:
-            print("[ACEConfig][WARN] fers block missing in settings.yaml")
+            logger.warning("[ACEConfig][WARN] fers block missing in settings.yaml")
 
         if "ace" not in self.raw:
-            print("[ACEConfig][WARN] ace block missing in settings.yaml")
+            logger.warning("[ACEConfig][WARN] ace block missing in settings.yaml")
 
         if "global_profile" in self.raw:
-            if self.raw["global_profile"] not in ["FAST_SAFE", "BALANCED", "DEEP"]:
-                print(f"[ACEConfig][ERROR] Invalid global_profile: {self.raw['global_profile']}")
+            if self.raw["global_profile"] not in _VALID_PROFILES:
+                logger.error(
+                    f"[ACEConfig][ERROR] Invalid global_profile: {self.raw['global_profile']}"
+                )
@@ -1,14 +1,91 @@
+import atexit
+import hashlib
+import importlib.util
 import json
 import os
+import re
+import select
 import shutil
+import signal
+import stat
 import subprocess
+import sys
+import tempfile
+import threading
 import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, BinaryIO, Dict, FrozenSet, List, Optional, Tuple
 
-from .ace_config import ACEConfig
+from .ace_config import ACEConfig, flush_logs, logger
 from .fers_refactor_planner import FullEvolutionaryRefactorPlanner
 from governance.approval_manager import ApprovalManager
+from utils.jsonio import json_dumps_bytes, json_dumps_pretty, json_loads
+
+# processed_files.jsonl: tampon boyutu ve kaç kayıtta bir flush edileceği
+_PROCESSED_BUFFER_SIZE = 64 * 1024
+_PROCESSED_FLUSH_EVERY = 8
+
+# Keşiften hariç tutulan yollar (tests, sandbox, venv, bytecode cache)
+_EXCLUDE_SEARCH = re.compile(r"/tests/|/test_|sandbox_repo/|\.venv/|__pycache__/").search
+
+# Sandbox'a hardlink'lenen salt-okunur ağaçlar (yalnızca .py); diğer her şey kopyalanır.
+# logs/, data/ vb. testler sırasında yerinde yazılır; hardlink olsaydı ana depoya sızardı.
+_SANDBOX_LINK_TREES = frozenset({"src", "tests"})
+
+# Silinmeyi bekleyen eski sandbox dizinlerinin öneki (project_root altında)
+_TRASH_PREFIX = ".trash-"
+
+# Sandbox testleri için kalıcı pytest worker (fork gerektirir; yoksa subprocess.run)
+_PYTEST_WORKER = Path(__file__).with_name("ace_pytest_worker.py")
+_CAN_FORK = hasattr(os, "fork")
+
+_WRITE_FLAGS = os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, "O_BINARY", 0)
+_HAS_FCHMOD = hasattr(os, "fchmod")
+
+
+def _atomic_write_bytes(target: Path, data: bytes) -> None:
+    """Write data to a sibling temp file with raw os.write, then os.replace it over target."""
+    tmp = target.with_name(f".{target.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        # Mevcut dosyanın izinleri (ör. script'lerde +x) yeni inode'a taşınır
+        mode = stat.S_IMODE(os.stat(target).st_mode)
+    except FileNotFoundError:
+        mode = None
+    fd = os.open(tmp, _WRITE_FLAGS, 0o644)
+    try:
+        try:
+            view = memoryview(data)
+            while view:
+                view = view[os.write(fd, view) :]
+            if mode is not None and _HAS_FCHMOD:
+                os.fchmod(fd, mode)
+        finally:
+            os.close(fd)
+        if mode is not None and not _HAS_FCHMOD:
+            os.chmod(tmp, mode)
+        os.replace(tmp, target)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+
+
+def _file_sha256(path: Path) -> Optional[str]:
+    try:
+        return hashlib.sha256(path.read_bytes()).hexdigest()
+    except FileNotFoundError:
+        return None
+
+
+@dataclass(slots=True, frozen=True)
+class Candidate:
+    """Discovered refactor target; relative POSIX path and size computed once."""
+
+    path: Path
+    rel_posix: str
+    size: int
 
 
 class ACEExecutor:
@@ -22,6 +99,7 @@ class ACEExecutor:
     - Prepare sandbox repo and apply patches there
     - Run pytest in sandbox
     - If tests pass: apply patches to main repo (unless dry-run)
+    - Apply approved ACE_PATCHES proposals; drop staging for applied/rejected ones
     - Track auto-merge threshold via a small state file
     """
 
@@ -60,6 +138,14 @@ class ACEExecutor:
         # Sandbox dizini
         self.sandbox_dir = self.project_root / self.ace_cfg.get("sandbox_dir", "sandbox_repo")
         self.processed_log = self.project_root / "logs" / "ace" / "processed_files.jsonl"
+        # Onay bekleyen patch'lerin staging kökü (karar işlenince alt dizin silinir)
+        self.staging_root = self.project_root / "logs" / "ace" / "staged"
+        # (st_ino, beklenen boyut, paths) – boyut kendi yazdığımız (tamponlu dahil) baytlarla
+        # ilerletilir; dışarıdan ekleme/yeniden yazma olmadıkça log yeniden parse edilmez
+        self._processed_cache: Optional[Tuple[int, int, FrozenSet[str]]] = None
+        # Kalıcı append handle; ilk yazımda açılır, çıkışta flush/close edilir
+        self._processed_fh: Optional[BinaryIO] = None
+        self._processed_pending = 0
 
         # Auto-merge threshold
         self.auto_merge_threshold: int = int(self.ace_cfg.get("auto_merge_threshold", 3))
@@ -68,6 +154,11 @@ class ACEExecutor:
         # Llama / timeout parametreleri
         self.llama_timeout_sec: int = int(self.ace_cfg.get("llama_timeout_sec", 40))
 
+        # Sıcak pytest worker (ilk test koşusunda başlatılır)
+        self._pytest_proc: Optional[subprocess.Popen] = None
+
+        flush_logs()
+
     # ------------------------------------------------------------------
     # PUBLIC ENTRYPOINT
     # ------------------------------------------------------------------
@@ -83,12 +174,24 @@ class ACEExecutor:
            - Apply patches to main repo (if not dry-run)
            - Update auto-merge state
         """
+        try:
+            return self._run_cycle(dry_run)
+        finally:
+            # Döngü boyunca tamponlanan log kayıtlarını tek seferde yaz
+            flush_logs()
+
+    def _run_cycle(self, dry_run: bool) -> Dict[str, Any]:
         # 1) settings.yaml değişmişse yeniden yükle/profili uygula
         self.config.auto_sync()
         self.ace_cfg = self.config.get_ace_block()
         self.fers_cfg = self.config.get_fers_block()
 
-        print("1) Kod analizi + refactor planı oluşturuluyor...")
+        # Önceki döngülerin onaylanan/reddedilen önerileri: uygula veya staging'i temizle.
+        # Dry-run ana depoya hiç dokunmaz; onaylar bir sonraki gerçek döngüde işlenir.
+        if not dry_run:
+            self.process_approval_decisions()
+
+        logger.info("1) Kod analizi + refactor planı oluşturuluyor...")
 
         target_files = self._discover_target_files()
         if not target_files:
@@ -102,16 +205,16 @@ class ACEExecutor:
         patches = self._plan_patches(target_files)
 
         if not patches:
-            print("[ACE] Planner patch üretmedi.")
+            logger.info("[ACE] Planner patch üretmedi.")
             return {
                 "status": "NO_CHANGES",
                 "applied_patches": 0,
             }
 
-        print("2) Sandbox repo hazırlanıyor...")
+        logger.info("2) Sandbox repo hazırlanıyor...")
         self._prepare_sandbox()
 
-        print("3) Patch'ler uygulanıyor...")
+        logger.info("3) Patch'ler uygulanıyor...")
         applied_in_sandbox = self._apply_patches_in_sandbox(patches)
 
         if applied_in_sandbox == 0:
@@ -121,7 +224,7 @@ class ACEExecutor:
                 "errors": "No patches applied in sandbox.",
             }
 
-        print("4) Testler çalıştırılıyor (pytest)...")
+        logger.info("4) Testler çalıştırılıyor (pytest)...")
         test_ok, test_output = self._run_pytest_in_sandbox()
 
         if not test_ok:
@@ -136,7 +239,7 @@ class ACEExecutor:
 
         # Testler başarılı
         if dry_run:
-            print("[ACE] Dry-run modunda: patch'ler main repo'ya uygulanmayacak.")
+            logger.info("[ACE] Dry-run modunda: patch'ler main repo'ya uygulanmayacak.")
             self._update_merge_state(success=True)
             self._log_processed(target_files, status="dry_run_passed", details="pytest_passed")
             return {
@@ -148,8 +251,10 @@ class ACEExecutor:
         # Testler başarılı → main repo'ya uygula
         # Testler basarili ancak auto-apply kapali: onay bekle
         if not self.auto_apply:
+            staging = self.staging_root / uuid.uuid4().hex
             proposal = {
-                "patches": patches,
+                "patches": self._stage_proposal_patches(patches, staging),
+                "staging_dir": str(staging),
                 "sandbox_result": {"applied": applied_in_sandbox, "tests": "passed"},
             }
             approval_id = self.approver.register_proposal(
@@ -181,7 +286,7 @@ class ACEExecutor:
     # ------------------------------------------------------------------
     #  DISCOVER PYTHON FILES
     # ------------------------------------------------------------------
-    def _discover_target_files(self) -> List[Path]:
+    def _discover_target_files(self) -> List[Candidate]:
         """
         Discover target Python files under project_root for refactoring.
         Simple strategy:
@@ -194,40 +299,48 @@ class ACEExecutor:
 
         max_files_raw = self.ace_cfg.get("max_files_per_run", 8)
         max_files = int(max_files_raw) if str(max_files_raw).isdigit() else -1
-        files: List[Path] = []
         processed = self._load_processed_set()
 
-        for path in src_root.rglob("*.py"):
-            rel = path.relative_to(self.project_root)
-            s = str(rel).replace("\\", "/")
-
-            if any(
-                bad in s
-                for bad in (
-                    "/tests/",
-                    "/test_",
-                    "sandbox_repo/",
-                    ".venv/",
-                    "__pycache__/",
-                )
-            ):
-                continue
-
-            size = path.stat().st_size if path.exists() else 0
-            if size == 0:
+        # os.scandir yürüyüşü: DirEntry stat'ı önbellekler, hariç dizinler hiç açılmaz
+        prefix_len = len(str(self.project_root)) + 1
+        candidates: List[Tuple[os.DirEntry, str]] = []
+        stack = [str(src_root)]
+        while stack:
+            try:
+                it = os.scandir(stack.pop())
+            except OSError:
                 continue
+            with it:
+                for entry in it:
+                    rel = entry.path[prefix_len:].replace("\\", "/")
+                    if entry.is_dir(follow_symlinks=False):
+                        if not _EXCLUDE_SEARCH(rel + "/"):
+                            stack.append(entry.path)
+                    elif entry.name.endswith(".py") and not _EXCLUDE_SEARCH(rel):
+                        candidates.append((entry, rel))
+
+        def _size(item: Tuple[os.DirEntry, str]) -> int:
+            try:
+                return item[0].stat().st_size
+            except OSError:
+                return 0
 
-            files.append(path)
+        # stat çağrıları I/O bekler; tek geçişte ve paralel yap
+        workers = min(32, (os.cpu_count() or 1) * 4)
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            sizes = list(pool.map(_size, candidates))
 
-        # Öncelik: hiç işlenmemiş dosya önce, ardından küçük boyut
-        def _key(p: Path):
-            rel = str(p.relative_to(self.project_root)).replace("\\", "/")
-            return (rel in processed, p.stat().st_size if p.exists() else 0)
+        files = [
+            Candidate(Path(entry.path), rel, size)
+            for (entry, rel), size in zip(candidates, sizes)
+            if size
+        ]
 
-        files.sort(key=_key)
+        # Öncelik: hiç işlenmemiş dosya önce, ardından küçük boyut (eşitlikte yol sırası)
+        files.sort(key=lambda c: (c.rel_posix in processed, c.size, c.rel_posix))
 
         selected = files if max_files <= 0 else files[:max_files]
-        print(
+        logger.info(
             f"[ACE] Found {len(files)} candidate files, "
             f"selecting first {len(selected)} (max {max_files})."
         )
@@ -236,30 +349,30 @@ class ACEExecutor:
     # ------------------------------------------------------------------
     #  ASK FERS FOR PATCHES
     # ------------------------------------------------------------------
-    def _plan_patches(self, files: List[Path]) -> List[Dict[str, Any]]:
+    def _plan_patches(self, files: List[Candidate]) -> List[Dict[str, Any]]:
         """
         Delegate to FERS planner to produce evolutionary patch plan.
         Expects planner.plan_evolution() to return a list of:
         { "file": "relative/path.py", "new_code": "..." }
         """
-        rel_files = [{"rel_path": str(f.relative_to(self.project_root))} for f in files]
+        rel_files = [{"rel_path": c.rel_posix} for c in files]
         try:
             rel_files = self.planner._assign_evolution_weights(rel_files)
         except Exception:
             rel_files = [rf["rel_path"] for rf in rel_files]
 
-        print(f"[ACE] FERS'e gönderilen dosya sayısı: {len(rel_files)}")
+        logger.info(f"[ACE] FERS'e gönderilen dosya sayısı: {len(rel_files)}")
         try:
             patches = self.planner.plan_evolution(rel_files)
         except Exception as exc:  # noqa: BLE001
-            print(f"[ACE][ERROR] FERS planner exception: {exc}")
+            logger.error(f"[ACE][ERROR] FERS planner exception: {exc}")
             return []
 
         if not patches:
-            print("[ACE] FERS patch planı boş döndürdü.")
+            logger.info("[ACE] FERS patch planı boş döndürdü.")
             return []
 
-        print(f"[ACE] FERS toplam {len(patches)} patch üretti.")
+        logger.info(f"[ACE] FERS toplam {len(patches)} patch üretti.")
         return patches
 
     # ------------------------------------------------------------------
@@ -273,72 +386,244 @@ class ACEExecutor:
             except Exception:
                 pass
 
-        if self.sandbox_dir.exists():
-            shutil.rmtree(self.sandbox_dir, ignore_errors=False, onerror=_handle_readonly)
-            if self.sandbox_dir.exists():
+        def _remove(path: Path) -> None:
+            shutil.rmtree(path, ignore_errors=False, onerror=_handle_readonly)
+            if path.exists():
                 # Son bir temizlik denemesi
-                shutil.rmtree(self.sandbox_dir, ignore_errors=True)
+                shutil.rmtree(path, ignore_errors=True)
+
+        if self.sandbox_dir.exists():
+            # Eski sandbox'ı kenara taşı ve arka planda sil; döngü silmeyi beklemesin
+            trash = self.sandbox_dir.with_name(f"{_TRASH_PREFIX}{uuid.uuid4().hex}")
+            try:
+                os.rename(self.sandbox_dir, trash)
+            except OSError:
+                _remove(self.sandbox_dir)
+
+        # Önceki koşulardan kalanlar dahil tüm çöp dizinlerini arka planda temizle
+        stale = [p for p in self.sandbox_dir.parent.glob(f"{_TRASH_PREFIX}*") if p.is_dir()]
+        if stale:
+
+            def _remove_all() -> None:
+                for path in stale:
+                    _remove(path)
+
+            threading.Thread(target=_remove_all, daemon=True).start()
+
+        staging_parent = str(self.staging_root.parent)
 
         def _ignore(path: str, names: List[str]) -> List[str]:
             ignore_list: List[str] = []
             for n in names:
                 if n in {".git", ".venv", "sandbox_repo", "__pycache__"}:
                     ignore_list.append(n)
+                elif n.startswith(_TRASH_PREFIX):
+                    ignore_list.append(n)
+                elif n == self.staging_root.name and path == staging_parent:
+                    # Onay bekleyen staging dosyaları sandbox'a taşınmaz
+                    ignore_list.append(n)
             return ignore_list
 
+        root = str(self.project_root)
+
+        def _link_or_copy(src: str, dst: str) -> None:
+            # Hardlink yalnızca src/ ve tests/ altındaki .py dosyaları için (patch'ler
+            # os.replace ile yeni inode alır); farklı disk/FS'te veya diğer dosyalarda kopyala
+            top = os.path.relpath(src, root).split(os.sep, 1)[0]
+            if top in _SANDBOX_LINK_TREES and src.endswith(".py"):
+                try:
+                    os.link(src, dst)
+                    return
+                except OSError:
+                    pass
+            shutil.copy2(src, dst)
+
         shutil.copytree(
             self.project_root,
             self.sandbox_dir,
             ignore=_ignore,
+            copy_function=_link_or_copy,
         )
 
     # ------------------------------------------------------------------
-    #  APPLY PATCHES IN SANDBOX
+    #  PATCH WRITER (sandbox + main repo)
     # ------------------------------------------------------------------
-    def _apply_patches_in_sandbox(self, patches: List[Dict[str, Any]]) -> int:
-        count = 0
-        for item in patches:
-            rel_path = item.get("file")
-            new_code = item.get("new_code")
+    def _write_one_patch(self, item: Dict[str, Any], base: Path, where: str) -> bool:
+        rel_path = item.get("file")
+        new_code = item.get("new_code")
 
-            if not rel_path or new_code is None:
-                continue
+        if not rel_path or new_code is None:
+            return False
 
-            target = self.sandbox_dir / rel_path
-            if not target.parent.exists():
-                target.parent.mkdir(parents=True, exist_ok=True)
+        target = base / rel_path
+        if not target.parent.exists():
+            target.parent.mkdir(parents=True, exist_ok=True)
 
+        try:
+            data = new_code.encode("utf-8")
+            # İçerik aynıysa yazma: gereksiz I/O yok, sandbox hardlink'i korunur
             try:
-                target.write_text(new_code, encoding="utf-8")
-                count += 1
-            except Exception as exc:  # noqa: BLE001
-                print(f"[ACE][WARN] Sandbox patch apply failed for {rel_path}: {exc}")
+                if target.read_bytes() == data:
+                    return False
+            except FileNotFoundError:
+                pass
+
+            # os.replace yeni inode bağlar; sandbox hardlink'i main repo'ya sızmaz
+            _atomic_write_bytes(target, data)
+            return True
+        except Exception as exc:  # noqa: BLE001
+            logger.warning(f"[ACE][WARN] {where} patch apply failed for {rel_path}: {exc}")
+            return False
 
-        return count
+    def _write_patches(self, patches: List[Dict[str, Any]], base: Path, where: str) -> int:
+        # Aynı dosyaya birden çok patch: sıralı uygulamadaki gibi sonuncusu kazanır
+        patches = list({item.get("file"): item for item in patches}.values())
+        if not patches:
+            return 0
+        # Dosya yazımları bağımsız; syscall beklemelerini thread'lerle örtüştür
+        with ThreadPoolExecutor(max_workers=min(16, len(patches))) as pool:
+            results = pool.map(lambda item: self._write_one_patch(item, base, where), patches)
+            return sum(results)
+
+    # ------------------------------------------------------------------
+    #  APPLY PATCHES IN SANDBOX
+    # ------------------------------------------------------------------
+    def _apply_patches_in_sandbox(self, patches: List[Dict[str, Any]]) -> int:
+        return self._write_patches(patches, self.sandbox_dir, "Sandbox")
 
     # ------------------------------------------------------------------
     #  APPLY PATCHES IN MAIN REPO
     # ------------------------------------------------------------------
     def _apply_patches_in_main_repo(self, patches: List[Dict[str, Any]]) -> int:
-        count = 0
-        for item in patches:
+        applied = self._write_patches(patches, self.project_root, "Main repo")
+        # Yazılan Llama patch'lerinin hash'i FERS'e bildirilir (değişmeyen dosya tekrar gitmez)
+        try:
+            self.planner.record_applied_patches(patches, root=self.project_root)
+        except Exception as exc:  # noqa: BLE001
+            logger.warning(f"[ACE][WARN] Cannot record applied patches in FERS memory: {exc}")
+        return applied
+
+    # ------------------------------------------------------------------
+    #  APPROVAL STAGING
+    # ------------------------------------------------------------------
+    def _stage_proposal_patches(
+        self, patches: List[Dict[str, Any]], staging: Path
+    ) -> List[Dict[str, Any]]:
+        """
+        Onay kaydına kaynak kodun kendisi yerine referans yaz:
+        sandbox'taki yamalı dosyalar kalıcı staging dizinine hardlink'lenir,
+        proposal yalnızca (file, sha256, size, staged_path, llm, base_sha256) taşır.
+        base_sha256: patch'in üretildiği ana depo dosyasının hash'i (dosya yoksa None).
+        """
+        entries: List[Dict[str, Any]] = []
+        for item in {p.get("file"): p for p in patches}.values():
             rel_path = item.get("file")
             new_code = item.get("new_code")
-
             if not rel_path or new_code is None:
                 continue
 
-            target = self.project_root / rel_path
-            if not target.parent.exists():
-                target.parent.mkdir(parents=True, exist_ok=True)
-
+            data = new_code.encode("utf-8")
+            staged = staging / rel_path
             try:
-                target.write_text(new_code, encoding="utf-8")
-                count += 1
+                staged.parent.mkdir(parents=True, exist_ok=True)
+                try:
+                    # Sandbox sonraki döngüde silinir; inode staging'de yaşamaya devam eder
+                    os.link(self.sandbox_dir / rel_path, staged)
+                except OSError:
+                    _atomic_write_bytes(staged, data)
             except Exception as exc:  # noqa: BLE001
-                print(f"[ACE][WARN] Main repo patch apply failed for {rel_path}: {exc}")
+                logger.warning(f"[ACE][WARN] Cannot stage patch for {rel_path}: {exc}")
+                continue
 
-        return count
+            entries.append(
+                {
+                    "file": rel_path,
+                    "sha256": hashlib.sha256(data).hexdigest(),
+                    "size": len(data),
+                    "staged_path": str(staged),
+                    "llm": bool(item.get("llm")),
+                    "base_sha256": _file_sha256(self.project_root / rel_path),
+                }
+            )
+        return entries
+
+    def apply_approved_proposal(self, proposal: Dict[str, Any]) -> Optional[int]:
+        """
+        Apply an APPROVED ACE_PATCHES proposal to the main repo.
+        Staged files are verified against their recorded sha256, and every target must
+        still be the version the patch was built from (base_sha256). The proposal was
+        tested as a whole, so any missing, corrupt or stale entry aborts it: nothing
+        is written and None is returned. Otherwise returns the number of files written.
+        """
+        if proposal.get("type") != "ACE_PATCHES" or proposal.get("status") != "APPROVED":
+            return None
+
+        patches: List[Dict[str, Any]] = []
+        for entry in proposal.get("content", {}).get("patches", []):
+            rel_path = entry.get("file")
+            try:
+                data = Path(entry["staged_path"]).read_bytes()
+            except (KeyError, OSError) as exc:
+                logger.warning(f"[ACE][WARN] Staged patch missing for {rel_path}: {exc}")
+                return None
+            if hashlib.sha256(data).hexdigest() != entry.get("sha256"):
+                logger.warning(f"[ACE][WARN] Staged patch checksum mismatch for {rel_path}")
+                return None
+            if "base_sha256" in entry and (
+                _file_sha256(self.project_root / rel_path) != entry["base_sha256"]
+            ):
+                # Onay beklerken dosya değişti: tam dosya patch'i yeni düzenlemeleri ezerdi
+                logger.warning(
+                    f"[ACE][WARN] {rel_path} changed since the patch was staged; "
+                    f"proposal {proposal.get('id')} skipped"
+                )
+                return None
+            patches.append(
+                {
+                    "file": entry.get("file"),
+                    "new_code": data.decode("utf-8"),
+                    "llm": bool(entry.get("llm")),
+                }
+            )
+
+        return self._apply_patches_in_main_repo(patches)
+
+    def process_approval_decisions(self) -> int:
+        """
+        Onay kuyruğundaki ACE_PATCHES kararlarını işler:
+        APPROVED → ana depoya uygulanır ve APPLIED olarak işaretlenir (doğrulama
+        başarısızsa FAILED; staging korunur); APPLIED/REJECTED → staging dizini silinir. Uygulanan patch sayısını döner.
+        """
+        try:
+            self.approver.refresh()
+        except Exception as exc:  # noqa: BLE001
+            logger.warning(f"[ACE][WARN] Cannot reload approval queue: {exc}")
+            return 0
+
+        applied = 0
+        for proposal in self.approver.list_by_status("APPROVED", "ACE_PATCHES"):
+            count = self.apply_approved_proposal(proposal)
+            if count is None:
+                # Hiçbir şey yazılmadı; kayıt ve staging inceleme için korunur
+                self.approver.mark_failed(proposal["id"], "staged patches could not be applied")
+                continue
+            applied += count
+            self.approver.mark_applied(proposal["id"], {"applied_patches": count})
+            logger.info(f"[ACE] Onaylanan öneri {proposal['id']}: {count} patch uygulandı.")
+
+        for status in ("APPLIED", "REJECTED"):
+            for proposal in self.approver.list_by_status(status, "ACE_PATCHES"):
+                self._remove_staging(proposal)
+        return applied
+
+    def _remove_staging(self, proposal: Dict[str, Any]) -> None:
+        staging_dir = (proposal.get("content") or {}).get("staging_dir")
+        if not staging_dir:
+            return
+        staging = Path(staging_dir)
+        # Yalnızca kendi staging kökümüzün altındaki dizinler silinir
+        if staging.parent == self.staging_root and staging.is_dir():
+            shutil.rmtree(staging, ignore_errors=True)
 
     # ------------------------------------------------------------------
     #  RUN PYTEST IN SANDBOX
@@ -348,33 +633,103 @@ class ACEExecutor:
         Runs pytest in the sandbox repository.
         Returns (ok: bool, output: str)
         """
-        cmd = ["pytest", "-q"]
+        # -x: ilk hatada dur; sinyal yalnızca geçti/kaldı
+        args = ["-q", "-x", "--no-header", "-p", "no:cacheprovider"]
+        if self.ace_cfg.get("parallel_tests") and importlib.util.find_spec("xdist"):
+            args += ["-n", "auto", "--dist=loadfile"]
         timeout = int(self.ace_cfg.get("max_test_runtime_sec", 180))
+        env = {**os.environ, "PYTHONDONTWRITEBYTECODE": "1", "PYTHONHASHSEED": "0"}
 
+        # Çıktı PIPE yerine geçici dosyaya; yalnızca başarısızlıkta okunur
+        fd, log_name = tempfile.mkstemp(dir=self.sandbox_dir, prefix="pytest_", suffix=".log")
         try:
-            proc = subprocess.run(
-                cmd,
-                cwd=self.sandbox_dir,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.STDOUT,
-                text=True,
-                timeout=timeout,
-            )
+            with os.fdopen(fd, "w+b") as log_fh:
+                returncode = None
+                if _CAN_FORK and self.ace_cfg.get("warm_pytest", True):
+                    returncode = self._run_pytest_warm(args, env, log_name, timeout)
+                if returncode is None:
+                    returncode = subprocess.run(
+                        ["pytest", *args],
+                        cwd=self.sandbox_dir,
+                        stdout=log_fh,
+                        stderr=subprocess.STDOUT,
+                        timeout=timeout,
+                        env=env,
+                    ).returncode
+                ok = returncode == 0
+                output = ""
+                if not ok:
+                    log_fh.seek(0)
+                    output = log_fh.read().decode("utf-8", errors="replace")
         except subprocess.TimeoutExpired:
             return False, f"pytest timeout after {timeout} seconds"
         except FileNotFoundError:
             return False, "pytest not found in environment"
+        finally:
+            Path(log_name).unlink(missing_ok=True)
 
-        output = proc.stdout or ""
-        ok = proc.returncode == 0
         if not ok:
-            print("[ACE][TEST] pytest FAILED:")
-            print(output)
+            logger.warning("[ACE][TEST] pytest FAILED:")
+            logger.warning(output)
         else:
-            print("[ACE][TEST] pytest PASSED.")
+            logger.info("[ACE][TEST] pytest PASSED.")
 
         return ok, output
 
+    def _run_pytest_warm(
+        self, args: List[str], env: Dict[str, str], log_name: str, timeout: int
+    ) -> Optional[int]:
+        """
+        Run pytest through the long-lived ace_pytest_worker (imports paid once).
+        Returns None when the worker is unavailable so the caller can fall back.
+        """
+        proc = self._pytest_proc
+        if proc is None or proc.poll() is not None:
+            try:
+                proc = subprocess.Popen(
+                    [sys.executable, str(_PYTEST_WORKER)],
+                    stdin=subprocess.PIPE,
+                    stdout=subprocess.PIPE,
+                    text=True,
+                    bufsize=1,
+                    env=env,
+                    start_new_session=True,
+                )
+            except OSError:
+                return None
+            self._pytest_proc = proc
+            atexit.register(self._stop_pytest_worker)
+
+        request = {"cwd": str(self.sandbox_dir), "args": args, "log": log_name}
+        try:
+            proc.stdin.write(json.dumps(request) + "\n")
+            proc.stdin.flush()
+            ready, _, _ = select.select([proc.stdout], [], [], timeout)
+        except (OSError, ValueError):
+            self._stop_pytest_worker()
+            return None
+
+        if not ready:
+            # Worker ve fork'lanmış pytest aynı process grubunda; birlikte öldür
+            self._stop_pytest_worker()
+            raise subprocess.TimeoutExpired(["pytest", *args], timeout)
+
+        line = proc.stdout.readline()
+        if not line:
+            self._stop_pytest_worker()
+            return None
+        return int(json.loads(line)["returncode"])
+
+    def _stop_pytest_worker(self) -> None:
+        proc, self._pytest_proc = self._pytest_proc, None
+        if proc is None or proc.poll() is not None:
+            return
+        try:
+            os.killpg(proc.pid, signal.SIGKILL)
+        except OSError:
+            proc.kill()
+        proc.wait()
+
     # ------------------------------------------------------------------
     #  AUTO-MERGE STATE
     # ------------------------------------------------------------------
@@ -382,18 +737,15 @@ class ACEExecutor:
         if not self.state_file.exists():
             return {"merge_success_count": 0}
         try:
-            return json.loads(self.state_file.read_text(encoding="utf-8"))
+            return json_loads(self.state_file.read_bytes())
         except Exception:  # noqa: BLE001
             return {"merge_success_count": 0}
 
     def _save_state(self, state: Dict[str, Any]) -> None:
         try:
-            self.state_file.write_text(
-                json.dumps(state, indent=2),
-                encoding="utf-8",
-            )
+            _atomic_write_bytes(self.state_file, json_dumps_pretty(state))
         except Exception as exc:  # noqa: BLE001
-            print(f"[ACE][WARN] Cannot save state file: {exc}")
+            logger.warning(f"[ACE][WARN] Cannot save state file: {exc}")
 
     def _update_merge_state(self, success: bool) -> Dict[str, Any]:
         """
@@ -416,7 +768,7 @@ class ACEExecutor:
         self._save_state(state)
 
         if auto_merge_ready:
-            print(
+            logger.info(
                 f"[ACE] Auto-merge threshold reached "
                 f"({state['merge_success_count']} >= {threshold}). "
                 "Patches considered stable for automatic merge."
@@ -427,34 +779,79 @@ class ACEExecutor:
     # ------------------------------------------------------------------
     #  PROCESSED FILE LOGGING
     # ------------------------------------------------------------------
-    def _load_processed_set(self) -> set[str]:
-        if not self.processed_log.exists():
-            return set()
+    def _stat_key(self) -> Optional[Tuple[int, int]]:
+        try:
+            st = self.processed_log.stat()
+        except OSError:
+            return None
+        return st.st_ino, st.st_size
+
+    def _flush_processed_log(self) -> None:
+        if self._processed_fh is not None and self._processed_pending:
+            self._processed_fh.flush()
+            self._processed_pending = 0
+
+    def _close_processed_log(self) -> None:
+        if self._processed_fh is not None:
+            try:
+                self._flush_processed_log()
+                self._processed_fh.close()
+            except OSError:
+                pass
+            self._processed_fh = None
+
+    def _load_processed_set(self) -> FrozenSet[str]:
+        # Tamponda bekleyen kayıtlar okunmadan önce diske yazılsın
+        self._flush_processed_log()
+        key = self._stat_key()
+        if key is None:
+            return frozenset()
+
+        cache = self._processed_cache
+        if cache is not None and cache[:2] == key:
+            return cache[2]
+
         paths: set[str] = set()
         try:
-            for line in self.processed_log.read_text(encoding="utf-8").splitlines():
+            for line in self.processed_log.read_bytes().splitlines():
                 try:
-                    rec = json.loads(line)
+                    rec = json_loads(line)
                     for rel in rec.get("files", []):
                         paths.add(rel)
-                except json.JSONDecodeError:
+                except ValueError:
                     continue
         except OSError:
-            return set()
-        return paths
+            return frozenset()
+
+        result = frozenset(paths)
+        self._processed_cache = (*key, result)
+        return result
 
-    def _log_processed(self, files: List[Path], status: str, details: Any) -> None:
+    def _log_processed(self, files: List[Candidate], status: str, details: Any) -> None:
         try:
-            self.processed_log.parent.mkdir(parents=True, exist_ok=True)
-            rels = [str(f.relative_to(self.project_root)).replace("\\", "/") for f in files]
+            rels = [c.rel_posix for c in files]
             entry = {
                 "ts": time.time(),
                 "status": status,
                 "files": rels,
                 "details": details,
             }
-            with self.processed_log.open("a", encoding="utf-8") as fh:
-                fh.write(json.dumps(entry) + "\n")
+            if self._processed_fh is None:
+                self.processed_log.parent.mkdir(parents=True, exist_ok=True)
+                self._processed_fh = self.processed_log.open("ab", buffering=_PROCESSED_BUFFER_SIZE)
+                atexit.register(self._close_processed_log)
+
+            line = json_dumps_bytes(entry) + b"\n"
+            self._processed_fh.write(line)
+            self._processed_pending += 1
+            if self._processed_pending >= _PROCESSED_FLUSH_EVERY:
+                self._flush_processed_log()
+            # Cache'i diskteki stat yerine yazılan bayt sayısıyla ilerlet: flush edilmemiş
+            # kayıtlar da sayılır, bir sonraki okumada (flush sonrası) boyut birebir tutar
+            cache = self._processed_cache
+            if cache is not None:
+                ino, size, paths = cache
+                self._processed_cache = (ino, size + len(line), paths.union(rels))
         except Exception:
             # Logging failure should not break pipeline
             pass
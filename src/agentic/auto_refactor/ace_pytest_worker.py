@@ -0,0 +1,58 @@
+"""
+ACE pytest worker – warm interpreter for sandbox test runs.
+
+ACEExecutor starts this script once and sends one JSON request per line on stdin:
+    {"cwd": "<sandbox>", "args": [...], "log": "<log file>"}
+Each request is run in a forked child (fresh sys.modules for the new sandbox,
+but pytest and its plugins are already imported). The worker answers with
+    {"returncode": <int>}
+POSIX only; ACEExecutor falls back to a plain subprocess where os.fork is missing.
+"""
+
+import json
+import os
+import sys
+
+# Script dizini sys.path[0] olarak eklenir; sandbox testlerine sızmasın
+if sys.path and sys.path[0] == os.path.dirname(os.path.abspath(__file__)):
+    del sys.path[0]
+
+import pytest  # noqa: E402
+
+
+def _run(request: dict) -> int:
+    pid = os.fork()
+    if pid == 0:
+        code = 3
+        try:
+            os.chdir(request["cwd"])
+            fd = os.open(request["log"], os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+            os.dup2(fd, 1)
+            os.dup2(fd, 2)
+            os.close(fd)
+            sys.dont_write_bytecode = True
+            code = int(pytest.main(list(request["args"])))
+        except BaseException:  # noqa: BLE001
+            pass
+        finally:
+            try:
+                sys.stdout.flush()
+                sys.stderr.flush()
+            finally:
+                os._exit(code)
+
+    _, status = os.waitpid(pid, 0)
+    return os.waitstatus_to_exitcode(status)
+
+
+def main() -> None:
+    for line in sys.stdin:
+        if not line.strip():
+            continue
+        returncode = _run(json.loads(line))
+        sys.stdout.write(json.dumps({"returncode": returncode}) + "\n")
+        sys.stdout.flush()
+
+
+if __name__ == "__main__":
+    main()
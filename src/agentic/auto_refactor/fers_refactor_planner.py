@@ -1,10 +1,17 @@
+import bisect
+import hashlib
 import json
 import os
 import re
+import stat
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Sequence, Union
+from typing import Any, Dict, FrozenSet, Iterator, List, Optional, Sequence, Tuple, Union
 
 from src.agentic.llama_learning_integration.llama_client import LlamaCPPError, llama_cpp
+from src.utils.jsonio import json_loads
 
 ###############################################################################
 #  SYSTEM CONFIG
@@ -17,14 +24,66 @@ CTX_LIMIT = 4096
 SAFE_FN_TOKEN_LIMIT = 1200
 SAFE_FILE_TOKEN_LIMIT = 3000
 
+# Bu kadar token'a kadar dosya tek seferde (AGGRESSIVE) yeniden yazdırılır
+AGGRESSIVE_TOKEN_LIMIT = 600
+
 # Çok büyük fonksiyonlar için chunk parametreleri
 CHUNK_SIZE = 1000  # approx tokens per chunk
 CHUNK_OVERLAP = 100
 
+# Bundan büyük dosyalar (üretilmiş kod, vendored bundle vb.) FERS'e girmez
+MAX_FILE_BYTES = 1024 * 1024
+
+# _call_llama prompt cache'inde tutulan en fazla cevap sayısı
+PROMPT_CACHE_SIZE = 512
+
+# Prompt şablonlarının sabit talimat kısımları. Dosyaya özgü satırlar (yol, içerik)
+# her zaman bunlardan SONRA gelir; böylece llama.cpp sunucusu ortak prefix'in
+# KV cache'ini dosyalar arasında yeniden kullanabilir.
+_FULL_FILE_PROMPT = (
+    "You are an autonomous Python refactoring assistant.\n"
+    "Refactor the following file to improve readability, maintainability,\n"
+    "type hints, and basic PEP8 compliance. Keep behaviour the same.\n\n"
+    "Return ONLY the full updated Python file, inside a ```python ... ``` block.\n\n"
+)
+_SMALL_PATCH_PROMPT = (
+    "You are a Python code quality assistant.\n"
+    "Make a SMALL, SAFE improvement to the following file:\n"
+    "- Add or improve module-level docstring if missing.\n"
+    "- Add obvious type hints to simple functions if trivial.\n"
+    "- Do NOT change business logic.\n"
+    "- Keep the structure mostly the same.\n\n"
+    "Return ONLY the full updated Python file, inside a ```python ... ``` block.\n\n"
+)
+_FUNCTION_PROMPT = (
+    "You are a Python refactoring assistant.\n"
+    "Refactor ONLY the given function, keep the same signature and behaviour.\n"
+    "Improve readability, add missing type hints, and basic PEP8.\n\n"
+    "Return ONLY the updated function body, inside a ```python ... ``` block.\n\n"
+)
+_CHUNK_PROMPT = (
+    "You are a Python refactoring assistant.\n"
+    "You will receive a CHUNK of a large function body.\n"
+    "Make very small refactors (spacing, trivial hints), do NOT change logic.\n"
+    "Return chunk inside ```python``` block.\n\n"
+)
+
 # Evrimsel hafıza dosyası
 EVOLUTION_MEMORY_PATH = "logs/refactor/evolution_memory.json"
 ROOT = Path(__file__).resolve().parents[3]
 
+# Sık kullanılan desenler modül seviyesinde bir kez derlenir
+_DEF_RE = re.compile(r"^def\s+([A-Za-z_]\w*)\s*\(", re.MULTILINE)
+_CODE_BLOCK_RE = re.compile(r"```(?:python)?\s*(.*?)```", re.DOTALL | re.IGNORECASE)
+# parse_json_response tarayıcısının baktığı karakterler; arası tek adımda atlanır
+_JSON_TOKEN_RE = re.compile(r'[{}"\\]')
+
+# ACE candidate dict'lerinde yolun bulunabileceği anahtarlar (öncelik sırasıyla)
+_CANDIDATE_KEYS = ("rel", "rel_path", "path", "file", "relative_path")
+
+# _minimal_autopatch'in dosya başına topladığı satırlar
+_IMPORT_PREFIXES = ("import ", "from ")
+
 
 ###############################################################################
 #  HELPER FUNCTIONS
@@ -32,41 +91,100 @@ ROOT = Path(__file__).resolve().parents[3]
 
 
 def estimate_tokens(text: str) -> int:
-    """Çok kaba bir token tahmini; Llama.cpp context sınırı için yeterli."""
+    """
+    Çok kaba bir token tahmini; Llama.cpp context sınırı için yeterli.
+    Sadece len() kullandığı için O(1); karakter taraması yapılmaz.
+    """
     if not text:
         return 0
     # Ortalama 4 karakter ≈ 1 token varsayımı
     return max(1, len(text) // 4)
 
 
+def _content_hash(content: str) -> str:
+    return hashlib.blake2b(content.encode("utf-8"), digest_size=16).hexdigest()
+
+
 def chunk_text(text: str, size: int, overlap: int) -> List[str]:
     """Büyük fonksiyon gövdelerini Llama context sınırına göre parçalara böler."""
-    chunks: List[str] = []
     if not text:
-        return chunks
+        return []
 
     step = max(1, size - overlap)
-    for i in range(0, len(text), step):
-        chunk = text[i : i + size]
-        chunks.append(chunk)
-        if i + size >= len(text):
-            break
-    return chunks
+    # Pencere sayısı önceden hesaplanır: son pencere metnin sonuna değen ilk pencere
+    n = 1 if len(text) <= size else 1 + (len(text) - size + step - 1) // step
+    return [text[i * step : i * step + size] for i in range(n)]
+
+
+def _iter_json_objects(raw: str) -> Iterator[str]:
+    """
+    raw içindeki dengeli {...} bloklarını sırayla verir.
+    String içindeki { } ve kaçışlı tırnaklar sayılmaz; tek geçişte yürür.
+    """
+    depth = 0
+    start = -1
+    in_string = False
+    skip_until = -1
+    for m in _JSON_TOKEN_RE.finditer(raw):
+        pos = m.start()
+        if pos < skip_until:
+            continue
+        ch = m.group()
+        if ch == "\\":
+            # Kaçışlı karakteri atla (sadece string içinde anlamlı)
+            if in_string:
+                skip_until = pos + 2
+        elif ch == '"':
+            if depth:
+                in_string = not in_string
+        elif in_string:
+            continue
+        elif ch == "{":
+            if depth == 0:
+                start = pos
+            depth += 1
+        elif depth:
+            depth -= 1
+            if depth == 0:
+                yield raw[start : pos + 1]
 
 
 def parse_json_response(raw: str, fallback: Dict[str, Any]) -> Dict[str, Any]:
     """
     Llama.cpp cevabından JSON gövdesini ayıklar.
-    Çözümlenemezse fallback döner.
+    Çözümlenebilen ilk JSON nesnesini döner; yoksa fallback.
     """
-    try:
-        start = raw.find("{")
-        end = raw.rfind("}")
-        if start == -1 or end == -1:
-            return fallback
-        return json.loads(raw[start : end + 1])
-    except Exception:
+    if not raw:
         return fallback
+    # Model sadece JSON döndüyse tarama yapmadan parse et
+    text = raw.strip()
+    if text[:1] == "{":
+        try:
+            return json_loads(text)
+        except ValueError:
+            pass
+    for candidate in _iter_json_objects(raw):
+        try:
+            return json_loads(candidate)
+        except ValueError:
+            continue
+    return fallback
+
+
+def _iter_py_files(base: str, exclude: FrozenSet[str]) -> Iterator[str]:
+    """base altındaki .py dosyalarını verir; exclude'daki dizinlere inmez."""
+    stack = [base]
+    while stack:
+        try:
+            with os.scandir(stack.pop()) as it:
+                for entry in it:
+                    if entry.is_dir(follow_symlinks=False):
+                        if entry.name not in exclude:
+                            stack.append(entry.path)
+                    elif entry.name.endswith(".py") and entry.is_file(follow_symlinks=False):
+                        yield entry.path
+        except OSError:
+            continue
 
 
 ###############################################################################
@@ -84,26 +202,50 @@ class EvolutionMemory:
 
     def __init__(self, path: str = EVOLUTION_MEMORY_PATH) -> None:
         self.path = path
-        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Dizin sadece ilk save()'de oluşturulur
+        self._dir_ready = False
         self.data: Dict[str, Any] = {"files": {}, "functions": {}}
+        # plan_evolution dosyaları paralel planlar; kayıtlar bu kilitle sıralanır
+        self._lock = threading.RLock()
+        # record_* sadece işaretler; diske flush() ile bir kez yazılır
+        self._dirty = False
         self._load()
 
     def _load(self) -> None:
-        if os.path.exists(self.path):
-            try:
-                with open(self.path, "r", encoding="utf-8") as f:
-                    self.data = json.load(f)
-            except json.JSONDecodeError:
-                # Bozulmuş dosya varsa sessizce sıfırdan başla
-                self.data = {"files": {}, "functions": {}}
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                self.data = json.load(f)
+        except FileNotFoundError:
+            pass
+        except json.JSONDecodeError:
+            # Bozulmuş dosya varsa sessizce sıfırdan başla
+            self.data = {"files": {}, "functions": {}}
 
     def save(self) -> None:
+        # Önce yan dosyaya yaz, sonra os.replace: yarım kalmış JSON bırakmaz
+        tmp = f"{self.path}.{os.getpid()}.tmp"
         try:
-            with open(self.path, "w", encoding="utf-8") as f:
-                json.dump(self.data, f, indent=2, ensure_ascii=False)
+            with self._lock:
+                if not self._dir_ready:
+                    directory = os.path.dirname(self.path)
+                    if directory:
+                        os.makedirs(directory, exist_ok=True)
+                    self._dir_ready = True
+                with open(tmp, "w", encoding="utf-8") as f:
+                    json.dump(self.data, f, indent=2, ensure_ascii=False)
+                os.replace(tmp, self.path)
+                self._dirty = False
         except Exception:
             # Log yazılamasa bile ACE/FERS çalışmaya devam etmeli
-            pass
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+
+    def flush(self) -> None:
+        """Bekleyen kayıt varsa hafızayı diske yazar."""
+        if self._dirty:
+            self.save()
 
     # -------- file-level helpers --------
 
@@ -114,28 +256,44 @@ class EvolutionMemory:
         return files[rel]
 
     def record_file_pass(self, rel: str, mode: Optional[str] = None) -> None:
-        stats = self._file_stats(rel)
-        stats["success"] += 1
-        if mode is not None:
-            stats["last_mode"] = mode
-        self.save()
+        with self._lock:
+            stats = self._file_stats(rel)
+            stats["success"] += 1
+            if mode is not None:
+                stats["last_mode"] = mode
+            self._dirty = True
+
+    def record_content_hash(self, rel: str, content_hash: str) -> None:
+        """Llama'nın ürettiği ve ana depoya yazılmış içeriğin hash'ini saklar."""
+        with self._lock:
+            self.data.setdefault("content_hashes", {})[rel] = content_hash
+            self._dirty = True
+
+    def is_unchanged_since_pass(self, rel: str, content_hash: str) -> bool:
+        """Dosya, son uygulanan Llama patch'indeki içerikle birebir aynı mı?"""
+        with self._lock:
+            if self.data.get("content_hashes", {}).get(rel) != content_hash:
+                return False
+            return self.data.get("files", {}).get(rel, {}).get("success", 0) > 0
 
     def record_file_fail(self, rel: str, reason: str) -> None:
-        stats = self._file_stats(rel)
-        stats["fail"] += 1
-        stats["last_error"] = reason
-        self.save()
+        with self._lock:
+            stats = self._file_stats(rel)
+            stats["fail"] += 1
+            stats["last_error"] = reason
+            self._dirty = True
 
     # -------- function-level helpers --------
 
     def record_function_skip(self, rel: str, fn_name: str, reason: str) -> None:
-        funcs = self.data.setdefault("functions", {})
-        key = f"{rel}::{fn_name}"
-        rec = funcs.get(key, {"skips": 0})
-        rec["skips"] = rec.get("skips", 0) + 1
-        rec["last_reason"] = reason
-        funcs[key] = rec
-        self.save()
+        with self._lock:
+            funcs = self.data.setdefault("functions", {})
+            key = f"{rel}::{fn_name}"
+            rec = funcs.get(key, {"skips": 0})
+            rec["skips"] = rec.get("skips", 0) + 1
+            rec["last_reason"] = reason
+            funcs[key] = rec
+            self._dirty = True
 
 
 ###############################################################################
@@ -160,9 +318,12 @@ class FullEvolutionaryRefactorPlanner:
 
         # Kaynak kök dizin; ACEExecutor genelde candidate path’i zaten “src/...” ile geçiriyor
         self.src_root = self.config.get("src_root", "")
+        # _read_file'ın göreli yolları çözdüğü kökler, öncelik sırasıyla
+        self._roots = (str(ROOT),) + ((str(self.src_root),) if self.src_root else ())
         self.exclude_dirs = self.config.get(
             "exclude_dirs", ["tests", "__pycache__", "sandbox_repo"]
         )
+        self._exclude_set = frozenset(self.exclude_dirs)
 
         self.ctx_limit = int(self.config.get("ctx_limit", CTX_LIMIT))
         self.safe_fn_token_limit = int(self.config.get("safe_fn_token_limit", SAFE_FN_TOKEN_LIMIT))
@@ -170,7 +331,25 @@ class FullEvolutionaryRefactorPlanner:
             self.config.get("safe_file_token_limit", SAFE_FILE_TOKEN_LIMIT)
         )
 
+        # _select_mode tablosu: tokens <= eşik olan ilk mod seçilir (eşikler artan)
+        self._mode_thresholds: List[float] = [
+            AGGRESSIVE_TOKEN_LIMIT,
+            max(AGGRESSIVE_TOKEN_LIMIT, self.safe_file_token_limit),
+            float("inf"),
+        ]
+        self._mode_labels = ("AGGRESSIVE", "SMALL_PATCH", "FUNCTION_OR_CHUNK")
+
         self.max_llama_tokens = int(self.config.get("max_llama_tokens", 800))
+        # Bu boyutun üstündeki dosyalar okunmadan atlanır
+        self.max_file_bytes = int(self.config.get("max_file_bytes", MAX_FILE_BYTES))
+        # Llama çağrıları I/O-bound; dosyalar bu kadar paralel planlanır
+        self.max_parallel = max(1, int(self.config.get("max_parallel", 8)))
+        # Büyük fonksiyonların chunk'ları için dosya başına eşzamanlı Llama çağrısı
+        self.max_chunk_parallel = max(1, int(self.config.get("max_chunk_parallel", 4)))
+        # Özdeş promptlar için LRU cevap cache'i: (blake2b(prompt), n_predict) -> raw
+        self.enable_prompt_cache = bool(self.config.get("enable_prompt_cache", True))
+        self._prompt_cache: "OrderedDict[Tuple[bytes, int], str]" = OrderedDict()
+        self._prompt_cache_lock = threading.Lock()
         self.memory = EvolutionMemory()
 
     # ------------------------------------------------------------------ utils
@@ -191,21 +370,17 @@ class FullEvolutionaryRefactorPlanner:
             elif isinstance(item, str):
                 rel = item.replace("\\", "/")
             elif isinstance(item, dict):
-                rel = (
-                    item.get("rel")
-                    or item.get("rel_path")
-                    or item.get("path")
-                    or item.get("file")
-                    or item.get("relative_path")
-                )
-                if rel:
-                    rel = str(rel).replace("\\", "/")
+                for key in _CANDIDATE_KEYS:
+                    rel = item.get(key)
+                    if rel:
+                        rel = str(rel).replace("\\", "/")
+                        break
 
             if not rel:
                 continue
 
-            # Basit exclude kontrolü
-            if any(part in rel.split("/") for part in self.exclude_dirs):
+            # Basit exclude kontrolü: yol bir kez bölünür, set ile karşılaştırılır
+            if not self._exclude_set.isdisjoint(rel.split("/")):
                 continue
 
             result.append(rel)
@@ -213,36 +388,40 @@ class FullEvolutionaryRefactorPlanner:
         return result
 
     def _read_file(self, rel: str) -> Optional[str]:
-        path = ROOT / rel if not Path(rel).is_absolute() else Path(rel)
-        if not path.exists() or not path.is_file():
-            # src_root ayarlı ise onunla da dene
-            if self.src_root:
-                alt = Path(self.src_root) / rel
-                if alt.exists() and alt.is_file():
-                    path = alt
-                else:
+        # Kökler sırayla denenir (ROOT, sonra src_root); her aday için tek open + fstat
+        paths = (rel,) if os.path.isabs(rel) else [os.path.join(r, rel) for r in self._roots]
+        for path in paths:
+            try:
+                f = open(path, "rb")
+            except OSError:
+                continue
+            with f:
+                st = os.fstat(f.fileno())
+                if not stat.S_ISREG(st.st_mode):
+                    continue
+                # Üretilmiş/dev dosyaları decode etmeden ele (patch zaten tüm dosyayı taşır)
+                if st.st_size > self.max_file_bytes:
+                    print(
+                        f"[FERS] Skip {rel}: {st.st_size} bytes > "
+                        f"max_file_bytes={self.max_file_bytes}"
+                    )
+                    return None
+                try:
+                    data = f.read()
+                except OSError:
                     return None
-            else:
-                return None
-
-        try:
-            return path.read_text(encoding="utf-8")
-        except UnicodeDecodeError:
             try:
-                return path.read_text(encoding="latin-1")
-            except Exception:
-                return None
+                return data.decode("utf-8")
+            except UnicodeDecodeError:
+                return data.decode("latin-1")
+        return None
 
     def _select_mode(self, tokens: int) -> str:
         """
         Token sayısına göre refactor modu seçimi.
         İleride EvolutionMemory verisiyle daha akıllı hale getirilebilir.
         """
-        if tokens <= 600:
-            return "AGGRESSIVE"
-        if tokens <= self.safe_file_token_limit:
-            return "SMALL_PATCH"
-        return "FUNCTION_OR_CHUNK"
+        return self._mode_labels[bisect.bisect_left(self._mode_thresholds, tokens)]
 
     # ---------------------------------------------------------------- Llama IO
 
@@ -252,11 +431,27 @@ class FullEvolutionaryRefactorPlanner:
         Hata durumunda LlamaCPPError fırlatır.
         """
         max_tokens = n_predict or self.max_llama_tokens
-        return llama_cpp(prompt, n_predict=max_tokens)
+        if not self.enable_prompt_cache:
+            return llama_cpp(prompt, n_predict=max_tokens)
+
+        # Aynı prompt (boilerplate header, tekrar eden helper/chunk) tekrar gönderilmez
+        key = (hashlib.blake2b(prompt.encode("utf-8"), digest_size=16).digest(), max_tokens)
+        with self._prompt_cache_lock:
+            cached = self._prompt_cache.get(key)
+            if cached is not None:
+                self._prompt_cache.move_to_end(key)
+                return cached
+
+        raw = llama_cpp(prompt, n_predict=max_tokens)
+        with self._prompt_cache_lock:
+            self._prompt_cache[key] = raw
+            if len(self._prompt_cache) > PROMPT_CACHE_SIZE:
+                self._prompt_cache.popitem(last=False)
+        return raw
 
     # ----------------------------------------------------------- full-file mode
 
-    def _refactor_full_file(self, rel: str, content: str) -> Optional[Dict[str, str]]:
+    def _refactor_full_file(self, rel: str, content: str) -> Optional[Dict[str, Any]]:
         """
         Tam dosya refactor denemesi.
         Llama hata verirse None, local fallback gerekirse minimal autopatch.
@@ -268,14 +463,8 @@ class FullEvolutionaryRefactorPlanner:
             return None
 
         prompt = (
-            "You are an autonomous Python refactoring assistant.\n"
-            "Refactor the following file to improve readability, maintainability,\n"
-            "type hints, and basic PEP8 compliance. Keep behaviour the same.\n\n"
-            f"FILE PATH: {rel}\n\n"
-            "Return ONLY the full updated Python file, inside a ```python ... ``` block.\n\n"
-            "-------- FILE START --------\n"
-            f"{content}\n"
-            "-------- FILE END ----------\n"
+            f"{_FULL_FILE_PROMPT}FILE PATH: {rel}\n\n"
+            f"-------- FILE START --------\n{content}\n-------- FILE END ----------\n"
         )
 
         try:
@@ -289,14 +478,14 @@ class FullEvolutionaryRefactorPlanner:
         if not new_code or new_code.strip() == content.strip():
             return None
 
-        return {"file": rel, "new_code": new_code}
+        return {"file": rel, "new_code": new_code, "llm": True}
 
     def _extract_code_block(self, raw: str) -> str:
         """
         Llama cevabından ```python ... ``` bloğunu çıkarır.
         Bulamazsa ham cevabı döner.
         """
-        m = re.search(r"```python(.*)```", raw, re.DOTALL | re.IGNORECASE)
+        m = _CODE_BLOCK_RE.search(raw)
         if m:
             return m.group(1).strip("\n\r ")
         # Fallback: tüm cevabı dön (bazı modeller blok kullanmayabiliyor)
@@ -304,7 +493,7 @@ class FullEvolutionaryRefactorPlanner:
 
     # -------------------------------------------------------- small patch mode
 
-    def _refactor_small_patch(self, rel: str, content: str) -> Optional[Dict[str, str]]:
+    def _refactor_small_patch(self, rel: str, content: str) -> Optional[Dict[str, Any]]:
         """
         Küçük, düşük riskli değişiklikler.
         - Eksik module-level docstring ekleme
@@ -318,17 +507,8 @@ class FullEvolutionaryRefactorPlanner:
             return self._minimal_autopatch(rel, content)
 
         prompt = (
-            "You are a Python code quality assistant.\n"
-            "Make a SMALL, SAFE improvement to the following file:\n"
-            "- Add or improve module-level docstring if missing.\n"
-            "- Add obvious type hints to simple functions if trivial.\n"
-            "- Do NOT change business logic.\n"
-            "- Keep the structure mostly the same.\n\n"
-            f"FILE PATH: {rel}\n\n"
-            "Return ONLY the full updated Python file, inside a ```python ... ``` block.\n\n"
-            "-------- FILE START --------\n"
-            f"{content}\n"
-            "-------- FILE END ----------\n"
+            f"{_SMALL_PATCH_PROMPT}FILE PATH: {rel}\n\n"
+            f"-------- FILE START --------\n{content}\n-------- FILE END ----------\n"
         )
 
         try:
@@ -337,7 +517,7 @@ class FullEvolutionaryRefactorPlanner:
             if not new_code or new_code.strip() == content.strip():
                 # Llama bir şey üretmediyse lokal minimal patch
                 return self._minimal_autopatch(rel, content)
-            return {"file": rel, "new_code": new_code}
+            return {"file": rel, "new_code": new_code, "llm": True}
         except LlamaCPPError:
             # Llama yoksa bile pipeline devam etsin
             return self._minimal_autopatch(rel, content)
@@ -348,15 +528,14 @@ class FullEvolutionaryRefactorPlanner:
         """
         Çok basit bir fonksiyon ayıklayıcı (def ... satırlarına göre).
         """
-        pattern = re.compile(r"\ndef\s+([A-Za-z_][\w]*)\s*\(.*?\):", re.DOTALL)
-        matches = list(pattern.finditer("\n" + content))
+        matches = list(_DEF_RE.finditer(content))
 
         funcs: List[Dict[str, Any]] = []
         for i, m in enumerate(matches):
             name = m.group(1)
             start = m.start(0)
-            end = matches[i + 1].start(0) if i + 1 < len(matches) else len("\n" + content)
-            body = ("\n" + content)[start:end]
+            end = matches[i + 1].start(0) if i + 1 < len(matches) else len(content)
+            body = content[start:end]
             funcs.append({"name": name, "body": body, "start": start, "end": end})
         return funcs
 
@@ -370,15 +549,8 @@ class FullEvolutionaryRefactorPlanner:
             return None
 
         prompt = (
-            "You are a Python refactoring assistant.\n"
-            "Refactor ONLY the given function, keep the same signature and behaviour.\n"
-            "Improve readability, add missing type hints, and basic PEP8.\n\n"
-            f"FILE: {rel}\n"
-            f"FUNCTION NAME: {fn_name}\n\n"
-            "Return ONLY the updated function body, inside a ```python ... ``` block.\n\n"
-            "-------- FUNCTION START --------\n"
-            f"{fn_body}\n"
-            "-------- FUNCTION END ----------\n"
+            f"{_FUNCTION_PROMPT}FILE: {rel}\nFUNCTION NAME: {fn_name}\n\n"
+            f"-------- FUNCTION START --------\n{fn_body}\n-------- FUNCTION END ----------\n"
         )
 
         try:
@@ -402,29 +574,44 @@ class FullEvolutionaryRefactorPlanner:
         - Cevapları birleştir
         """
         chunks = chunk_text(fn_body, CHUNK_SIZE, CHUNK_OVERLAP)
-        new_chunks: List[str] = []
-        for idx, ch in enumerate(chunks):
+        # Her chunk'ın başındaki overlap bir önceki chunk'ta zaten var; sadece
+        # bağlam olarak gönderilir, birleştirmeye ayrık kısım girer
+        head = CHUNK_SIZE - max(1, CHUNK_SIZE - CHUNK_OVERLAP)
+
+        def refactor_chunk(idx: int) -> str:
+            ch = chunks[idx]
+            context, segment = ("", ch) if idx == 0 else (ch[:head], ch[head:])
             fn_tokens = estimate_tokens(ch)
             if fn_tokens > self.safe_fn_token_limit:
                 # Bu chunk da çok büyükse, olduğu gibi bırak
-                new_chunks.append(ch)
-                continue
+                return segment
 
+            context_block = (
+                f"-------- CONTEXT (read-only, do NOT return) --------\n{context}\n"
+                if context
+                else ""
+            )
             prompt = (
-                "You are a Python refactoring assistant.\n"
-                "You will receive a CHUNK of a large function body.\n"
-                "Make very small refactors (spacing, trivial hints), do NOT change logic.\n"
-                "Return chunk inside ```python``` block.\n\n"
-                f"FILE: {rel}\nFUNCTION: {fn_name}\nCHUNK INDEX: {idx}\n\n"
+                f"{_CHUNK_PROMPT}FILE: {rel}\nFUNCTION: {fn_name}\nCHUNK INDEX: {idx}\n\n"
+                f"{context_block}"
                 "-------- CHUNK START --------\n"
-                f"{ch}\n"
+                f"{segment}\n"
                 "-------- CHUNK END ----------\n"
             )
             try:
                 raw = self._call_llama(prompt, n_predict=400)
-                new_chunks.append(self._extract_code_block(raw))
+                return self._extract_code_block(raw)
             except LlamaCPPError:
-                new_chunks.append(ch)
+                return segment
+
+        # Chunk'lar birbirinden bağımsız; Llama çağrıları sırayla beklenmez
+        indices = range(len(chunks))
+        if len(chunks) > 1 and self.max_chunk_parallel > 1:
+            workers = min(self.max_chunk_parallel, len(chunks))
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                new_chunks = list(pool.map(refactor_chunk, indices))
+        else:
+            new_chunks = [refactor_chunk(idx) for idx in indices]
 
         new_body = "".join(new_chunks)
         if new_body.strip() == fn_body.strip():
@@ -449,13 +636,11 @@ class FullEvolutionaryRefactorPlanner:
             new_content = f'"""Auto-refactored by ACE/FERS.\nThis module was touched by the evolutionary refactor pipeline.\n"""\n\n{new_content}'
 
         # 2) Importları toparla
-        lines = new_content.splitlines()
-        imports = [l for l in lines if l.startswith("import ") or l.startswith("from ")]
+        # Tek geçiş; sadece girintisiz (top-level) import satırları taşınır
+        imports: List[str] = []
         other: List[str] = []
-        for l in lines:
-            if l.startswith("import ") or l.startswith("from "):
-                continue
-            other.append(l)
+        for line in new_content.splitlines():
+            (imports if line.startswith(_IMPORT_PREFIXES) else other).append(line)
         if imports:
             sorted_imports = sorted(set(imports))
             new_content = "\n".join(sorted_imports + [""] + other)
@@ -466,11 +651,82 @@ class FullEvolutionaryRefactorPlanner:
 
         return {"file": rel, "new_code": new_content}
 
+    def _plan_one(self, rel: str) -> Tuple[Optional[Dict[str, Any]], Optional[str], Optional[str]]:
+        """
+        Tek dosyanın planı: (patch, mode, error).
+        error doluysa dosya başarısız sayılır; aksi halde patch her zaman doludur.
+        """
+        content = self._read_file(rel)
+        if not content:
+            return None, None, "no_content"
+
+        # Son uygulanan Llama patch'inden beri değişmeyen dosya için Llama'ya tekrar gitme
+        if self.memory.is_unchanged_since_pass(rel, _content_hash(content)):
+            print(f"[FERS] File={rel} unchanged since last pass -> Mode=MINIMAL")
+            return self._minimal_autopatch(rel, content), "MINIMAL", None
+
+        tokens = estimate_tokens(content)
+        mode = self._select_mode(tokens)
+        print(f"[FERS] File={rel} tokens={tokens} -> Mode={mode}")
+
+        try:
+            patch: Optional[Dict[str, Any]] = None
+
+            if mode == "AGGRESSIVE":
+                patch = self._refactor_full_file(rel, content)
+                if patch is None:
+                    # Full file çalışmazsa small patch'e düş
+                    patch = self._refactor_small_patch(rel, content)
+
+            elif mode == "SMALL_PATCH":
+                patch = self._refactor_small_patch(rel, content)
+
+            else:  # FUNCTION_OR_CHUNK
+                funcs = self._extract_functions(content)
+                if not funcs:
+                    patch = self._minimal_autopatch(rel, content)
+                else:
+                    # Offset'ler orijinal içeriğe göre; parçalar sonda tek join ile birleşir
+                    parts: List[str] = []
+                    cursor = 0
+                    for fn in funcs[:3]:  # ilk birkaç fonksiyonla sınırlı
+                        name = fn["name"]
+                        body = fn["body"]
+                        fn_tokens = estimate_tokens(body)
+
+                        if fn_tokens <= self.safe_fn_token_limit:
+                            new_body = self._refactor_function_body(rel, name, body)
+                        else:
+                            new_body = self._refactor_chunked_large_function(rel, name, body)
+
+                        if new_body:
+                            # Fonksiyonlar arası boşluk (sondaki whitespace) korunur
+                            trailing = body[len(body.rstrip()) :] or "\n"
+                            parts += (content[cursor : fn["start"]], new_body.rstrip(), trailing)
+                            cursor = fn["end"]
+
+                    if parts:
+                        parts.append(content[cursor:])
+                        updated = "".join(parts)
+                    if parts and updated.strip() != content.strip():
+                        patch = {"file": rel, "new_code": updated, "llm": True}
+                    else:
+                        patch = self._minimal_autopatch(rel, content)
+
+            if patch:
+                return patch, mode, None
+            # Yine de minimal autopatch ile dokun
+            return self._minimal_autopatch(rel, content), "MINIMAL", None
+
+        except Exception as e:  # ACE çökmesin
+            print(f"[FERS][ERROR] planning {rel}: {e}")
+            return None, mode, f"exception:{e}"
+
     # ------------------------------------------------------------ public API ---
 
     def plan_evolution(
         self, candidate_files: Sequence[Union[str, Path, Dict[str, Any]]]
-    ) -> List[Dict[str, str]]:
+    ) -> List[Dict[str, Any]]:
         """
         ACEExecutor tarafından çağrılan ana giriş noktası.
 
@@ -480,80 +736,63 @@ class FullEvolutionaryRefactorPlanner:
 
         Dönüş:
             List[{"file": <relative_path>, "new_code": <updated_source>}]
+            Llama'nın ürettiği patch'lerde ayrıca "llm": True bulunur.
         """
         rel_files = self._normalize_candidate_files(candidate_files)
         print(f"[FERS] Selected {len(rel_files)} files for evolutionary pass.")
 
-        patches: List[Dict[str, str]] = []
-
-        for rel in rel_files:
-            content = self._read_file(rel)
-            if not content:
-                self.memory.record_file_fail(rel, "no_content")
-                continue
-
-            tokens = estimate_tokens(content)
-            mode = self._select_mode(tokens)
-            print(f"[FERS] File={rel} tokens={tokens} -> Mode={mode}")
-
-            try:
-                patch: Optional[Dict[str, str]] = None
-
-                if mode == "AGGRESSIVE":
-                    patch = self._refactor_full_file(rel, content)
-                    if patch is None:
-                        # Full file çalışmazsa small patch'e düş
-                        patch = self._refactor_small_patch(rel, content)
-
-                elif mode == "SMALL_PATCH":
-                    patch = self._refactor_small_patch(rel, content)
+        patches: List[Dict[str, Any]] = []
+        if not rel_files:
+            print(f"[FERS] Total patches produced: {len(patches)}")
+            return patches
 
-                else:  # FUNCTION_OR_CHUNK
-                    funcs = self._extract_functions(content)
-                    if not funcs:
-                        patch = self._minimal_autopatch(rel, content)
-                    else:
-                        updated = "\n" + content
-                        changed = False
-                        for fn in funcs[:3]:  # ilk birkaç fonksiyonla sınırlı
-                            name = fn["name"]
-                            body = fn["body"]
-                            fn_tokens = estimate_tokens(body)
-
-                            if fn_tokens <= self.safe_fn_token_limit:
-                                new_body = self._refactor_function_body(rel, name, body)
-                            else:
-                                new_body = self._refactor_chunked_large_function(rel, name, body)
-
-                            if new_body:
-                                start = fn["start"]
-                                end = fn["end"]
-                                updated = updated[:start] + "\n" + new_body + "\n" + updated[end:]
-                                changed = True
-
-                        if changed and updated.strip() != content.strip():
-                            # Baştaki \n'i temizle
-                            updated = updated.lstrip("\n")
-                            patch = {"file": rel, "new_code": updated}
-                        else:
-                            patch = self._minimal_autopatch(rel, content)
-
-                if patch:
+        # Dosya planları paralel; pass/fail kayıtları ana thread'de, sırayla
+        workers = min(self.max_parallel, len(rel_files))
+        try:
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                results = pool.map(self._plan_one, rel_files)
+                for rel, (patch, mode, error) in zip(rel_files, results):
+                    if error is not None:
+                        self.memory.record_file_fail(rel, error)
+                        continue
                     patches.append(patch)
                     self.memory.record_file_pass(rel, mode=mode)
-                else:
-                    # Yine de minimal autopatch ile dokun
-                    fallback = self._minimal_autopatch(rel, content)
-                    patches.append(fallback)
-                    self.memory.record_file_pass(rel, mode="MINIMAL")
-
-            except Exception as e:  # ACE çökmesin
-                print(f"[FERS][ERROR] planning {rel}: {e}")
-                self.memory.record_file_fail(rel, f"exception:{e}")
+        finally:
+            self.memory.flush()
 
         print(f"[FERS] Total patches produced: {len(patches)}")
         return patches
 
+    def record_applied_patches(
+        self, patches: Sequence[Dict[str, Any]], root: Optional[Union[str, Path]] = None
+    ) -> None:
+        """
+        ACE patch'leri ana depoya yazdıktan sonra çağırır. Yalnızca Llama'nın ürettiği
+        (llm=True) ve diskteki içerikle birebir eşleşen patch'lerin hash'i saklanır;
+        bu dosyalar değişene kadar tekrar Llama'ya gönderilmez.
+        root: patch'lerin yazıldığı kök (ACE project_root); verilmezse ROOT/src_root denenir.
+        """
+        recorded = False
+        for patch in patches:
+            rel = patch.get("file")
+            new_code = patch.get("new_code")
+            if not patch.get("llm") or not rel or not isinstance(new_code, str):
+                continue
+            if root is None:
+                if self._read_file(rel) != new_code:
+                    continue
+            else:
+                try:
+                    on_disk = (Path(root) / rel).read_bytes()
+                except OSError:
+                    continue
+                if on_disk != new_code.encode("utf-8"):
+                    continue
+            self.memory.record_content_hash(rel, _content_hash(new_code))
+            recorded = True
+        if recorded:
+            self.memory.flush()
+
     # Eski arayüzü kullanan kodlar için geriye dönük uyumluluk:
     def generate_refactor_plan(self) -> Dict[str, Any]:
         """
@@ -561,19 +800,17 @@ class FullEvolutionaryRefactorPlanner:
         Yeni ACE entegrasyonu için plan_evolution kullanılıyor.
         """
         # src içindeki tüm .py dosyalarını topla
-        base = Path(self.src_root) if self.src_root else Path("src")
+        base = self.src_root or "src"
+        absolute = os.path.isabs(base)
         candidate_files: List[str] = []
-        for root, dirs, files in os.walk(base):
-            # exclude_dirs
-            dirs[:] = [d for d in dirs if d not in self.exclude_dirs]
-            for f in files:
-                if not f.endswith(".py"):
-                    continue
-                p = Path(root) / f
-                rel = str(p.relative_to(Path("."))).replace("\\", "/")
-                candidate_files.append(rel)
+        for path in _iter_py_files(base, self._exclude_set):
+            rel = os.path.relpath(path) if absolute else path
+            candidate_files.append(rel.replace(os.sep, "/"))
 
-        patches = self.plan_evolution(candidate_files)
+        try:
+            patches = self.plan_evolution(candidate_files)
+        finally:
+            self.memory.flush()
         return {"patches": patches}
 
     def _load_ref_report(self):
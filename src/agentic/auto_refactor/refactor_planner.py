@@ -58,6 +58,8 @@ class RefactorPlanner:
             )
             return []
 
+        # Tek geçişte tip kontrolü: file/new_code boş olmayan str olmalı,
+        # reason str değilse "" sayılır (bozuk girdiler sessizce atlanır)
         patches = []
         for item in data:
             if not isinstance(item, dict):
@@ -65,16 +67,16 @@ class RefactorPlanner:
 
             fpath = item.get("file")
             code = item.get("new_code")
-            reason = item.get("reason", "")
-
-            if not fpath or not code:
+            if not isinstance(fpath, str) or not isinstance(code, str) or not fpath or not code:
                 continue
+            reason = item.get("reason", "")
 
             patches.append(
                 {
-                    "file": fpath.replace("\\", "/").lstrip("/").replace("src/", ""),
+                    # Sadece baştaki "src/" atılır; yol içindeki src/ segmentleri korunur
+                    "file": fpath.replace("\\", "/").lstrip("/").removeprefix("src/"),
                     "new_code": code,
-                    "reason": reason,
+                    "reason": reason if isinstance(reason, str) else "",
                 }
             )
 
@@ -82,7 +84,7 @@ class RefactorPlanner:
 
     def generate_refactor_plan(self):
         # 1) Mevcut kod tabanından pattern'leri çıkar
-        patterns = self.cle.detect_patterns(self.cle.scan_codebase())
+        patterns = self.cle.scan_patterns()
 
         analysis_json = json.dumps(patterns, indent=2)
 
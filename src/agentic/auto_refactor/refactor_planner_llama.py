@@ -1,9 +1,62 @@
+import ast
+import hashlib
+import io
 import json
 import os
 import re
-from typing import Dict, List, Optional, Set
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+from agentic.llama_learning_integration.llama_client import (
+    LLAMA_TOKENIZER_PATH,
+    LlamaCPPError,
+    count_tokens,
+    llama_cpp_batch,
+)
+
+# Test çıktısındaki .py yolları (planner her koşuda tekrar kullanır; bir kez derlenir)
+_HINT_PATH_RE = re.compile(r"([\w/\\]+\.py)")
+
+# _compute_complexity'nin saydığı dallanma anahtar kelimeleri. str.count her biri için
+# C hızında tarar; tek geçişli Counter(split()) / alternation regex ölçümde daha yavaş.
+_BRANCH_KEYWORDS = (" if ", " for ", " while ", " try:", " except ", " with ")
+
+_JSON_DECODER = json.JSONDecoder()
+
+# Koşular arası dosya envanteri: {"tokenizer": ..., "files": {abs yol: [mtime_ns, boyut,
+# complexity, est_tokens]}}. est_tokens tokenizer'a bağlı; ayar değişince index yok sayılır.
+PLANNER_INDEX_PATH = os.path.join("logs", "refactor", "planner_index.json")
+
+# Llama'nın patch önermediği içeriklerin özetleri (en yeni sonda); bu içerikler tekrar
+# gönderilmez. Sınır aşılınca en eski kayıtlar düşer.
+PLANNER_NOOP_MEMO_PATH = os.path.join("logs", "refactor", "planner_noop_hashes.json")
+PLANNER_NOOP_MEMO_MAX = 4096
+
+
+@lru_cache(maxsize=16)
+def _function_ranges(content: str) -> Tuple[Tuple[str, ...], Tuple[Tuple[str, int, int], ...]]:
+    """
+    Modül seviyesindeki fonksiyonların satır aralıkları; aralık `def` satırından başlar.
+    Decorator'lar aralığa dahil değildir: Llama yalnızca tanımı görür ve döndürür,
+    splice sırasında decorator satırları dosyada olduğu gibi kalır.
+    Dönen: (satırlar, ((isim, başlangıç index, bitiş index), ...)); parse edilemezse boş.
+    _extract_functions ve _apply_function_patches_to_content aynı içerik için
+    çağrıldığından sonuç cache'lenir; dosya bir kez bölünür ve parse edilir.
+    """
+    try:
+        tree = ast.parse(content)
+    except (SyntaxError, ValueError):
+        return (), ()
+    # ast satır numaraları \n, \r\n ve \r'ye göre; splitlines() \f vb. de böler
+    lines = tuple(io.StringIO(content, newline="").readlines())
+    ranges: List[Tuple[str, int, int]] = []
+    for node in tree.body:
+        if not isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            continue
+        ranges.append((node.name, node.lineno - 1, node.end_lineno or node.lineno))
+    return lines, tuple(ranges)
 
-from agentic.llama_learning_integration.llama_client import LlamaCPPError, llama_cpp
 
 LLAMA_SYSTEM_PROMPT_FULL_FILE = """
 You are an autonomous code-refactoring engine.
@@ -37,7 +90,7 @@ LLAMA_SYSTEM_PROMPT_FUNCTION = """
 You are an autonomous Python refactoring assistant.
 
 Task:
-- You will receive a SINGLE Python function (including its full definition).
+- You will receive a SINGLE Python function (its full definition, without decorators).
 - Improve ONLY this function: readability, robustness, clear docstring, better typing.
 - Do NOT change the function name or parameters unless obviously buggy.
 - Do NOT add side effects or new dependencies.
@@ -58,11 +111,39 @@ RULES:
 - Do NOT include backticks.
 - Do NOT include commentary or explanations outside JSON.
 - "patches" MUST exist (can be empty list).
-- "new_body" MUST contain the FULL function definition (def ...).
+- "new_body" MUST contain the FULL function definition (def ...), without decorators.
 - If no improvement is needed, return: {"patches": []}
 """
 
 
+# Fonksiyon seviyesindeki işlerin sınırları (4096 ctx → güvenli token limiti ~1200)
+MAX_FUNCTION_TOKENS = 1200
+FUNCTION_N_PREDICT = 512
+FULL_FILE_N_PREDICT_MAX = 1024
+
+# Özet sistem promptlarıyla tohumlanır: promptlar değişince eski no-op kayıtları eşleşmez
+_NOOP_DIGEST_SEED = hashlib.blake2b(
+    (LLAMA_SYSTEM_PROMPT_FULL_FILE + LLAMA_SYSTEM_PROMPT_FUNCTION).encode("utf-8"),
+    digest_size=16,
+)
+_NOOP_DIGEST_SEED.update(
+    f"{MAX_FUNCTION_TOKENS}:{FUNCTION_N_PREDICT}:{FULL_FILE_N_PREDICT_MAX}".encode("ascii")
+)
+
+
+def _noop_digest_seed(max_est_tokens_per_file: int, max_functions_per_large_file: int):
+    """Planner sınırları da özete girer: sınır değişince dosyaya giden işler değişir."""
+    h = _NOOP_DIGEST_SEED.copy()
+    h.update(f":{max_est_tokens_per_file}:{max_functions_per_large_file}".encode("ascii"))
+    return h
+
+
+def _content_digest(seed, content: str) -> str:
+    h = seed.copy()
+    h.update(content.encode("utf-8"))
+    return h.hexdigest()
+
+
 class RefactorPlannerLlama:
     """
     Multi-file, token-aware, function-level incremental refactor planner.
@@ -77,6 +158,10 @@ class RefactorPlannerLlama:
         max_est_tokens_per_file: int = 3000,
         max_functions_per_large_file: int = 3,
         enable_test_aware_prioritization: bool = True,
+        max_parallel_requests: int = 8,
+        scan_workers: int = 8,
+        index_path: Optional[str] = PLANNER_INDEX_PATH,
+        noop_memo_path: Optional[str] = PLANNER_NOOP_MEMO_PATH,
     ):
         self.src_root = "src"
         self.include_dirs = include_dirs or []
@@ -86,18 +171,25 @@ class RefactorPlannerLlama:
         self.max_est_tokens_per_file = max_est_tokens_per_file
         self.max_functions_per_large_file = max_functions_per_large_file
         self.enable_test_aware = enable_test_aware_prioritization
+        # Tek batch'te llama.cpp'ye eşzamanlı gönderilen istek sayısı (--parallel ile eşleşmeli)
+        self.max_parallel_requests = max_parallel_requests
+        # _scan_python_files'ta dosya okuma/skorlama için thread sayısı
+        self.scan_workers = scan_workers
+        # mtime'ı değişmeyen dosyalar yeniden okunmaz; None → index kullanılmaz
+        self.index_path = index_path
+        # Değişmemiş ve daha önce patch çıkmamış dosyalar Llama'ya gönderilmez; None → kapalı
+        self.noop_memo_path = noop_memo_path
+        self._noop_seed = _noop_digest_seed(max_est_tokens_per_file, max_functions_per_large_file)
 
     # ---------------------- complexity & tokens -------------------------
     def _estimate_tokens(self, text: str) -> int:
-        return max(1, int(len(text) / 4))
+        return count_tokens(text)
 
     def _compute_complexity(self, content: str) -> int:
         lines = content.count("\n") + 1
         funcs = content.count("def ")
         classes = content.count("class ")
-        branches = sum(
-            content.count(k) for k in [" if ", " for ", " while ", " try:", " except ", " with "]
-        )
+        branches = sum(map(content.count, _BRANCH_KEYWORDS))
         return lines + 3 * funcs + 4 * classes + 2 * branches
 
     # ---------------------- test-aware hints ----------------------------
@@ -116,49 +208,157 @@ class RefactorPlannerLlama:
             try:
                 with open(path, "r", encoding="utf-8") as f:
                     text = f.read()
-                for m in re.findall(r"([\w/\\]+\.py)", text):
+                for m in _HINT_PATH_RE.findall(text):
                     hints.add(m.replace("\\", "/"))
             except Exception:
                 continue
         return hints
 
     # ---------------------- file scanning & batching --------------------
-    def _scan_python_files(self) -> List[Dict]:
-        files: List[Dict] = []
-
-        for root, dirs, filenames in os.walk(self.src_root):
-            if any(ex in root for ex in self.exclude_dirs):
+    def _iter_python_files(self) -> Iterator[Tuple[str, int, int]]:
+        """
+        src_root altındaki .py dosyalarını (yol, boyut, mtime_ns) olarak verir.
+        exclude_dirs'teki dizinlere hiç inilmez; stat DirEntry.stat() cache'inden gelir.
+        """
+        exclude = frozenset(self.exclude_dirs)
+        include = [os.path.join(self.src_root, inc) for inc in self.include_dirs]
+        stack = [self.src_root]
+        while stack:
+            directory = stack.pop()
+            wanted = not include or any(inc in directory for inc in include)
+            try:
+                with os.scandir(directory) as it:
+                    for entry in it:
+                        if entry.is_dir(follow_symlinks=False):
+                            if entry.name not in exclude:
+                                stack.append(entry.path)
+                        elif wanted and entry.name.endswith(".py"):
+                            st = entry.stat()
+                            yield entry.path, st.st_size, st.st_mtime_ns
+            except OSError:
                 continue
 
-            if self.include_dirs:
-                if not any(os.path.join(self.src_root, inc) in root for inc in self.include_dirs):
-                    continue
+    def _file_info(self, abs_path: str, size: int, complexity: int, est_tokens: int) -> Dict:
+        return {
+            "abs": abs_path,
+            "rel": abs_path[len(self.src_root) + 1 :].replace("\\", "/"),
+            "size": size,
+            "complexity": complexity,
+            "est_tokens": est_tokens,
+        }
 
-            for f in filenames:
-                if not f.endswith(".py"):
-                    continue
+    def _read_and_score(self, entry: Tuple[str, int, int]) -> Dict:
+        abs_path, size, _ = entry
 
-                abs_path = os.path.join(root, f)
-                size = os.path.getsize(abs_path)
+        with open(abs_path, "r", encoding="utf-8") as fh:
+            content = fh.read()
 
-                rel_path = abs_path.replace(self.src_root + os.sep, "").replace("\\", "/")
+        # İçerik skorlamadan sonra bırakılır; yalnızca seçilen dosyalar _load_content ile okunur
+        return self._file_info(
+            abs_path, size, self._compute_complexity(content), self._estimate_tokens(content)
+        )
 
-                with open(abs_path, "r", encoding="utf-8") as fh:
-                    content = fh.read()
+    def _load_content(self, info: Dict) -> Optional[str]:
+        """Seçilen dosyanın içeriğini okur (tarama sırasında içerik tutulmaz)."""
+        if "content" not in info:
+            try:
+                with open(info["abs"], "r", encoding="utf-8") as fh:
+                    info["content"] = fh.read()
+            except (OSError, UnicodeDecodeError) as e:
+                print(f"[Planner] Dosya okunamadı {info['rel']}: {e}")
+                return None
+        return info["content"]
+
+    def _load_index(self) -> Dict[str, List[int]]:
+        if not self.index_path:
+            return {}
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as fh:
+                data = json.load(fh)
+        except (OSError, ValueError):
+            return {}
+        if not isinstance(data, dict) or data.get("tokenizer") != LLAMA_TOKENIZER_PATH:
+            return {}
+        files = data.get("files")
+        return files if isinstance(files, dict) else {}
+
+    def _write_json_atomic(self, path: str, data) -> None:
+        # Yarım yazılmış dosya bir sonraki koşuyu bozmasın: tmp + os.replace
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            with open(tmp_path, "w", encoding="utf-8") as fh:
+                json.dump(data, fh, separators=(",", ":"))
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"[Planner] Yazılamadı {path}: {e}")
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+
+    def _save_index(self, index: Dict[str, List[int]]) -> None:
+        if self.index_path:
+            self._write_json_atomic(
+                self.index_path, {"tokenizer": LLAMA_TOKENIZER_PATH, "files": index}
+            )
 
-                complexity = self._compute_complexity(content)
-                est_tokens = self._estimate_tokens(content)
+    def _load_noop_memo(self) -> Dict[str, None]:
+        # Sıralı dict: ekleme sırası korunur, üyelik O(1)
+        if not self.noop_memo_path:
+            return {}
+        try:
+            with open(self.noop_memo_path, "r", encoding="utf-8") as fh:
+                data = json.load(fh)
+        except (OSError, ValueError):
+            return {}
+        if not isinstance(data, list):
+            return {}
+        return dict.fromkeys(h for h in data if isinstance(h, str))
+
+    def _save_noop_memo(self, memo: Dict[str, None]) -> None:
+        if self.noop_memo_path:
+            self._write_json_atomic(self.noop_memo_path, list(memo)[-PLANNER_NOOP_MEMO_MAX:])
 
-                files.append(
-                    {
-                        "abs": abs_path,
-                        "rel": rel_path,
-                        "size": size,
-                        "complexity": complexity,
-                        "est_tokens": est_tokens,
-                        "content": content,
-                    }
-                )
+    def _scan_python_files(self) -> List[Dict]:
+        # max_file_size_kb üstündeki dosyalar hiç açılmaz
+        entries = [e for e in self._iter_python_files() if e[1] <= self.max_size_bytes]
+
+        # mtime_ns ve boyutu index'tekiyle aynı olan dosyanın skorları yeniden kullanılır
+        index = self._load_index()
+        new_index: Dict[str, List[int]] = {}
+        files: List[Optional[Dict]] = []
+        misses: List[Tuple[int, Tuple[str, int, int]]] = []
+        for entry in entries:
+            abs_path, size, mtime_ns = entry
+            cached = index.get(abs_path)
+            if (
+                isinstance(cached, list)
+                and len(cached) == 4
+                and cached[0] == mtime_ns
+                and cached[1] == size
+            ):
+                files.append(self._file_info(abs_path, size, cached[2], cached[3]))
+                new_index[abs_path] = cached
+            else:
+                misses.append((len(files), entry))
+                files.append(None)
+
+        # Okuma (GIL'i bırakır) ve skorlama dosyalar arasında bağımsız; sıra korunur
+        miss_entries = [entry for _, entry in misses]
+        if len(miss_entries) > 1 and self.scan_workers > 1:
+            with ThreadPoolExecutor(max_workers=min(self.scan_workers, len(miss_entries))) as pool:
+                scored = list(pool.map(self._read_and_score, miss_entries))
+        else:
+            scored = [self._read_and_score(e) for e in miss_entries]
+
+        for (slot, (abs_path, size, mtime_ns)), info in zip(misses, scored):
+            files[slot] = info
+            new_index[abs_path] = [mtime_ns, size, info["complexity"], info["est_tokens"]]
+
+        # Silinen dosyalar index'ten düşer; değişiklik yoksa dosya yeniden yazılmaz
+        if new_index != index:
+            self._save_index(new_index)
 
         failure_hints = self._load_test_failure_hints()
 
@@ -200,37 +400,40 @@ FUNCTION DEFINITION:
 """
 
     # ---------------------- JSON parse ----------------------------------
-    def _parse_json_response(self, text: str) -> Dict:
+    def _parse_json_response(self, text: str) -> Optional[Dict]:
+        """
+        {"patches": [...]} döndürür; cevap parse edilemezse (JSON yok, kesik JSON,
+        patches liste değil) None döner — bu, açık bir boş patch listesinden ayrılmalı.
+        """
+        # İlk "{"den itibaren tek bir JSON değeri okunur; sonraki metin (açıklama,
+        # ikinci bir "}") parse'ı bozmaz
+        start = text.find("{")
+        if start == -1:
+            return None
         try:
-            start = text.find("{")
-            end = text.rfind("}")
-            if start == -1 or end == -1:
-                return {"patches": []}
-            data = json.loads(text[start : end + 1])
-            patches = data.get("patches", [])
-            if not isinstance(patches, list):
-                patches = []
-            return {"patches": patches}
-        except Exception:
-            return {"patches": []}
+            data, _ = _JSON_DECODER.raw_decode(text, start)
+        except ValueError:
+            return None
+        patches = data.get("patches", [])
+        if not isinstance(patches, list):
+            return None
+        return {"patches": patches}
 
     # ---------------------- function extraction -------------------------
     def _extract_functions(self, content: str) -> List[Dict]:
-        pattern = re.compile(r"\ndef\s+([a-zA-Z_][\w]*)\s*\(.*?\):", re.DOTALL)
-        matches = list(pattern.finditer("\n" + content))
+        lines, ranges = _function_ranges(content)
+        offsets = [0]
+        for line in lines:
+            offsets.append(offsets[-1] + len(line))
 
         funcs: List[Dict] = []
-        for i, m in enumerate(matches):
-            name = m.group(1)
-            start = m.start(0)
-            end = matches[i + 1].start(0) if i + 1 < len(matches) else len("\n" + content)
-            body = ("\n" + content)[start:end]
+        for name, first, last in ranges:
             funcs.append(
                 {
                     "name": name,
-                    "body": body,
-                    "start": start,
-                    "end": end,
+                    "body": "".join(lines[first:last]),
+                    "start": offsets[first],
+                    "end": offsets[last],
                 }
             )
         return funcs
@@ -239,24 +442,29 @@ FUNCTION DEFINITION:
         if not func_patches:
             return content
 
-        text = "\n" + content
+        # Aynı fonksiyon için birden çok patch varsa sonuncusu geçerli
+        new_bodies: Dict[str, str] = {}
         for patch in func_patches:
             name = patch.get("function_name")
             new_body = patch.get("new_body")
             if not name or not new_body:
                 continue
-
-            pattern = re.compile(rf"\ndef\s+{re.escape(name)}\s*\(.*?\):", re.DOTALL)
-            m = pattern.search(text)
-            if not m:
+            new_bodies[name] = new_body
+
+        lines, ranges = _function_ranges(content)
+        parts: List[str] = []
+        cursor = 0
+        for name, first, last in ranges:
+            new_body = new_bodies.pop(name, None)
+            if new_body is None:
                 continue
-            start = m.start(0)
-            m2 = pattern.search(text, m.end(0))
-            end = m2.start(0) if m2 else len(text)
-
-            text = text[:start] + "\n" + new_body.strip("\n") + "\n" + text[end:]
-
-        return text.lstrip("\n")
+            parts.extend(lines[cursor:first])
+            parts.append(new_body.strip("\n") + "\n")
+            cursor = last
+        if not parts:
+            return content
+        parts.extend(lines[cursor:])
+        return "".join(parts)
 
     # ---------------------- MAIN: ACE çağrısı ---------------------------
     def generate_refactor_plan(self) -> Dict:
@@ -266,85 +474,139 @@ FUNCTION DEFINITION:
         if not file_infos:
             return {"patches": []}
 
-        selected_files = file_infos[: self.max_files_per_run]
+        # İçeriği, Llama'nın daha önce patch önermediği haliyle aynı olan dosyalar atlanır;
+        # boşalan yer öncelik sırasındaki bir sonraki dosyaya geçer
+        noop_memo = self._load_noop_memo()
+        selected_files: List[Dict] = []
+        skipped_noop = 0
+        for info in file_infos:
+            if len(selected_files) >= self.max_files_per_run:
+                break
+            content = self._load_content(info)
+            if content is None:
+                continue
+            if self.noop_memo_path:
+                info["digest"] = _content_digest(self._noop_seed, content)
+                if info["digest"] in noop_memo:
+                    skipped_noop += 1
+                    del info["content"]
+                    continue
+            selected_files.append(info)
 
+        if skipped_noop:
+            print(f"[Planner] {skipped_noop} değişmemiş dosya atlandı (önceki koşuda patch yok).")
         print(f"[Planner] {len(selected_files)} dosya bu koşuda refactor edilecek.")
 
-        for info in selected_files:
+        # 1) Tüm dosyaların promptlarını topla: (dosya index, fonksiyon adı|None, prompt, n_predict)
+        jobs: List[Tuple[int, Optional[str], str, int]] = []
+        for idx, info in enumerate(selected_files):
             rel = info["rel"]
             content = info["content"]
-            est_tokens = info["est_tokens"]
 
             # FULL FILE
-            if est_tokens <= self.max_est_tokens_per_file:
-                prompt = self._build_full_file_prompt(rel, content)
-                try:
-                    raw = llama_cpp(prompt, n_predict=min(1024, self.max_est_tokens_per_file * 2))
-                except LlamaCPPError as e:
-                    print(f"[Planner] Llama error on file {rel}: {e}")
+            if info["est_tokens"] <= self.max_est_tokens_per_file:
+                n_predict = min(FULL_FILE_N_PREDICT_MAX, self.max_est_tokens_per_file * 2)
+                jobs.append((idx, None, self._build_full_file_prompt(rel, content), n_predict))
+                continue
+
+            # FUNCTION-LEVEL
+            funcs = self._extract_functions(content)
+            funcs_sorted = sorted(funcs, key=lambda x: len(x["body"]), reverse=True)
+            for fn in funcs_sorted[: self.max_functions_per_large_file]:
+                # === BURADA TOKEN LİMİT KONTROLÜ EKLENDİ ===
+                fn_tokens = self._estimate_tokens(fn["body"])
+
+                if fn_tokens > MAX_FUNCTION_TOKENS:
+                    print(
+                        f"[Planner] Skip function {fn['name']} in {rel}: "
+                        f"too large for Llama context (est_tokens={fn_tokens})"
+                    )
                     continue
 
-                parsed = self._parse_json_response(raw)
-                patches = parsed.get("patches", [])
+                prompt = self._build_function_prompt(rel, fn["name"], fn["body"])
+                jobs.append((idx, fn["name"], prompt, FUNCTION_N_PREDICT))
 
-                for p in patches:
-                    if not isinstance(p, dict):
-                        continue
+        # 2) Hepsini tek batch'te gönder; sunucu --parallel ile aynı anda decode eder.
+        # Promptlar aynı sistem promptuyla başlar (fonksiyon promptlarında dosya yolu da
+        # ortak); cache_prompt sayesinde bu önek slot başına bir kez prefill edilir.
+        results = llama_cpp_batch(
+            [job[2] for job in jobs],
+            [job[3] for job in jobs],
+            max_workers=self.max_parallel_requests,
+        )
+
+        # 3) Cevapları dosyalarına geri dağıt
+        file_patches: Dict[int, List[Dict]] = {}
+        func_patches: Dict[int, List[Dict]] = {}
+        # No-op memo'ya yalnızca en az bir işi olan ve tüm işleri temiz parse edilip boş
+        # patch listesi dönen dosyalar girer; hiç gönderilmemiş dosya (tüm fonksiyonlar
+        # limit dışı), hata, kesik/bozuk JSON veya herhangi bir patch önerisi bunu engeller
+        sent: Set[int] = {job[0] for job in jobs}
+        not_noop: Set[int] = set()
+        for (idx, fn_name, _, _), raw in zip(jobs, results):
+            rel = selected_files[idx]["rel"]
+            where = f"file {rel}" if fn_name is None else f"function {fn_name} in {rel}"
+            if isinstance(raw, LlamaCPPError):
+                not_noop.add(idx)
+                print(f"[Planner] Llama error on {where}: {raw}")
+                continue
+
+            data = self._parse_json_response(raw)
+            if data is None:
+                not_noop.add(idx)
+                print(f"[Planner] Unparseable Llama response on {where}")
+                continue
+
+            patches = data["patches"]
+            if patches:
+                not_noop.add(idx)
+            for p in patches:
+                if not isinstance(p, dict):
+                    continue
+                if fn_name is None:
                     new_code = p.get("new_code")
                     if not isinstance(new_code, str):
                         continue
-                    all_patches.append(
+                    file_patches.setdefault(idx, []).append(
                         {
                             "file": f"{self.src_root}/{rel}",
                             "new_code": new_code,
                         }
                     )
-            else:
-                # FUNCTION-LEVEL
-                funcs = self._extract_functions(content)
-                funcs_sorted = sorted(funcs, key=lambda x: len(x["body"]), reverse=True)
-                target_funcs = funcs_sorted[: self.max_functions_per_large_file]
-
-                func_patches: List[Dict] = []
-                for fn in target_funcs:
-                    # === BURADA TOKEN LİMİT KONTROLÜ EKLENDİ ===
-                    fn_tokens = self._estimate_tokens(fn["body"])
-
-                    # 4096 ctx size → güvenli token limiti yaklaşık 1200
-                    if fn_tokens > 1200:
-                        print(
-                            f"[Planner] Skip function {fn['name']} in {rel}: "
-                            f"too large for Llama context (est_tokens={fn_tokens})"
-                        )
+                else:
+                    if p.get("function_name") != fn_name:
                         continue
-
-                    prompt = self._build_function_prompt(rel, fn["name"], fn["body"])
-                    try:
-                        raw = llama_cpp(prompt, n_predict=512)
-                    except LlamaCPPError as e:
-                        print(f"[Planner] Llama error on function {fn['name']} in {rel}: {e}")
+                    if "new_body" not in p or not isinstance(p["new_body"], str):
                         continue
+                    func_patches.setdefault(idx, []).append(p)
 
-                    parsed = self._parse_json_response(raw)
-                    patches = parsed.get("patches", [])
-                    for p in patches:
-                        if not isinstance(p, dict):
-                            continue
-                        if p.get("function_name") != fn["name"]:
-                            continue
-                        if "new_body" not in p or not isinstance(p["new_body"], str):
-                            continue
-                        func_patches.append(p)
-
-                new_full_content = self._apply_function_patches_to_content(content, func_patches)
+        # 4) Dosya sırasını koruyarak patch listesini kur
+        memo_size = len(noop_memo)
+        for idx, info in enumerate(selected_files):
+            if idx in file_patches:
+                all_patches.extend(file_patches[idx])
+                continue
 
+            content = info["content"]
+            if idx in func_patches:
+                new_full_content = self._apply_function_patches_to_content(
+                    content, func_patches[idx]
+                )
                 if new_full_content != content:
                     all_patches.append(
                         {
-                            "file": f"{self.src_root}/{rel}",
+                            "file": f"{self.src_root}/{info['rel']}",
                             "new_code": new_full_content,
                         }
                     )
+                    continue
+
+            # Temiz "patches: []" cevabı alan içerik bir sonraki koşuda gönderilmez
+            if idx in sent and idx not in not_noop and "digest" in info:
+                noop_memo[info["digest"]] = None
+
+        if self.noop_memo_path and len(noop_memo) != memo_size:
+            self._save_noop_memo(noop_memo)
 
         print(f"[Planner] Üretilen toplam patch sayısı: {len(all_patches)}")
         return {"patches": all_patches}
@@ -9,13 +9,32 @@ Amaç:
 """
 
 import json
-from typing import Any, Dict, List
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
 
 from agentic.llama_learning_integration import llama_cpp
 from agentic.self_planning_mode import DependencyExtractor, RoleInferer
 from genai.rag.adaptive_pipeline_designer import AdaptiveRAGPipelineDesigner
 from governance.audit_logger import log_event
 
+# select_required_modules: hedef metnindeki anahtar kelime → modül rolü
+_GOAL_KEYWORD_ROLES = {
+    "report": "reporting",
+    "kpi": "reporting",
+    "ess": "compliance",
+    "incident": "incident",
+    "risk": "risk",
+    "rag": "rag",
+    "optimize": "agentic",
+    "task": "agentic",
+}
+_GOAL_ROLES = frozenset(_GOAL_KEYWORD_ROLES.values())
+
+
+def _goal_needs_modules(goal: str) -> bool:
+    text = goal.lower()
+    return any(k in text for k in _GOAL_KEYWORD_ROLES)
+
 
 class AutonomousPipelineBuilder:
 
@@ -46,35 +65,30 @@ TASK:
     # --------------------------------------------------------------
     # 2) Select modules automatically
     # --------------------------------------------------------------
-    def select_required_modules(self, goal: str) -> List[str]:
-        all_mods = self.extractor.scan()
-        selected = []
-
-        text = goal.lower()
-
-        mapping = {
-            "report": "reporting",
-            "kpi": "reporting",
-            "ess": "compliance",
-            "incident": "incident",
-            "risk": "risk",
-            "rag": "rag",
-            "optimize": "agentic",
-            "task": "agentic",
-        }
-
-        for path, info in all_mods.items():
-            role = self.roles.infer_role(path, info)
-            if any(k in text for k in mapping.keys()) and role in mapping.values():
-                selected.append(path)
-
-        return selected
+    def select_required_modules(
+        self, goal: str, mod_info: Optional[Dict[str, Dict]] = None
+    ) -> List[str]:
+        # Hedef metni döngüden bağımsız: anahtar kelime yoksa modül taraması da gereksiz
+        if not _goal_needs_modules(goal):
+            return []
+
+        all_mods = self.extractor.scan() if mod_info is None else mod_info
+        return [
+            path
+            for path, info in all_mods.items()
+            if self.roles.infer_role(path, info) in _GOAL_ROLES
+        ]
 
     # --------------------------------------------------------------
     # 3) Build dependency graph for selected modules
     # --------------------------------------------------------------
-    def build_dependency_graph(self, modules: List[str]) -> List[Dict]:
-        mod_info = self.extractor.scan()
+    def build_dependency_graph(
+        self, modules: List[str], mod_info: Optional[Dict[str, Dict]] = None
+    ) -> List[Dict]:
+        if not modules:
+            return []
+        if mod_info is None:
+            mod_info = self.extractor.scan()
         graph = []
         for m in modules:
             graph.append({"module": m, "imports": mod_info[m]["imports"]})
@@ -112,11 +126,19 @@ Return JSON.
     def run(self, goal: str):
         log_event("PIPELINE_BUILDER_START", "Pipeline building started", {"goal": goal})
 
-        goal_info = self.interpret_goal(goal)
-        modules = self.select_required_modules(goal)
-        deps = self.build_dependency_graph(modules)
-        rag_cfg = self.build_rag_config()
-        pipeline = self.build_pipeline(goal, modules)
+        # Hedef analizi (LLM) diğer adımların hiçbirine girdi değil: tarama ve pipeline
+        # çağrısıyla eşzamanlı koşar
+        with ThreadPoolExecutor(max_workers=1) as pool:
+            goal_future = pool.submit(self.interpret_goal, goal)
+
+            # Kod tabanı run başına bir kez taranır; seçim ve bağımlılık grafiği aynı sonucu
+            # kullanır
+            mod_info = self.extractor.scan() if _goal_needs_modules(goal) else {}
+            modules = self.select_required_modules(goal, mod_info)
+            deps = self.build_dependency_graph(modules, mod_info)
+            rag_cfg = self.build_rag_config()
+            pipeline = self.build_pipeline(goal, modules)
+            goal_info = goal_future.result()
 
         result = {
             "goal_info": goal_info,
@@ -128,4 +150,3 @@ Return JSON.
 
         log_event("PIPELINE_BUILDER_DONE", "Pipeline building completed", result)
         return result
-        return result
@@ -41,4 +41,3 @@ class CodeRefactorAgent:
 
         log_event("CODE_REFACTOR_PLAN", "Generated code optimization plan.", plan)
         return plan
-        return plan
@@ -10,14 +10,16 @@ Amaç:
 
 from typing import Dict, List
 
+from agentic.llama_learning_integration.llama_client import count_tokens
+
 PRIORITY_ROLES = ["system", "developer"]
 MAX_TOKENS = 7500  # ctx ~8192 için güvenli sınır
 HARD_KEEP_LAST = 8  # En son n mesajı tam koru
 
 
 def rough_token_count(text: str) -> int:
-    # Basit approx: 1 token ~ 4 karakter
-    return max(1, len(text) // 4)
+    # Model tokenizer'ı varsa gerçek sayım (metin başına cache'li); yoksa 1 token ~ 4 karakter
+    return count_tokens(text)
 
 
 def summarize_messages(messages: List[Dict]) -> str:
@@ -31,7 +33,8 @@ def summarize_messages(messages: List[Dict]) -> str:
         content = m.get("content", "")
         if not content:
             continue
-        line = content.split("\n")[0]
+        # Sadece ilk satır gerekli; split tüm içeriği listeye bölerdi
+        line = content.partition("\n")[0]
         if len(line) > 200:
             line = line[:197] + "..."
         bullets.append(f"- {m['role']}: {line}")
@@ -44,9 +47,10 @@ def compress_for_llama(messages: List[Dict]) -> List[Dict]:
     Dönen: context sınırına uyan optimize edilmiş mesaj listesi.
     """
     # 1) System / developer mesajlarını aynen koru
-    system_msgs = [m for m in messages if m["role"] in PRIORITY_ROLES]
-
-    other = [m for m in messages if m["role"] not in PRIORITY_ROLES]
+    system_msgs: List[Dict] = []
+    other: List[Dict] = []
+    for m in messages:
+        (system_msgs if m["role"] in PRIORITY_ROLES else other).append(m)
     if len(other) <= HARD_KEEP_LAST:
         return system_msgs + other
 
@@ -61,15 +65,18 @@ def compress_for_llama(messages: List[Dict]) -> List[Dict]:
         "content": "Previous conversation compressed summary:\n" + summary_content,
     }
 
-    combined = system_msgs + [summary_msg] + keep_tail
-
-    # 4) Token sınırını kaba olarak kontrol et
-    total_tokens = sum(rough_token_count(m["content"]) for m in combined)
-
-    # Eğer hala çok uzun ise (çok ekstrem durum), tail'i kısalt
-    while total_tokens > MAX_TOKENS and len(keep_tail) > 3:
-        keep_tail = keep_tail[1:]  # en eski tail mesajını at
-        combined = system_msgs + [summary_msg] + keep_tail
-        total_tokens = sum(rough_token_count(m["content"]) for m in combined)
-
-    return combined
+    # 4) Token sınırını kaba olarak kontrol et (mesaj başına bir kez sayılır)
+    tail_tokens = [rough_token_count(m["content"]) for m in keep_tail]
+    total_tokens = (
+        sum(rough_token_count(m["content"]) for m in system_msgs)
+        + rough_token_count(summary_msg["content"])
+        + sum(tail_tokens)
+    )
+
+    # Eğer hala çok uzun ise (çok ekstrem durum), tail'i kısalt: en eski mesajlar atılır
+    drop = 0
+    while total_tokens > MAX_TOKENS and len(keep_tail) - drop > 3:
+        total_tokens -= tail_tokens[drop]
+        drop += 1
+
+    return system_msgs + [summary_msg] + keep_tail[drop:]
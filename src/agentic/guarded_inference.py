@@ -4,16 +4,25 @@ Guarded inference helper:
 - SelfEvaluator + RewriteFlow ile otomatik yeniden yazım (threshold altıysa)
 """
 
-from typing import Any, Dict, Optional
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Any, Dict, Optional, Tuple
 
 from agentic.llama_learning_integration.llama_client import llama_cpp
 from agentic.self_eval_rewrite_flow import RewriteFlow
-from agentic.self_evaluator import SelfEvaluator
 from genai.prompting.ohs_prompt_builder import build_guarded_completion_prompt
 from governance.cag_rules_engine import CAGRulesEngine
 from governance.ess_compliance_scorer import ess_score_from_items
 from utils.compliance import validate_document
 
+# CAG/ESS kontrolleri LLM çağrısıyla paralel koşar (thread'ler ilk submit'te açılır)
+_COMPLIANCE_POOL = ThreadPoolExecutor(max_workers=2, thread_name_prefix="guarded-cag")
+
+# (engine, (rules mtime_ns, standards_map mtime_ns), kural sayısı)
+_CAG_CACHE: Optional[Tuple[CAGRulesEngine, Tuple[int, int], int]] = None
+_CAG_LOCK = threading.Lock()
+
 
 def _regen_fn(prompt: str, metadata: Dict[str, Any]) -> str:
     """RewriteFlow için yeniden üretici."""
@@ -21,6 +30,75 @@ def _regen_fn(prompt: str, metadata: Dict[str, Any]) -> str:
     return llama_cpp(prompt, n_predict=512)
 
 
+@lru_cache(maxsize=8)
+def _flow(threshold: float, max_attempts: int) -> RewriteFlow:
+    """RewriteFlow (ve içindeki SelfEvaluator) durumsuz; ayar başına bir kez kurulur."""
+
+    return RewriteFlow(regenerate_fn=_regen_fn, threshold=threshold, max_attempts=max_attempts)
+
+
+def _rulepack_mtimes(engine: CAGRulesEngine) -> Tuple[int, int]:
+    return (
+        engine.rules_path.stat().st_mtime_ns,
+        engine.standards_map_path.stat().st_mtime_ns,
+    )
+
+
+def _cag_rule_count() -> int:
+    """Rulepack bir kez yüklenir; dosyalardan biri değişince (mtime) yeniden okunur."""
+
+    global _CAG_CACHE
+    with _CAG_LOCK:
+        if _CAG_CACHE is None:
+            engine = CAGRulesEngine()
+            mtimes = _rulepack_mtimes(engine)
+        else:
+            engine, cached_mtimes, count = _CAG_CACHE
+            mtimes = _rulepack_mtimes(engine)
+            if mtimes == cached_mtimes:
+                return count
+            engine.reload()
+        count = len(engine.list_rules())
+        _CAG_CACHE = (engine, mtimes, count)
+        return count
+
+
+def _run_compliance(
+    user_prompt: str, rag_context: str, ess_items: Optional[list]
+) -> Dict[str, Any]:
+    """CAG/ESS doğrulama (hafif, hata yutulur); yalnızca girdilere bağlı."""
+
+    compliance_summary: Dict[str, Any] = {}
+    try:
+        comp = validate_document(
+            text=user_prompt + "\n" + rag_context,
+            standards=["ISO45001", "OSHA", "LAW6331", "WB_ESS"],
+            context={},
+            categories=None,
+        )
+        compliance_summary["ok"] = comp.ok
+        compliance_summary["violations"] = comp.violations
+        compliance_summary["warnings"] = comp.warnings
+        compliance_summary["stats"] = comp.stats
+    except Exception as exc:
+        compliance_summary["error"] = f"CAG validation failed: {exc}"
+
+    try:
+        if ess_items:
+            ess_summary = ess_score_from_items(ess_items)
+            compliance_summary["ess_score"] = ess_summary
+    except Exception as exc:
+        compliance_summary["ess_error"] = str(exc)
+
+    try:
+        # Rulepack meta (yükleme testi)
+        compliance_summary["rule_count"] = _cag_rule_count()
+    except Exception:
+        pass
+
+    return compliance_summary
+
+
 def generate_guarded_response(
     user_prompt: str,
     *,
@@ -52,8 +130,14 @@ def generate_guarded_response(
         extra_instructions=extra_instructions,
     )
 
-    evaluator = SelfEvaluator()
-    flow = RewriteFlow(regenerate_fn=lambda p, m: _regen_fn(p, m), threshold=threshold, max_attempts=max_attempts)
+    flow = _flow(threshold, max_attempts)
+
+    # Uyum kontrolleri LLM sonucuna bağlı değil; decode süresince arka planda koşar
+    compliance_future = (
+        _COMPLIANCE_POOL.submit(_run_compliance, user_prompt, rag_context, ess_items)
+        if run_cag
+        else None
+    )
 
     # İlk yanıt
     initial_answer = llama_cpp(full_prompt, n_predict=512)
@@ -66,37 +150,7 @@ def generate_guarded_response(
     result = flow.run(full_prompt, initial_answer, metadata)
     result["prompt"] = full_prompt
 
-    # CAG/ESS doğrulama (hafif, hata yutulur)
-    if run_cag:
-        compliance_summary: Dict[str, Any] = {}
-        try:
-            comp = validate_document(
-                text=user_prompt + "\n" + rag_context,
-                standards=["ISO45001", "OSHA", "LAW6331", "WB_ESS"],
-                context={},
-                categories=None,
-            )
-            compliance_summary["ok"] = comp.ok
-            compliance_summary["violations"] = comp.violations
-            compliance_summary["warnings"] = comp.warnings
-            compliance_summary["stats"] = comp.stats
-        except Exception as exc:
-            compliance_summary["error"] = f"CAG validation failed: {exc}"
-
-        try:
-            if ess_items:
-                ess_summary = ess_score_from_items(ess_items)
-                compliance_summary["ess_score"] = ess_summary
-        except Exception as exc:
-            compliance_summary["ess_error"] = str(exc)
-
-        try:
-            # Rulepack meta (yükleme testi)
-            rules_count = len(CAGRulesEngine().list_rules())
-            compliance_summary["rule_count"] = rules_count
-        except Exception:
-            pass
-
-        result["compliance"] = compliance_summary
+    if compliance_future is not None:
+        result["compliance"] = compliance_future.result()
 
     return result
@@ -23,7 +23,7 @@ class LlamaLearningIntegration:
         self.cle = CodeLearningEngine()
 
     def build_learning_prompt(self) -> str:
-        patterns = self.cle.detect_patterns(self.cle.scan_codebase())
+        patterns = self.cle.scan_patterns()
         risk_notes = self.mem.memory.get("risk_patterns", [])
         compliance_notes = self.mem.memory.get("compliance_issues", [])
         code_notes = self.mem.memory.get("code_patterns", [])
@@ -57,9 +57,7 @@ Generate:
         result = llama_cpp(prompt)
 
         # Hafızaya yaz
-        self.mem.memory.setdefault("llm_learning_logs", [])
-        self.mem.memory["llm_learning_logs"].append(result)
-        self.mem.save()
+        self.mem.append("llm_learning_logs", result)
 
         log_event("LLAMA_LEARNING", "Llama learning integration completed")
         return result
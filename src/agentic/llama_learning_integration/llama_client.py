@@ -1,16 +1,37 @@
 import json
 import os
 import time
-from typing import Any, Dict, Optional
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Sequence, Union
 
 import requests
+from requests.adapters import HTTPAdapter
+
+from utils.jsonio import json_loads
+
+try:  # modelin tokenizer.json'u ile gerçek token sayımı (Rust, hızlı)
+    from tokenizers import Tokenizer
+except ImportError:  # pragma: no cover
+    Tokenizer = None
 
 LLAMA_SERVER_URL = os.getenv("LLAMA_SERVER_URL", "http://127.0.0.1:8080/completion")
 LLAMA_REQUEST_TIMEOUT = float(os.getenv("LLAMA_REQUEST_TIMEOUT", "120"))
 LLAMA_CTX_LIMIT = int(os.getenv("LLAMA_CTX_LIMIT", "4096"))
 LLAMA_MAX_RETRIES = int(os.getenv("LLAMA_MAX_RETRIES", "2"))
+# llama_cpp_batch için eşzamanlı istek sayısı (sunucunun --parallel slot sayısı)
+LLAMA_PARALLEL = int(os.getenv("LLAMA_PARALLEL", "8"))
+# Llama modelinin HF tokenizer.json yolu; boşsa ~4 karakter = 1 token yaklaşımı kullanılır
+LLAMA_TOKENIZER_PATH = os.getenv("LLAMA_TOKENIZER_PATH", "")
 DEFAULT_STOP = ["<|eot_id|>", "<|end_of_text|>"]
 
+# Keep-alive bağlantı havuzu: her çağrıda yeni TCP bağlantısı açılmaz. Havuz en az
+# LLAMA_PARALLEL bağlantı tutar (llama_cpp_batch thread'leri). Retry _post_with_retry'da.
+_SESSION = requests.Session()
+_ADAPTER = HTTPAdapter(pool_connections=4, pool_maxsize=max(32, LLAMA_PARALLEL), max_retries=0)
+_SESSION.mount("http://", _ADAPTER)
+_SESSION.mount("https://", _ADAPTER)
+
 
 class LlamaCPPError(RuntimeError):
     """Llama.cpp erişim ve format hataları."""
@@ -22,6 +43,40 @@ def _approx_tokens(text: str) -> int:
     return max(1, len(text) // 4)
 
 
+@lru_cache(maxsize=1)
+def _load_tokenizer() -> Optional[Any]:
+    if not LLAMA_TOKENIZER_PATH or Tokenizer is None:
+        return None
+    try:
+        return Tokenizer.from_file(LLAMA_TOKENIZER_PATH)
+    except Exception as exc:  # bozuk/eksik dosya → yaklaşık sayıma düş
+        print(f"[llama_client] Tokenizer yüklenemedi ({LLAMA_TOKENIZER_PATH}): {exc}")
+        return None
+
+
+def _tokenizer_count(text: str) -> int:
+    tokenizer = _load_tokenizer()
+    return max(1, len(tokenizer.encode(text, add_special_tokens=False).ids))
+
+
+# Mesaj boyutundaki metinler cache'lenir; dosya içerikleri gibi büyük metinler tutulmaz
+_TOKEN_CACHE_MAX_CHARS = 16384
+_cached_tokenizer_count = lru_cache(maxsize=1024)(_tokenizer_count)
+
+
+def count_tokens(text: str) -> int:
+    """
+    Metnin token sayısı. LLAMA_TOKENIZER_PATH ayarlıysa modelin tokenizer'ı ile
+    (aynı metin için sonuç cache'lenir), değilse ~4 karakter = 1 token yaklaşımıyla.
+    """
+
+    if _load_tokenizer() is None:
+        return _approx_tokens(text)
+    if len(text) > _TOKEN_CACHE_MAX_CHARS:
+        return _tokenizer_count(text)
+    return _cached_tokenizer_count(text)
+
+
 def _post_with_retry(payload: Dict[str, Any]) -> Dict[str, Any]:
     """HTTP POST + basit retry; hata metnini korur."""
 
@@ -29,13 +84,13 @@ def _post_with_retry(payload: Dict[str, Any]) -> Dict[str, Any]:
 
     for attempt in range(LLAMA_MAX_RETRIES + 1):
         try:
-            resp = requests.post(LLAMA_SERVER_URL, json=payload, timeout=LLAMA_REQUEST_TIMEOUT)
+            resp = _SESSION.post(LLAMA_SERVER_URL, json=payload, timeout=LLAMA_REQUEST_TIMEOUT)
             if resp.status_code != 200:
                 short_text = resp.text[:2000]
                 raise LlamaCPPError(
                     f"Llama.cpp HTTP {resp.status_code}. Body (truncated): {short_text}"
                 )
-            return resp.json()
+            return json_loads(resp.content)
         except (requests.RequestException, ValueError, LlamaCPPError) as exc:
             last_error = exc
             if attempt < LLAMA_MAX_RETRIES:
@@ -65,6 +120,7 @@ def llama_cpp(
     top_p: float = 0.9,
     stop: Optional[list[str]] = None,
     stream: bool = False,
+    cache_prompt: bool = True,
 ) -> str:
     """
     Llama.cpp /completion çağrısı (deterministik ayarlarla).
@@ -72,6 +128,8 @@ def llama_cpp(
     - ctx sınırı için kaba kontrol
     - timeout + retry
     - content/completion alanı dönüş
+    - cache_prompt: slot'un KV cache'indeki ortak prompt öneki (aynı sistem promptu)
+      yeniden prefill edilmez; yalnızca farklılaşan kuyruk işlenir
     """
 
     _validate_ctx(prompt, n_predict)
@@ -83,6 +141,7 @@ def llama_cpp(
         "top_p": top_p,
         "stop": stop or DEFAULT_STOP,
         "stream": stream,
+        "cache_prompt": cache_prompt,
     }
 
     data = _post_with_retry(payload)
@@ -97,6 +156,41 @@ def llama_cpp(
     return json.dumps(data, ensure_ascii=False)
 
 
+def llama_cpp_batch(
+    prompts: Sequence[str],
+    n_predict: Union[int, Sequence[int]] = 512,
+    *,
+    max_workers: int = LLAMA_PARALLEL,
+    **kwargs: Any,
+) -> List[Union[str, LlamaCPPError]]:
+    """
+    Birden çok promptu llama.cpp sunucusuna eşzamanlı gönderir.
+
+    Sunucu `--parallel N --cont-batching` ile açıksa istekler aynı decode
+    adımlarını paylaşır (continuous batching). Sonuçlar prompt sırasıyla döner;
+    hata alan isteğin yerine LlamaCPPError nesnesi konur (gather(return_exceptions)).
+    """
+
+    if isinstance(n_predict, int):
+        n_predicts: Sequence[int] = [n_predict] * len(prompts)
+    else:
+        n_predicts = n_predict
+        if len(n_predicts) != len(prompts):
+            raise ValueError("n_predict listesi prompts ile aynı uzunlukta olmalı.")
+
+    def _one(i: int) -> Union[str, LlamaCPPError]:
+        try:
+            return llama_cpp(prompts[i], n_predict=n_predicts[i], **kwargs)
+        except LlamaCPPError as exc:
+            return exc
+
+    workers = min(max(1, max_workers), len(prompts))
+    if workers <= 1:
+        return [_one(i) for i in range(len(prompts))]
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(_one, range(len(prompts))))
+
+
 def format_guarded_prompt(
     system_prompt: str,
     user_prompt: str,
@@ -124,15 +218,15 @@ def _parse_json_loose(text: str) -> Dict[str, Any]:
     """JSON parse; başarısızsa gövde içindeki ilk {...} bloğunu dener."""
 
     try:
-        return json.loads(text)
-    except json.JSONDecodeError:
+        return json_loads(text)
+    except json.JSONDecodeError:  # orjson.JSONDecodeError bunun alt sınıfı
         pass
 
     start = text.find("{")
     end = text.rfind("}")
     if start != -1 and end != -1 and end > start:
         try:
-            return json.loads(text[start : end + 1])
+            return json_loads(text[start : end + 1])
         except json.JSONDecodeError as exc:  # pragma: no cover - sadece hata yolu
             raise LlamaCPPError(f"Llama.cpp JSON parse hatası: {exc}") from exc
 
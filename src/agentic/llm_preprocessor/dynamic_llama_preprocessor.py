@@ -15,18 +15,23 @@ Amaç:
 
 
 class DynamicLlamaPreprocessor:
+    _WS = re.compile(r"\s+")
+    # Cümle sonu: "." + boşluk; "6.1.2" / "45001.2018" gibi numaralar bölünmez
+    _SENTENCE_SPLIT = re.compile(r"\.\s+")
+    _KEYS = ("ess", "6331", "iso", "hazard", "risk")
 
     def clean(self, text: str) -> str:
-        text = re.sub(r"\s+", " ", text).strip()
-        return text
+        return self._WS.sub(" ", text).strip()
 
     def extract_priority_content(self, text: str) -> str:
         """
         ESS / 6331 / ISO maddelerini önceliklendirir.
         """
         priorities = []
-        for line in text.split("."):
-            if any(key in line.lower() for key in ["ess", "6331", "iso", "hazard", "risk"]):
+        keys = self._KEYS
+        for line in self._SENTENCE_SPLIT.split(text):
+            low = line.lower()
+            if any(key in low for key in keys):
                 priorities.append(line.strip())
         return ". ".join(priorities) or text
 
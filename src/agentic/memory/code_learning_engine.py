@@ -5,17 +5,106 @@ ve gelecekteki öneriler için bunları hafızaya yazan alt sistem.
 """
 
 import ast
+import hashlib
 import json
 import os
+import sqlite3
 import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 
 from agentic.memory.long_term_memory import LongTermMemory
 
+# Dosya başına fonksiyon istatistikleri (isim, uzunluk, döngü sayısı) cache'i.
+# AST'nin kendisi saklanmaz: pickle.loads(ast) ölçümde ast.parse kadar sürüyor.
+STATS_CACHE_FILE = "data/memory/code_learning_cache.sqlite"
+
+# Bu sayıdan az değişmiş dosya varsa process havuzu açmak parse'tan pahalı
+PARSE_POOL_MIN_FILES = 16
+
+
+def _function_stats(tree):
+    """
+    detect_patterns'ın kullandığı tek bilgi: [[isim, uzunluk, iç içe döngü], ...].
+    Tek BFS geçişi (ast.walk sırası): her düğüm kapsayan FunctionDef'lerin index'lerini
+    taşır; For/While hepsinin sayacını artırır (iç fonksiyondaki döngüler dahil).
+    """
+    stats = []
+    queue = deque([(tree, ())])
+    while queue:
+        node, enclosing = queue.popleft()
+        if isinstance(node, ast.FunctionDef):
+            length = (node.end_lineno or node.lineno) - node.lineno
+            enclosing = enclosing + (len(stats),)
+            stats.append([node.name, length, 0])
+        elif isinstance(node, (ast.For, ast.While)):
+            for idx in enclosing:
+                stats[idx][2] += 1
+        for child in ast.iter_child_nodes(node):
+            queue.append((child, enclosing))
+    return stats
+
+
+def _source_stats_json(data):
+    """
+    Kaynak (bytes) → istatistik JSON'u; parse edilemezse "null".
+    Process havuzunda çalışır: süreçler arası yalnızca küçük JSON taşınır, AST değil.
+    """
+    try:
+        return json.dumps(_function_stats(ast.parse(data.decode("utf-8"))))
+    except Exception:
+        return "null"
+
+
+def _parse_sources(sources):
+    """Değişmiş dosyaları çok çekirdekte parse eder (ast.parse CPU-bound, GIL'i bırakmaz)."""
+    workers = min(os.cpu_count() or 1, len(sources))
+    if workers > 1 and len(sources) >= PARSE_POOL_MIN_FILES:
+        try:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                return list(pool.map(_source_stats_json, sources, chunksize=8))
+        except (OSError, BrokenProcessPool):
+            pass
+    return [_source_stats_json(data) for data in sources]
+
+
+def _patterns_from_stats(file_stats):
+    patterns = {"long_functions": [], "duplicate_function_names": {}, "complex_functions": []}
+
+    func_names = {}
+
+    for file, stats in file_stats.items():
+        for name, length, nested in stats:
+            # Fonksiyon adı yinelenmesi
+            func_names.setdefault(name, []).append(file)
+
+            # Çok uzun fonksiyonlar
+            if length > 50:
+                patterns["long_functions"].append(
+                    {"file": file, "function": name, "length": length}
+                )
+
+            # Karmaşık yapı tespiti
+            if nested > 3:
+                patterns["complex_functions"].append(
+                    {"file": file, "function": name, "nested_loops": nested}
+                )
+
+    # Yinelenmiş fonksiyon adlarını ekle
+    for name, locations in func_names.items():
+        if len(locations) > 1:
+            patterns["duplicate_function_names"][name] = locations
+
+    return patterns
+
 
 class CodeLearningEngine:
-    def __init__(self, root="src"):
+    def __init__(self, root="src", cache_file=STATS_CACHE_FILE):
         self.root = root
         self.mem = LongTermMemory()
+        # None → cache kullanılmaz, her taramada tüm dosyalar parse edilir
+        self.cache_file = cache_file
 
     def scan_codebase(self):
         """
@@ -43,56 +132,100 @@ class CodeLearningEngine:
         - Çok uzun fonksiyonlar (> 50 satır)
         - Kod kokuları (nested loops, long if chains)
         """
-        patterns = {"long_functions": [], "duplicate_function_names": {}, "complex_functions": []}
-
-        func_names = {}
-
-        for file, tree in code_map.items():
-            for node in ast.walk(tree):
-                if isinstance(node, ast.FunctionDef):
-                    name = node.name
-                    length = (node.end_lineno or node.lineno) - node.lineno
-
-                    # Fonksiyon adı yinelenmesi
-                    func_names.setdefault(name, []).append(file)
-
-                    # Çok uzun fonksiyonlar
-                    if length > 50:
-                        patterns["long_functions"].append(
-                            {"file": file, "function": name, "length": length}
-                        )
-
-                    # Karmaşık yapı tespiti
-                    nested = sum(
-                        isinstance(n, ast.For) or isinstance(n, ast.While) for n in ast.walk(node)
-                    )
-                    if nested > 3:
-                        patterns["complex_functions"].append(
-                            {"file": file, "function": name, "nested_loops": nested}
-                        )
-
-        # Yinelenmiş fonksiyon adlarını ekle
-        for name, locations in func_names.items():
-            if len(locations) > 1:
-                patterns["duplicate_function_names"][name] = locations
+        return _patterns_from_stats(
+            {file: _function_stats(tree) for file, tree in code_map.items()}
+        )
 
-        return patterns
+    def scan_patterns(self):
+        """
+        scan_codebase + detect_patterns ile aynı sonuç; değişmeyen dosyalar parse edilmez.
+        Dosya başına istatistikler SQLite'ta (path, mtime_ns, boyut, sha256) ile tutulur:
+        mtime/boyut aynıysa dosya okunmaz, farklıysa içerik özeti karşılaştırılır.
+        """
+        if not self.cache_file:
+            return self.detect_patterns(self.scan_codebase())
+        try:
+            return _patterns_from_stats(self._scan_stats_cached())
+        except (sqlite3.Error, OSError):
+            return self.detect_patterns(self.scan_codebase())
+
+    def _scan_stats_cached(self):
+        os.makedirs(os.path.dirname(self.cache_file) or ".", exist_ok=True)
+        conn = sqlite3.connect(self.cache_file)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS file_stats ("
+                "path TEXT PRIMARY KEY, mtime_ns INTEGER, size INTEGER, sha TEXT, stats TEXT)"
+            )
+            cached = {
+                row[0]: row[1:]
+                for row in conn.execute("SELECT path, mtime_ns, size, sha, stats FROM file_stats")
+            }
+
+            # (path, stats JSON | None); None olanlar parse bekliyor
+            entries = []
+            pending = []
+            upserts = []
+            for dirpath, _, files in os.walk(self.root):
+                for f in files:
+                    if not f.endswith(".py"):
+                        continue
+                    path = os.path.join(dirpath, f)
+                    try:
+                        st = os.stat(path)
+                    except OSError:
+                        continue
+                    row = cached.pop(path, None)
+                    if row and row[0] == st.st_mtime_ns and row[1] == st.st_size:
+                        entries.append((path, row[3]))
+                        continue
+                    try:
+                        with open(path, "rb") as fp:
+                            data = fp.read()
+                    except OSError:
+                        continue
+                    sha = hashlib.sha256(data).hexdigest()
+                    if row and row[2] == sha:
+                        entries.append((path, row[3]))
+                        upserts.append((path, st.st_mtime_ns, st.st_size, sha, row[3]))
+                        continue
+                    pending.append((len(entries), path, st.st_mtime_ns, st.st_size, sha, data))
+                    entries.append((path, None))
+
+            # Parse edilemeyen dosya da (null) kaydedilir; değişene kadar atlanır
+            parsed = _parse_sources([p[5] for p in pending])
+            for (slot, path, mtime_ns, size, sha, _), stats_json in zip(pending, parsed):
+                entries[slot] = (path, stats_json)
+                upserts.append((path, mtime_ns, size, sha, stats_json))
+
+            file_stats = {}
+            for path, stats_json in entries:
+                stats = json.loads(stats_json)
+                if stats is not None:
+                    file_stats[path] = stats
+
+            with conn:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO file_stats VALUES (?, ?, ?, ?, ?)", upserts
+                )
+                # Silinen dosyaların kayıtları düşer
+                conn.executemany("DELETE FROM file_stats WHERE path = ?", [(p,) for p in cached])
+            return file_stats
+        finally:
+            conn.close()
 
     def update_learning_memory(self, patterns):
         """
         Öğrenilen örüntüleri long-term memory'e ekler.
         """
-        self.mem.memory.setdefault("code_patterns", [])
-        self.mem.memory["code_patterns"].append({"timestamp": time.time(), "patterns": patterns})
-        self.mem.save()
+        self.mem.append("code_patterns", {"timestamp": time.time(), "patterns": patterns})
 
     def run_learning_cycle(self):
         """
         Tam öğrenme döngüsü: code scan → pattern detect → memory update
         """
-        code = self.scan_codebase()
-        patterns = self.detect_patterns(code)
-        self.update_learning_memory(patterns)
-        return patterns
+        patterns = self.scan_patterns()
         self.update_learning_memory(patterns)
         return patterns
@@ -2,52 +2,156 @@
 Long-Term Memory (Learning Enabled)
 Öğrenme modeli system_prompts.yaml + learning_memory_schema.json ile uyumludur.
 :contentReference[oaicite:3]{index=3}
+
+Kalıcılık: learning_memory.json snapshot + learning_memory.wal.jsonl değişiklik günlüğü.
+append()/set() tek satır ekler; save() yerinde yapılan değişiklikler için tam snapshot
+yazar ve günlüğü sıfırlar. Günlük WAL_COMPACT_BYTES'ı aşınca snapshot'a katlanır.
 """
 
-import json
+import os
 import time
+import uuid
+
+from utils.jsonio import json_dumps_bytes, json_loads
 
 MEMORY_FILE = "data/memory/learning_memory.json"
+WAL_COMPACT_BYTES = 4 * 1024 * 1024
+
+
+def _wal_file():
+    return os.path.splitext(MEMORY_FILE)[0] + ".wal.jsonl"
+
+
+def _default_memory():
+    return {
+        "version": "2.0",
+        "last_updated": time.time(),
+        "user_preferences": {},
+        "project_context": {},
+        "templates": {},
+        "regulation_notes": [],
+        "corrections_log": [],
+    }
+
+
+def _apply_op(memory, op):
+    *parents, last = op["path"]
+    target = memory
+    for key in parents:
+        target = target[key] if isinstance(target, list) else target.setdefault(key, {})
+    if op["op"] == "append":
+        items = target[last] if isinstance(target, list) else target.setdefault(last, [])
+        items.append(op["value"])
+        maxlen = op.get("maxlen")
+        if maxlen is not None and len(items) > maxlen:
+            del items[: len(items) - maxlen]  # halka tampon: en eski kayıtlar düşer
+    else:
+        target[last] = op["value"]
+    memory["last_updated"] = op["ts"]
 
 
 class LongTermMemory:
     def __init__(self):
+        self._load()
+
+    def _load(self):
+        self._wal_id = None
         try:
-            with open(MEMORY_FILE, "r", encoding="utf-8") as f:
-                self.memory = json.load(f)
-        except:
-            self.memory = {
-                "version": "2.0",
-                "last_updated": time.time(),
-                "user_preferences": {},
-                "project_context": {},
-                "templates": {},
-                "regulation_notes": [],
-                "corrections_log": [],
-            }
+            with open(MEMORY_FILE, "rb") as f:
+                self.memory = json_loads(f.read())
+            self._wal_id = self.memory.pop("_wal_id", None)
+        except Exception:
+            self.memory = _default_memory()
+        if self._wal_id is not None:
+            self._replay_wal()
+
+    def _replay_wal(self):
+        try:
+            with open(_wal_file(), "rb") as f:
+                header = f.readline()
+                # Başlık snapshot'la eşleşmiyorsa günlük zaten snapshot'a katlanmış demektir
+                if json_loads(header or b"{}").get("wal_id") != self._wal_id:
+                    return
+                for line in f:
+                    try:
+                        _apply_op(self.memory, json_loads(line))
+                    except (ValueError, KeyError, IndexError, TypeError, AttributeError):
+                        continue  # çökmede yarım kalmış satır
+        except (OSError, ValueError):
+            return
+
+    def _write_snapshot(self):
+        wal_id = uuid.uuid4().hex
+        directory = os.path.dirname(MEMORY_FILE)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{MEMORY_FILE}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(json_dumps_bytes({**self.memory, "_wal_id": wal_id}))
+        os.replace(tmp_path, MEMORY_FILE)
+        # Snapshot'tan sonra yazılır: arada çökme olursa eski günlük id uyuşmadığından atlanır
+        with open(_wal_file(), "wb") as f:
+            f.write(json_dumps_bytes({"wal_id": wal_id}) + b"\n")
+        self._wal_id = wal_id
+
+    def _log_op(self, op, path, value, **extra):
+        ts = time.time()
+        self.memory["last_updated"] = ts
+        if self._wal_id is None:
+            # Henüz snapshot yok: değişiklik zaten bellekte, ilk snapshot'a girer
+            self._write_snapshot()
+            return
+        line = json_dumps_bytes({"op": op, "path": path, "value": value, "ts": ts, **extra})
+        with open(_wal_file(), "ab") as f:
+            f.write(line + b"\n")
+            size = f.tell()
+        if size > WAL_COMPACT_BYTES:
+            self.compact()
+
+    def append(self, path, value, maxlen=None):
+        """
+        memory[path...] listesine ekler; diske yalnızca tek satır yazılır.
+        maxlen verilirse liste en son maxlen kayıtla sınırlı tutulur (halka tampon).
+        """
+        path = [path] if isinstance(path, str) else list(path)
+        extra = {} if maxlen is None else {"maxlen": maxlen}
+        op = {"op": "append", "path": path, "value": value, "ts": time.time(), **extra}
+        _apply_op(self.memory, op)
+        self._log_op("append", path, value, **extra)
+
+    def set(self, path, value):
+        """memory[path...] = value; diske yalnızca tek satır yazılır."""
+        path = [path] if isinstance(path, str) else list(path)
+        _apply_op(self.memory, {"op": "set", "path": path, "value": value, "ts": time.time()})
+        self._log_op("set", path, value)
 
     def save(self):
+        """memory üzerinde yerinde yapılan değişiklikler için tam snapshot yazar."""
         self.memory["last_updated"] = time.time()
-        with open(MEMORY_FILE, "w", encoding="utf-8") as f:
-            json.dump(self.memory, f, indent=2)
+        self._write_snapshot()
+
+    def reload(self):
+        """Diğer örneklerin/proseslerin yazdıklarını görmek için snapshot + günlüğü yeniden okur."""
+        self._load()
+
+    def compact(self):
+        """Diskteki snapshot + günlüğü (diğer örneklerin eklemeleri dahil) tek snapshot'a katlar."""
+        self._load()
+        self._write_snapshot()
 
     def update_user_preference(self, key, value):
-        self.memory.setdefault("user_preferences", {})[key] = value
-        self.save()
+        self.set(["user_preferences", key], value)
 
     def log_correction(self, previous, correction):
-        self.memory.setdefault("corrections_log", []).append(
-            {"timestamp": time.time(), "previous_output": previous, "user_correction": correction}
+        self.append(
+            "corrections_log",
+            {"timestamp": time.time(), "previous_output": previous, "user_correction": correction},
         )
-        self.save()
 
     def update_project_context(self, key, value):
         arr = self.memory.setdefault("project_context", {}).setdefault(key, [])
         if value not in arr:
-            arr.append(value)
-        self.save()
+            self.append(["project_context", key], value)
 
     def update_template(self, t_type, t_data):
-        arr = self.memory.setdefault("templates", {}).setdefault(t_type, [])
-        arr.append(t_data)
-        self.save()
+        self.append(["templates", t_type], t_data)
@@ -7,13 +7,14 @@ from docx import Document
 from openpyxl import Workbook
 from openpyxl.styles import PatternFill
 
+# Index = severity (0..15'e kırpılır): <8 sarı, 8-14 turuncu, >=15 kırmızı
+_SEV_COLORS = ("FFFF00",) * 8 + ("FFA500",) * 7 + ("FF0000",)
+# Satır başına yeni PatternFill üretmek yerine renk başına tek nesne paylaşılır
+_SEV_FILLS = {color: PatternFill("solid", fgColor=color) for color in set(_SEV_COLORS)}
+
 
 def severity_color(sev):
-    if sev >= 15:
-        return "FF0000"
-    if sev >= 8:
-        return "FFA500"
-    return "FFFF00"
+    return _SEV_COLORS[min(max(int(sev), 0), len(_SEV_COLORS) - 1)]
 
 
 def generate_capa_excel(capa_items, filename="CAPA_NCR.xlsx"):
@@ -25,18 +26,18 @@ def generate_capa_excel(capa_items, filename="CAPA_NCR.xlsx"):
     ws.append(headers)
 
     for c in capa_items:
+        sev = c.get("severity", 1)
         row = [
             c["issue"],
             c.get("root_cause", ""),
             c["action"],
             c.get("responsible", ""),
             c.get("due", ""),
-            c.get("severity", 1),
+            sev,
         ]
         ws.append(row)
 
-        sev = c.get("severity", 1)
-        ws.cell(ws.max_row, 6).fill = PatternFill("solid", fgColor=severity_color(sev))
+        ws.cell(ws.max_row, 6).fill = _SEV_FILLS[severity_color(sev)]
 
     wb.save(filename)
     return filename
@@ -12,21 +12,26 @@ Amaç:
 import time
 from typing import Dict, List
 
+import numpy as np
+
 from agentic.llama_learning_integration import llama_cpp
 from agentic.memory.long_term_memory import LongTermMemory
 from governance.audit_logger import log_event
 
+# task_performance en son bu kadar kayıtla sınırlı tutulur (halka tampon)
+TASK_HISTORY_MAX = 10_000
+
 
 class SelfOptimizingTaskScheduler:
     def __init__(self):
         self.mem = LongTermMemory()
 
     def record_task_result(self, task_name: str, duration: float, success: bool):
-        self.mem.memory.setdefault("task_performance", [])
-        self.mem.memory["task_performance"].append(
-            {"task": task_name, "duration": duration, "success": success, "timestamp": time.time()}
+        self.mem.append(
+            "task_performance",
+            {"task": task_name, "duration": duration, "success": success, "timestamp": time.time()},
+            maxlen=TASK_HISTORY_MAX,
         )
-        self.mem.save()
 
     def compute_task_priority(self, task_name: str) -> float:
         data = [x for x in self.mem.memory.get("task_performance", []) if x["task"] == task_name]
@@ -43,8 +48,29 @@ class SelfOptimizingTaskScheduler:
         priority = (1 / (avg_duration + 1)) * (1 - fail_rate + 0.1)
         return max(0.01, priority)
 
+    def compute_task_priorities(self) -> Dict[str, float]:
+        """
+        Tüm görevlerin önceliğini task_performance üzerinden tek geçişte hesaplar
+        (compute_task_priority ile aynı formül; görev başına tam tarama yerine bincount).
+        """
+        recs = self.mem.memory.get("task_performance", [])
+        if not recs:
+            return {}
+
+        n = len(recs)
+        names, inv = np.unique([r["task"] for r in recs], return_inverse=True)
+        dur = np.fromiter((r["duration"] for r in recs), dtype=np.float64, count=n)
+        suc = np.fromiter((bool(r["success"]) for r in recs), dtype=np.float64, count=n)
+
+        counts = np.bincount(inv)
+        avg_duration = np.bincount(inv, weights=dur) / counts
+        fail_rate = 1.0 - np.bincount(inv, weights=suc) / counts
+        priority = np.maximum(0.01, (1 / (avg_duration + 1)) * (1 - fail_rate + 0.1))
+        return dict(zip(names.tolist(), priority.tolist()))
+
     def optimize_order(self, tasks: List[str]) -> List[str]:
-        scored = [(t, self.compute_task_priority(t)) for t in tasks]
+        priorities = self.compute_task_priorities()
+        scored = [(t, priorities.get(t, 1.0)) for t in tasks]  # yeni görev—normal öncelik
 
         # Llama.cpp’den "priority suggestion" alınır
         prompt = f"""
@@ -60,4 +86,3 @@ Suggest improved ordering. Return list only.
         # Basit fallback — priority descending:
         scored.sort(key=lambda x: x[1], reverse=True)
         return [x[0] for x in scored]
-        return [x[0] for x in scored]
@@ -42,11 +42,16 @@ class SelfEvaluator:
         "preventive action",
     ]
 
+    # Küçük harfli kopyalar sınıf yüklenirken bir kez hazırlanır
+    _SECTIONS_L = tuple(sec.lower() for sec in REQUIRED_SECTIONS)
+    _SAFETY_TERMS_L = tuple(term.lower() for term in SAFETY_TERMS)
+
     def evaluate(self, answer_text: str, metadata: Dict) -> Dict[str, float]:
-        structure_score = self._score_structure(answer_text)
+        text_l = answer_text.lower()  # yapı + güvenlik skorları için tek lower()
+        structure_score = self._score_structure(text_l)
         compliance_score = self._score_compliance(metadata.get("compliance_mapping"))
-        safety_score = self._score_safety(answer_text)
-        clarity_score = self._score_clarity(answer_text)
+        safety_score = self._score_safety(text_l)
+        clarity_score = self._score_clarity(len(answer_text.split()))
 
         overall = (structure_score + compliance_score + safety_score + clarity_score) / 4.0
 
@@ -65,12 +70,9 @@ class SelfEvaluator:
         self.min_len = min_len
         self.max_len = max_len
 
-    def _score_structure(self, text: str) -> float:
-        found = 0
-        for sec in self.REQUIRED_SECTIONS:
-            if sec.lower() in text.lower():
-                found += 1
-        return found / max(len(self.REQUIRED_SECTIONS), 1)
+    def _score_structure(self, text_l: str) -> float:
+        found = sum(1 for sec in self._SECTIONS_L if sec in text_l)
+        return found / max(len(self._SECTIONS_L), 1)
 
     def _score_compliance(self, compliance_mapping: List[Dict]) -> float:
         if not compliance_mapping:
@@ -81,13 +83,11 @@ class SelfEvaluator:
                 refs += 1
         return min(1.0, refs / max(len(compliance_mapping), 1))
 
-    def _score_safety(self, text: str) -> float:
-        text_l = text.lower()
-        hits = sum(1 for term in self.SAFETY_TERMS if term in text_l)
+    def _score_safety(self, text_l: str) -> float:
+        hits = sum(1 for term in self._SAFETY_TERMS_L if term in text_l)
         return min(1.0, hits / 5.0) if hits else 0.0
 
-    def _score_clarity(self, text: str) -> float:
-        length = len(text.split())
+    def _score_clarity(self, length: int) -> float:
         if length < self.min_len:
             return 0.5
         if length > self.max_len:
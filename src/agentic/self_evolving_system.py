@@ -9,12 +9,19 @@ Amaç:
 - Hiçbir ajanı otomatik açıp/kapatmadan, sadece öneri/pattern çıkarmak.
 """
 
-import json
 from typing import Any, Dict, List
 
 from agentic.llama_learning_integration import llama_cpp
 from agentic.memory.long_term_memory import LongTermMemory
 from governance.audit_logger import log_event
+from utils.jsonio import json_dumps_compact
+
+
+def _prompt_record(record: Dict[str, Any]) -> Dict[str, Any]:
+    """Topoloji prompt'u için kayıt: timestamp atılır, ondalıklar 2 haneye yuvarlanır."""
+    return {
+        k: round(v, 2) if isinstance(v, float) else v for k, v in record.items() if k != "timestamp"
+    }
 
 
 class SelfEvolvingSystem:
@@ -42,10 +49,10 @@ HIGH-LEVEL GOAL:
 - {goal}
 
 CURRENT AGENT METRICS:
-{json.dumps(agents, indent=2)}
+{json_dumps_compact([_prompt_record(a) for a in agents])}
 
 TASK PERFORMANCE:
-{json.dumps(tasks[-30:], indent=2)}
+{json_dumps_compact([_prompt_record(t) for t in tasks[-30:]])}
 
 TASK:
 - Propose an optimized agent network topology:
@@ -74,9 +81,7 @@ TASK:
             "topology_suggestion": suggestion,
         }
 
-        self.mem.memory.setdefault("self_evolution_history", [])
-        self.mem.memory["self_evolution_history"].append(result)
-        self.mem.save()
+        self.mem.append("self_evolution_history", result)
 
         log_event("SELF_EVOLVE", "Self-evolution suggestion generated.", {"goal": goal})
         return result
@@ -9,11 +9,11 @@ Amaç:
 - Sadece öneri üretir; değişiklik yapmaz.
 """
 
-import json
 from typing import Dict, List
 
 from agentic.llama_learning_integration import llama_cpp
 from governance.audit_logger import log_event
+from utils.jsonio import json_dumps_compact
 
 
 class SelfHealingMode:
@@ -37,7 +37,7 @@ class SelfHealingMode:
     def propose_fix(self, issues: List[Dict]):
         prompt = f"""
 Detected system issues:
-{json.dumps(issues, indent=2)}
+{json_dumps_compact(issues)}
 
 TASK:
 - Identify root cause
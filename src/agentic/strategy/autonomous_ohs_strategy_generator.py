@@ -81,9 +81,7 @@ Output in structured markdown.
 
         result = {"horizon": horizon, "context_snapshot": ctx, "strategy_markdown": strategy_md}
 
-        self.mem.memory.setdefault("ohs_strategy_history", [])
-        self.mem.memory["ohs_strategy_history"].append(result)
-        self.mem.save()
+        self.mem.append("ohs_strategy_history", result)
 
         log_event("OHS_STRATEGY", "Autonomous OHS strategy generated.", {"horizon": horizon})
         return result
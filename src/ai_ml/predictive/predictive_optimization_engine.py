@@ -29,7 +29,7 @@ class PredictiveOptimizationEngine:
         self.model_loaded = True
 
     def estimate_code_risk(self):
-        patterns = self.cle.detect_patterns(self.cle.scan_codebase())
+        patterns = self.cle.scan_patterns()
         score = 0.0
 
         score += len(patterns["long_functions"]) * 1.5
@@ -67,9 +67,7 @@ class PredictiveOptimizationEngine:
             "total_risk_score": total_risk,
         }
 
-        self.mem.memory.setdefault("optimization_predictions", [])
-        self.mem.memory["optimization_predictions"].append(result)
-        self.mem.save()
+        self.mem.append("optimization_predictions", result)
 
         log_event("POE", "Predictive Optimization cycle completed", result)
         return result
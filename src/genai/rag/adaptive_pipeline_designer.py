@@ -47,9 +47,7 @@ TASK:
 Respond ONLY with a JSON config.
 """
         result = llama_cpp(prompt)
-        self.mem.memory.setdefault("rag_opt_history", [])
-        self.mem.memory["rag_opt_history"].append(result)
-        self.mem.save()
+        self.mem.append("rag_opt_history", result)
 
         log_event("RAG_ADAPTIVE", "Generated adaptive RAG config", result)
         return result
@@ -73,9 +73,7 @@ DO NOT modify any actual files. Return JSON only with:
 
         result = {"history_snapshot": history, "rag_vNext_proposal": suggestion}
 
-        self.mem.memory.setdefault("rag_evolution_history", [])
-        self.mem.memory["rag_evolution_history"].append(result)
-        self.mem.save()
+        self.mem.append("rag_evolution_history", result)
 
         log_event("RAG_EVOLUTION", "RAG evolution proposal generated.", {})
         return result
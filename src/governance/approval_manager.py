@@ -10,7 +10,7 @@ Amaç:
 
 import time
 import uuid
-from typing import Any, Dict
+from typing import Any, Dict, Optional
 
 from agentic.memory.long_term_memory import LongTermMemory
 from governance.audit_logger import log_event
@@ -19,8 +19,8 @@ from governance.audit_logger import log_event
 class ApprovalManager:
     def __init__(self):
         self.mem = LongTermMemory()
-        self.mem.memory.setdefault("approval_queue", [])
-        self.mem.save()
+        if "approval_queue" not in self.mem.memory:
+            self.mem.set("approval_queue", [])
 
     def register_proposal(self, proposal_type: str, proposal_content: Any) -> str:
         pid = str(uuid.uuid4())
@@ -33,31 +33,60 @@ class ApprovalManager:
             "approved_by": None,
             "approved_timestamp": None,
         }
-        self.mem.memory["approval_queue"].append(entry)
-        self.mem.save()
+        self.mem.append("approval_queue", entry)
         return pid
 
     def list_pending(self):
-        return [p for p in self.mem.memory.get("approval_queue", []) if p["status"] == "PENDING"]
+        return self.list_by_status("PENDING")
+
+    def list_by_status(self, status: str, proposal_type: Optional[str] = None):
+        return [
+            p
+            for p in self.mem.memory.get("approval_queue", [])
+            if p["status"] == status and (proposal_type is None or p["type"] == proposal_type)
+        ]
+
+    def refresh(self):
+        """Başka proseste (ör. kontrol paneli) verilen onay/retleri yükler."""
+        self.mem.reload()
 
     def approve(self, proposal_id: str, user: str = "admin"):
-        for p in self.mem.memory["approval_queue"]:
+        for i, p in enumerate(self.mem.memory["approval_queue"]):
             if p["id"] == proposal_id:
                 p["status"] = "APPROVED"
                 p["approved_by"] = user
                 p["approved_timestamp"] = time.time()
-                self.mem.save()
+                self.mem.set(["approval_queue", i], p)
                 log_event("APPROVAL", "Proposal approved", {"id": proposal_id})
                 return p
         return None
 
     def reject(self, proposal_id: str, user: str = "admin"):
-        for p in self.mem.memory["approval_queue"]:
+        for i, p in enumerate(self.mem.memory["approval_queue"]):
             if p["id"] == proposal_id:
                 p["status"] = "REJECTED"
                 p["approved_by"] = user
                 p["approved_timestamp"] = time.time()
-                self.mem.save()
+                self.mem.set(["approval_queue", i], p)
                 log_event("REJECTION", "Proposal rejected", {"id": proposal_id})
                 return p
         return None
+
+    def mark_applied(self, proposal_id: str, details: Any = None):
+        """Onaylanmış öneri uygulandı: tekrar uygulanmasın diye durum APPLIED olur."""
+        return self._close(proposal_id, "APPLIED", "Proposal applied", details)
+
+    def mark_failed(self, proposal_id: str, reason: str):
+        """Onaylanmış öneri uygulanamadı (eksik/bozuk/eskimiş patch): durum FAILED olur."""
+        return self._close(proposal_id, "FAILED", "Proposal apply failed", reason)
+
+    def _close(self, proposal_id: str, status: str, message: str, details: Any):
+        for i, p in enumerate(self.mem.memory["approval_queue"]):
+            if p["id"] == proposal_id:
+                p["status"] = status
+                p["applied_timestamp"] = time.time()
+                p["applied_details"] = details
+                self.mem.set(["approval_queue", i], p)
+                log_event("APPROVAL", message, {"id": proposal_id, "details": details})
+                return p
+        return None
@@ -0,0 +1,48 @@
+"""
+Ortak JSON yardımcıları (bellek kalıcılığı, log/state dosyaları, prompt'lar).
+
+orjson kuruluysa onu, değilse stdlib json'u kullanır; çıktı her iki yolda da UTF-8 bayttır.
+"""
+
+import json
+from typing import Any
+
+
+def _stdlib_dumps(obj: Any) -> bytes:
+    return json.dumps(obj, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+try:
+    import orjson
+
+    json_loads = orjson.loads
+
+    def json_dumps_bytes(obj: Any) -> bytes:
+        """Kompakt UTF-8 JSON; str olmayan dict anahtarları da desteklenir."""
+        try:
+            return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)
+        except TypeError:  # orjson'un desteklemediği tip (ör. 64 bit üstü int)
+            return _stdlib_dumps(obj)
+
+    def json_dumps_pretty(obj: Any) -> bytes:
+        """2 boşluk girintili UTF-8 JSON (elle okunan state dosyaları)."""
+        try:
+            return orjson.dumps(obj, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+        except TypeError:
+            return json.dumps(obj, indent=2, ensure_ascii=False).encode("utf-8")
+
+except ImportError:  # pragma: no cover
+    json_loads = json.loads
+
+    def json_dumps_bytes(obj: Any) -> bytes:
+        """Kompakt UTF-8 JSON; str olmayan dict anahtarları da desteklenir."""
+        return _stdlib_dumps(obj)
+
+    def json_dumps_pretty(obj: Any) -> bytes:
+        """2 boşluk girintili UTF-8 JSON (elle okunan state dosyaları)."""
+        return json.dumps(obj, indent=2, ensure_ascii=False).encode("utf-8")
+
+
+def json_dumps_compact(obj: Any) -> str:
+    """Prompt'lar için girintisiz JSON metni (daha az token)."""
+    return json_dumps_bytes(obj).decode("utf-8")
@@ -0,0 +1,79 @@
+from types import SimpleNamespace
+
+import pytest
+
+from agentic.auto_refactor.ace_config import logger as ace_logger
+from agentic.auto_refactor.ace_executor import ACEExecutor
+from agentic.memory import long_term_memory as ltm
+from governance.approval_manager import ApprovalManager
+
+
+@pytest.fixture
+def executor(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)  # audit_logger göreli logs/ dizinine yazar
+    monkeypatch.setattr(ltm, "MEMORY_FILE", str(tmp_path / "learning_memory.json"))
+    # "ace" logger import anındaki sys.stdout'a bağlı; pytest capture kapanınca yazamaz
+    monkeypatch.setattr(ace_logger, "disabled", True)
+    (tmp_path / "src").mkdir()
+    (tmp_path / "src" / "a.py").write_text("x = 1\n", encoding="utf-8")
+
+    ex = ACEExecutor.__new__(ACEExecutor)
+    ex.project_root = tmp_path
+    ex.sandbox_dir = tmp_path / "sandbox_repo"
+    ex.staging_root = tmp_path / "logs" / "ace" / "staged"
+    ex.approver = ApprovalManager()
+    ex.planner = SimpleNamespace(applied=[])
+    ex.planner.record_applied_patches = lambda patches, **_: ex.planner.applied.extend(patches)
+    ex._prepare_sandbox()
+    return ex
+
+
+def _propose(ex, rel_path, new_code):
+    patches = [{"file": rel_path, "new_code": new_code, "llm": True}]
+    ex._apply_patches_in_sandbox(patches)
+    staging = ex.staging_root / "p1"
+    content = {
+        "patches": ex._stage_proposal_patches(patches, staging),
+        "staging_dir": str(staging),
+    }
+    return ex.approver.register_proposal("ACE_PATCHES", content), staging
+
+
+def _status(proposal_id):
+    queue = ApprovalManager().mem.memory["approval_queue"]
+    return next(p["status"] for p in queue if p["id"] == proposal_id)
+
+
+def test_approved_proposal_is_applied_once(executor):
+    pid, staging = _propose(executor, "src/a.py", "x = 2\n")
+    ApprovalManager().approve(pid)
+
+    assert executor.process_approval_decisions() == 1
+    assert (executor.project_root / "src" / "a.py").read_text(encoding="utf-8") == "x = 2\n"
+    assert [p["file"] for p in executor.planner.applied] == ["src/a.py"]
+    assert _status(pid) == "APPLIED"
+    assert not staging.exists()
+    assert executor.process_approval_decisions() == 0
+
+
+def test_rejected_proposal_removes_staging(executor):
+    pid, staging = _propose(executor, "src/a.py", "x = 2\n")
+    assert staging.exists()
+    ApprovalManager().reject(pid)
+
+    assert executor.process_approval_decisions() == 0
+    assert (executor.project_root / "src" / "a.py").read_text(encoding="utf-8") == "x = 1\n"
+    assert not staging.exists()
+
+
+def test_stale_target_is_skipped(executor):
+    pid, staging = _propose(executor, "src/a.py", "x = 2\n")
+    # Onay beklerken ana depoda elle düzenleme
+    (executor.project_root / "src" / "a.py").write_text("x = 3\n", encoding="utf-8")
+    ApprovalManager().approve(pid)
+
+    assert executor.process_approval_decisions() == 0
+    assert (executor.project_root / "src" / "a.py").read_text(encoding="utf-8") == "x = 3\n"
+    assert executor.planner.applied == []
+    assert _status(pid) == "FAILED"
+    assert staging.exists()
@@ -0,0 +1,80 @@
+import json
+
+import pytest
+
+from agentic.memory import long_term_memory as ltm
+from agentic.memory.long_term_memory import LongTermMemory
+
+
+@pytest.fixture
+def memory_file(tmp_path, monkeypatch):
+    path = tmp_path / "learning_memory.json"
+    monkeypatch.setattr(ltm, "MEMORY_FILE", str(path))
+    return path
+
+
+def _wal_path(memory_file):
+    return memory_file.with_name("learning_memory.wal.jsonl")
+
+
+def test_reload_after_append_and_set(memory_file):
+    mem = LongTermMemory()
+    mem.append("corrections_log", {"n": 1})
+    mem.append("corrections_log", {"n": 2})
+    mem.set(["user_preferences", "lang"], "tr")
+    mem.set("approval_queue", [{"id": "a", "status": "PENDING"}])
+    mem.set(["approval_queue", 0], {"id": "a", "status": "APPROVED"})
+
+    reloaded = LongTermMemory()
+    assert reloaded.memory["corrections_log"] == [{"n": 1}, {"n": 2}]
+    assert reloaded.memory["user_preferences"] == {"lang": "tr"}
+    assert reloaded.memory["approval_queue"] == [{"id": "a", "status": "APPROVED"}]
+    assert "_wal_id" not in reloaded.memory
+
+
+def test_torn_last_line_is_skipped(memory_file):
+    mem = LongTermMemory()
+    mem.append("corrections_log", {"n": 1})
+    mem.append("corrections_log", {"n": 2})
+    with open(_wal_path(memory_file), "ab") as f:
+        f.write(b'{"op": "append", "path": ["corrections_lo')
+
+    reloaded = LongTermMemory()
+    assert reloaded.memory["corrections_log"] == [{"n": 1}, {"n": 2}]
+
+
+def test_stale_wal_header_is_ignored(memory_file):
+    mem = LongTermMemory()
+    mem.append("corrections_log", {"n": 1})
+    # Snapshot yazıldıktan sonra günlük sıfırlanamadan çökülmüş gibi: eski id'li günlük
+    stale = {"op": "append", "path": ["corrections_log"], "value": {"n": 99}, "ts": 0}
+    _wal_path(memory_file).write_text(
+        json.dumps({"wal_id": "stale"}) + "\n" + json.dumps(stale) + "\n", encoding="utf-8"
+    )
+
+    reloaded = LongTermMemory()
+    assert reloaded.memory["corrections_log"] == [{"n": 1}]
+
+
+def test_compact_keeps_other_instance_ops(memory_file):
+    first = LongTermMemory()
+    first.append("corrections_log", {"n": 1})
+    second = LongTermMemory()
+    second.append("corrections_log", {"n": 2})
+
+    first.compact()
+
+    assert first.memory["corrections_log"] == [{"n": 1}, {"n": 2}]
+    assert LongTermMemory().memory["corrections_log"] == [{"n": 1}, {"n": 2}]
+    # Günlük snapshot'a katlandı: yalnızca başlık satırı kalır
+    assert len(_wal_path(memory_file).read_bytes().splitlines()) == 1
+
+
+def test_maxlen_trims_on_replay(memory_file):
+    mem = LongTermMemory()
+    mem.set("task_performance", list(range(10)))
+    for i in range(10, 15):
+        mem.append("task_performance", i, maxlen=4)
+
+    assert mem.memory["task_performance"] == [11, 12, 13, 14]
+    assert LongTermMemory().memory["task_performance"] == [11, 12, 13, 14]
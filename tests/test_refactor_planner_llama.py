@@ -0,0 +1,120 @@
+import json
+
+from agentic.auto_refactor import refactor_planner_llama as rpl
+from agentic.auto_refactor.refactor_planner_llama import RefactorPlannerLlama
+from agentic.llama_learning_integration.llama_client import LlamaCPPError
+
+SOURCE = '''import functools
+
+TEMPLATE = """
+def fake(x):
+    return x
+"""
+
+
+@functools.lru_cache(maxsize=None)
+@staticmethod
+def cached(
+    a: int,
+    b: int = 2,
+) -> int:
+    return a + b
+
+
+def plain():
+    return "def not_a_function():"
+'''
+
+
+def _planner():
+    return RefactorPlannerLlama(index_path=None, noop_memo_path=None)
+
+
+def test_extract_functions_skips_decorators_and_string_literals():
+    funcs = _planner()._extract_functions(SOURCE)
+
+    assert [f["name"] for f in funcs] == ["cached", "plain"]
+    cached = funcs[0]
+    assert cached["body"].startswith("def cached(\n")
+    assert cached["body"].endswith("    return a + b\n")
+    assert SOURCE[cached["start"] : cached["end"]] == cached["body"]
+
+
+def test_function_patch_keeps_decorators():
+    new_body = "def cached(a: int, b: int = 2) -> int:\n    return b + a\n"
+    patched = _planner()._apply_function_patches_to_content(
+        SOURCE, [{"function_name": "cached", "new_body": new_body}]
+    )
+
+    assert (
+        "@functools.lru_cache(maxsize=None)\n@staticmethod\n"
+        "def cached(a: int, b: int = 2) -> int:\n    return b + a\n\n\ndef plain():"
+    ) in patched
+    assert patched.count("@staticmethod") == 1
+    assert 'TEMPLATE = """\ndef fake(x):' in patched
+    assert patched.endswith('    return "def not_a_function():"\n')
+
+
+def test_unknown_function_patch_leaves_content_unchanged():
+    patches = [{"function_name": "fake", "new_body": "def fake(x):\n    return 0\n"}]
+    assert _planner()._apply_function_patches_to_content(SOURCE, patches) == SOURCE
+
+
+def _memo_run(planner, monkeypatch, files, replies):
+    """files: {rel: (content, est_tokens)}; replies: {rel: ham cevap veya istisna}."""
+    infos = [
+        {"rel": rel, "abs": rel, "content": content, "est_tokens": est}
+        for rel, (content, est) in files.items()
+    ]
+    monkeypatch.setattr(planner, "_scan_python_files", lambda: infos)
+    sent = []
+
+    def fake_batch(prompts, n_predicts, max_workers):
+        out = []
+        for prompt in prompts:
+            rel = next(r for r in files if r in prompt)
+            sent.append(rel)
+            out.append(replies[rel])
+        return out
+
+    monkeypatch.setattr(rpl, "llama_cpp_batch", fake_batch)
+    planner.generate_refactor_plan()
+    return sent
+
+
+def test_noop_memo_only_keeps_clean_empty_replies(tmp_path, monkeypatch):
+    memo_path = tmp_path / "noop.json"
+    planner = RefactorPlannerLlama(
+        index_path=None, noop_memo_path=str(memo_path), max_est_tokens_per_file=100
+    )
+    monkeypatch.setattr(planner, "_estimate_tokens", lambda text: 5000)
+    files = {
+        "clean.py": ("a = 1\n", 10),
+        "truncated.py": ("b = 1\n", 10),
+        "error.py": ("c = 1\n", 10),
+        "patched.py": ("d = 1\n", 10),
+        # Büyük dosya, tek fonksiyonu MAX_FUNCTION_TOKENS üstünde → hiç iş üretilmez
+        "nojobs.py": ("def big():\n    return 1\n", 500),
+    }
+    replies = {
+        "clean.py": '{"patches": []}',
+        "truncated.py": '{"patches": [{"new_code": "b = ',
+        "error.py": LlamaCPPError("timeout"),
+        "patched.py": json.dumps({"patches": [{"new_code": "d = 2\n"}]}),
+    }
+
+    assert sorted(_memo_run(planner, monkeypatch, files, replies)) == sorted(replies)
+    assert len(json.loads(memo_path.read_text(encoding="utf-8"))) == 1
+
+    again = RefactorPlannerLlama(
+        index_path=None, noop_memo_path=str(memo_path), max_est_tokens_per_file=100
+    )
+    monkeypatch.setattr(again, "_estimate_tokens", lambda text: 5000)
+    assert "clean.py" not in _memo_run(again, monkeypatch, files, replies)
+
+    # Sınırlar özete dahil: farklı limitle çalışan planner memo'yu yeniden kullanmaz
+    other = RefactorPlannerLlama(
+        index_path=None, noop_memo_path=str(memo_path), max_est_tokens_per_file=200
+    )
+    monkeypatch.setattr(other, "_estimate_tokens", lambda text: 5000)
+    assert "clean.py" in _memo_run(other, monkeypatch, files, replies)